@@ -1,3 +1,17 @@
+"""
+ASGI config for Athena project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+A auditoria guarda a requisição atual em uma ContextVar (auditoria.local) e o
+RequestStoreMiddleware aceita cadeias síncronas e assíncronas, então o projeto
+pode rodar em um servidor ASGI, ex.:
+
+    gunicorn Athena.Athena.asgi:application -k uvicorn.workers.UvicornWorker
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
 import os
 from django.core.asgi import get_asgi_application
 
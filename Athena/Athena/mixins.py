@@ -6,6 +6,7 @@ from django.views.generic import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from .models import Contract, ContractMovement
 from .forms import ContractForm
+from usuarios import roles
 
 
 class OwnerQuerysetMixin(LoginRequiredMixin):
@@ -17,9 +18,8 @@ class OwnerQuerysetMixin(LoginRequiredMixin):
     owner_field_name = "usuario"  # Padrão do projeto Athena (era "owner")
 
     def is_admin(self):
-        """Verifica se o usuário é admin ou superuser"""
-        u = self.request.user
-        return u.is_superuser or u.groups.filter(name="empresa_admin").exists()
+        """Verifica se o usuário é admin ou superuser (grupos em cache por requisição)"""
+        return roles.is_admin(self.request.user)
 
     def get_queryset(self):
         """Aplica filtro de escopo por usuário"""
@@ -42,9 +42,8 @@ class OwnerObjectPermissionMixin(UserPassesTestMixin):
     owner_field_name = "usuario"  # Padrão do projeto Athena
 
     def is_admin(self):
-        """Verifica se o usuário é admin ou superuser"""
-        u = self.request.user
-        return u.is_superuser or u.groups.filter(name="empresa_admin").exists()
+        """Verifica se o usuário é admin ou superuser (grupos em cache por requisição)"""
+        return roles.is_admin(self.request.user)
 
     def test_func(self):
         """Testa se o usuário pode acessar o objeto"""
@@ -98,8 +97,7 @@ class AdminOnlyMixin(UserPassesTestMixin):
     
     def test_func(self):
         """Permite acesso apenas para admins"""
-        u = self.request.user
-        return u.is_superuser or u.groups.filter(name="empresa_admin").exists()
+        return roles.is_admin(self.request.user)
     
     def handle_no_permission(self):
         """Customiza tratamento de acesso negado para admins"""
@@ -122,11 +120,7 @@ class GroupRequiredMixin(UserPassesTestMixin):
             return True
             
         u = self.request.user
-        return (
-            u.is_superuser or 
-            u.groups.filter(name=self.group_required).exists() or
-            u.groups.filter(name="empresa_admin").exists()
-        )
+        return roles.is_admin(u) or roles.in_group(u, self.group_required)
     
     def handle_no_permission(self):
         """Customiza tratamento de grupo não autorizado"""
@@ -209,6 +209,48 @@ LOGIN_URL = "usuarios:login"
 LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "home"
 
+# Cache de papéis (grupos) entre requisições, em segundos (0 = apenas por requisição)
+ROLE_CACHE_TIMEOUT = int(os.environ.get('ROLE_CACHE_TIMEOUT', '0'))
+
+# Auditoria: SELECT extra para instâncias salvas sem terem sido carregadas do banco
+AUDIT_SNAPSHOT_FALLBACK = os.environ.get('AUDIT_SNAPSHOT_FALLBACK', 'False') == 'True'
+
+# Auditoria: meses mantidos na tabela particionada (0 = sem expiração)
+AUDIT_RETENTION_MONTHS = int(os.environ.get('AUDIT_RETENTION_MONTHS', '24'))
+
+# Auditoria: arquivamento frio (archive_activity_logs) em segmentos .jsonl.gz
+AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR', str(BASE_DIR.parent / 'audit_archive'))
+AUDIT_ARCHIVE_AFTER_DAYS = int(os.environ.get('AUDIT_ARCHIVE_AFTER_DAYS', '365'))
+
+# Auditoria: snapshot completo a cada N alterações (limita o replay da reconstrução)
+AUDIT_SNAPSHOT_EVERY = int(os.environ.get('AUDIT_SNAPSHOT_EVERY', '20'))
+
+# Sincronização (RH/ERP): máximo de registros por requisição
+SYNC_MAX_RECORDS = int(os.environ.get('SYNC_MAX_RECORDS', '10000'))
+
+# Cache compartilhado entre os workers do gunicorn (Redis, requer o pacote
+# redis). Sem REDIS_URL fica o LocMemCache padrão, um por processo: os totais
+# das listas e o dashboard não usam cache nesse caso (pages.counts.shared_cache)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Totais das listas (pages.counts): segundos em cache (0 = sem cache) e, no
+# PostgreSQL, linhas a partir das quais o total é estimado pelo planejador (0 = sempre exato)
+LIST_COUNT_CACHE_TIMEOUT = int(os.environ.get('LIST_COUNT_CACHE_TIMEOUT', '60'))
+LIST_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('LIST_COUNT_ESTIMATE_THRESHOLD', '100000'))
+
+# Dashboard (pages.dashboard): segundos do snapshot por usuário em cache (0 = sem cache)
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '300'))
+
+# Consultas independentes em paralelo (pages.parallel): threads do pool, cada
+# uma com a sua conexão (0 = sempre em sequência)
+PARALLEL_QUERY_WORKERS = int(os.environ.get('PARALLEL_QUERY_WORKERS', '4'))
+
 # Message Tags
 MESSAGE_TAGS = {
     messages.DEBUG: 'info',
@@ -20,7 +20,7 @@ class ActivityLogAdmin(admin.ModelAdmin):
         'actor__username', 'object_repr', 'ip', 'user_agent'
     ]
     readonly_fields = [
-        'actor', 'action', 'content_type', 'object_id', 'target',
+        'actor', 'owner', 'action', 'content_type', 'object_id', 'target',
         'object_repr', 'changes', 'ip', 'user_agent', 'created_at'
     ]
     date_hierarchy = 'created_at'
@@ -84,7 +84,7 @@ class ActivityLogAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'actor', 'action')
         }),
         ('Objeto Afetado', {
-            'fields': ('content_type', 'object_id', 'object_repr')
+            'fields': ('content_type', 'object_id', 'object_repr', 'owner')
         }),
         ('Alterações', {
             'fields': ('changes',),
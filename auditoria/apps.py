@@ -9,33 +9,40 @@ class AuditoriaConfig(AppConfig):
     name = 'auditoria'
     verbose_name = 'Auditoria'
 
+    # Modelos que serão monitorados pela auditoria e suas opções:
+    #   exclude  -> campos extras ignorados no diff de atualização
+    #   snapshot -> captura o estado original para gerar o diff (padrão True)
+    target_models = {
+        'pages.Person': {                                      # Pessoas (cpf_digits acompanha o cpf)
+            'exclude': ('cpf_digits',),
+        },
+        'pages.Company': {                                     # Empresas (contadores automáticos)
+            'exclude': ('total_contracts', 'total_contract_value', 'last_contract_date', 'cnpj_digits'),
+        },
+        'pages.Contract': {                                    # Contratos (busca mantida por trigger)
+            'exclude': ('search_vector',),
+        },
+        'pages.State': {},                                     # Estados (apenas admin)
+        'pages.City': {},                                      # Cidades (apenas admin)
+    }
+
     def ready(self):
         """
-        Registra os signals e configura os modelos monitorados
+        Registra os signals apenas para os modelos monitorados
         """
         from . import signals
         from django.apps import apps
         
-        # Modelos que serão monitorados pela auditoria
-        target_models = [
-            'pages.Person',      # Pessoas
-            'pages.Company',     # Empresas  
-            'pages.Contract',    # Contratos
-            'pages.State',       # Estados (apenas admin)
-            'pages.City',        # Cidades (apenas admin)
-        ]
-        
-        # Registra os modelos que existem
+        # Registra os modelos que existem (receivers conectados por sender)
         monitored = []
-        for model_label in target_models:
+        for model_label, options in self.target_models.items():
             try:
                 model = apps.get_model(model_label)
-                monitored.append(model.__name__)
             except Exception as e:
                 print(f"⚠️ Modelo {model_label} não encontrado para auditoria: {e}")
-        
-        # Atualiza a lista de modelos monitorados
-        signals.MONITORED_MODELS[:] = monitored
+                continue
+            signals.register(model, **options)
+            monitored.append(model.__name__)
         
         if monitored:
             print(f"✅ Auditoria ativada para modelos: {', '.join(monitored)}")
@@ -0,0 +1,242 @@
+"""
+Arquivamento frio do log de auditoria em segmentos JSONL comprimidos
+
+Cada dia (UTC) arquivado vira um arquivo activitylog-AAAA-MM-DD-<primeiro_id>.jsonl.gz.
+Um índice lateral (index.json) guarda, por segmento, a faixa de datas,
+os ids dos usuários e os tipos de objeto presentes, para que o leitor
+abra apenas os segmentos relevantes sem reidratar o banco.
+"""
+import gzip
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.utils.dateparse import parse_datetime
+
+from .models import ActivityLog
+
+INDEX_FILE = "index.json"
+
+# Colunas exportadas (content_type vira "app_label.model", estável entre bancos)
+EXPORT_FIELDS = (
+    "id", "created_at", "actor_id", "owner_id", "action",
+    "content_type_id", "content_type__app_label", "content_type__model",
+    "object_id", "object_repr", "changes", "state", "ip", "user_agent",
+)
+
+
+def default_archive_dir():
+    return str(getattr(settings, "AUDIT_ARCHIVE_DIR", "audit_archive"))
+
+
+def _day_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, value.day, tzinfo=dt_timezone.utc)
+
+
+def _to_record(row):
+    """Converte uma linha de values() no registro JSON arquivado"""
+    app_label = row.pop("content_type__app_label")
+    model = row.pop("content_type__model")
+    row["content_type"] = f"{app_label}.{model}" if app_label else None
+    return row
+
+
+def load_index(directory):
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {"segments": []}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_index(directory, index):
+    """Grava o índice de forma atômica (arquivo temporário + rename)"""
+    path = os.path.join(directory, INDEX_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(index, fh, ensure_ascii=False, indent=1)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class ArchiveWriter:
+    """
+    Move logs antigos do banco para segmentos comprimidos
+
+    Para cada dia: lê as linhas em ordem de pk com cursor do lado do servidor
+    (iterator dentro de uma transação), grava o segmento, atualiza o índice
+    e só então exclui do banco, em lotes por faixa de pk.
+    """
+
+    def __init__(self, directory=None, batch_size=5000, chunk_size=2000, using="default"):
+        self.directory = directory or default_archive_dir()
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.using = using
+
+    def archive_before(self, cutoff, delete=True, dry_run=False):
+        """
+        Arquiva todos os logs com created_at < cutoff
+
+        Returns:
+            list: entradas do índice criadas (uma por segmento)
+        """
+        base = ActivityLog.objects.using(self.using).filter(created_at__lt=cutoff)
+        created = []
+        day_from = None
+
+        while True:
+            qs = base if day_from is None else base.filter(created_at__gte=day_from)
+            oldest = qs.aggregate(oldest=Min("created_at"))["oldest"]
+            if oldest is None:
+                break
+
+            day = _day_start(oldest)
+            day_end = min(day + timedelta(days=1), cutoff)
+            day_qs = base.filter(created_at__gte=day, created_at__lt=day_end)
+
+            if dry_run:
+                created.append({"date": day.date().isoformat(), "count": day_qs.count()})
+            else:
+                entry = self._archive_day(day, day_qs)
+                if entry:
+                    created.append(entry)
+                    if delete:
+                        self._delete_written(day_qs, entry["boundaries"], entry["last_id"])
+            day_from = day_end
+
+        return created
+
+    def _archive_day(self, day, day_qs):
+        """Grava um segmento com os logs do dia e registra no índice"""
+        rows = day_qs.order_by("pk").values(*EXPORT_FIELDS)
+
+        entry = None
+        count = 0
+        actors, content_types, boundaries = set(), set(), []
+        first_created = last_created = None
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, f".segment-{day:%Y%m%d}.tmp")
+
+        # Cursor do lado do servidor precisa de transação (pgbouncer em modo transação)
+        with transaction.atomic(using=self.using), open(tmp_path, "wb") as raw:
+            with io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="wb"), encoding="utf-8") as fh:
+                for row in rows.iterator(chunk_size=self.chunk_size):
+                    record = _to_record(row)
+                    if count % self.batch_size == 0:
+                        boundaries.append(record["id"])
+                    if entry is None:
+                        entry = {"first_id": record["id"]}
+                        first_created = record["created_at"]
+                    last_created = record["created_at"]
+                    entry["last_id"] = record["id"]
+                    if record["actor_id"] is not None:
+                        actors.add(record["actor_id"])
+                    if record["content_type"]:
+                        content_types.add(record["content_type"])
+                    fh.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False))
+                    fh.write("\n")
+                    count += 1
+            # Garante o segmento em disco antes de qualquer exclusão no banco
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        if entry is None:
+            os.remove(tmp_path)
+            return None
+
+        filename = f"activitylog-{day:%Y-%m-%d}-{entry['first_id']:012d}.jsonl.gz"
+        os.replace(tmp_path, os.path.join(self.directory, filename))
+
+        entry.update({
+            "file": filename,
+            "date": day.date().isoformat(),
+            "from": first_created.isoformat(),
+            "to": last_created.isoformat(),
+            "count": count,
+            "actors": sorted(actors),
+            "content_types": sorted(content_types),
+            "boundaries": boundaries,
+        })
+
+        # Uma entrada por arquivo: rearquivar o mesmo dia (ex.: após uma
+        # exclusão interrompida) substitui a entrada anterior
+        index = load_index(self.directory)
+        index["segments"] = [s for s in index["segments"] if s["file"] != filename]
+        index["segments"].append({k: v for k, v in entry.items() if k != "boundaries"})
+        save_index(self.directory, index)
+        return entry
+
+    def _delete_written(self, day_qs, boundaries, last_id):
+        """Exclui do banco apenas o que foi gravado, em lotes por faixa de pk"""
+        edges = boundaries + [last_id + 1]
+        for low, high in zip(edges, edges[1:]):
+            with transaction.atomic(using=self.using):
+                day_qs.filter(pk__gte=low, pk__lt=high).delete()
+
+
+class ArchiveReader:
+    """
+    Consulta o histórico arquivado sem tocar no banco
+
+    Exemplo:
+        reader = ArchiveReader()
+        for log in reader.history(content_type="pages.contract", object_id=42):
+            ...
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_archive_dir()
+
+    def segments(self, date_from=None, date_to=None, actor_id=None, content_type=None):
+        """Segmentos do índice que podem conter registros do filtro"""
+        for segment in load_index(self.directory)["segments"]:
+            if date_from and parse_datetime(segment["to"]) < date_from:
+                continue
+            if date_to and parse_datetime(segment["from"]) >= date_to:
+                continue
+            if actor_id is not None and actor_id not in segment["actors"]:
+                continue
+            if content_type and content_type not in segment["content_types"]:
+                continue
+            yield segment
+
+    def history(self, content_type=None, object_id=None, actor_id=None,
+                date_from=None, date_to=None):
+        """
+        Registros arquivados que atendem aos filtros, em ordem cronológica
+
+        Args:
+            content_type: "app_label.model" (ex.: "pages.contract")
+            object_id: id do objeto alvo
+            actor_id: id do usuário que executou a ação
+            date_from/date_to: datetimes (com timezone) [date_from, date_to)
+        """
+        content_type = content_type.lower() if content_type else None
+        object_id = str(object_id) if object_id is not None else None
+        matched = self.segments(date_from, date_to, actor_id, content_type)
+
+        for segment in sorted(matched, key=lambda s: (s["from"], s["first_id"])):
+            path = os.path.join(self.directory, segment["file"])
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    record = json.loads(line)
+                    if content_type and record["content_type"] != content_type:
+                        continue
+                    if object_id is not None and str(record["object_id"]) != object_id:
+                        continue
+                    if actor_id is not None and record["actor_id"] != actor_id:
+                        continue
+                    created_at = parse_datetime(record["created_at"])
+                    if date_from and created_at < date_from:
+                        continue
+                    if date_to and created_at >= date_to:
+                        continue
+                    yield record
@@ -0,0 +1,164 @@
+"""
+Reconstrução de objetos auditados em um ponto do tempo
+
+Cada objeto tem, no ActivityLog, snapshots completos (campo state) na
+criação, na exclusão e a cada AUDIT_SNAPSHOT_EVERY alterações contadas
+por processo (ver auditoria.signals.checkpoint_due). Para saber como o
+objeto estava em um instante, partimos do último snapshot até esse
+instante e reaplicamos os diffs seguintes: em geral até N, e até
+workers × N quando vários processos alteram o mesmo objeto. O custo não
+cresce com o tamanho do histórico, e os diffs são lidos em blocos
+(iterator), sem supor um limite.
+
+Objetos com histórico anterior aos snapshots são reconstruídos de trás
+para frente: a partir do próximo snapshot (ou da linha atual no banco),
+desfazendo os diffs até o instante pedido.
+
+Exemplo:
+    from auditoria.history import reconstruct, diff_between
+    contrato = reconstruct(Contract, 42, at=datetime(2025, 1, 1, tzinfo=...))
+    mudancas = diff_between(Contract, 42, inicio, fim)
+"""
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import ActivityLog
+from .signals import MONITORED_MODELS, diff_instances, serialize_state, snapshot_instance
+
+# Logs lidos por vez ao reaplicar/desfazer diffs
+REPLAY_CHUNK_SIZE = 500
+
+
+def get_monitored_model(label):
+    """
+    Modelo auditado a partir de "app_label.model" (ex.: "pages.contract")
+
+    Raises:
+        LookupError: se o modelo não existe ou não é auditado
+    """
+    try:
+        model = apps.get_model(label)
+    except ValueError:
+        raise LookupError(label)
+    if model not in MONITORED_MODELS:
+        raise LookupError(label)
+    return model
+
+
+def _object_logs(model, pk):
+    ct = ContentType.objects.get_for_model(model)
+    return ActivityLog.objects.filter(content_type=ct, object_id=pk)
+
+
+def _after(log):
+    """Logs posteriores a log na ordem (created_at, id)"""
+    return Q(created_at__gt=log.created_at) | Q(created_at=log.created_at, id__gt=log.id)
+
+
+def _apply(state, changes, index):
+    """Aplica um diff {campo: [antigo, novo]} (index 1 = refaz, 0 = desfaz)"""
+    for field, values in (changes or {}).items():
+        state[field] = values[index]
+    return state
+
+
+def state_at(model, pk, at):
+    """
+    Estado (dict campo -> valor em texto) do objeto no instante at
+
+    Returns:
+        dict ou None: None se o objeto não existia em at
+    """
+    logs = _object_logs(model, pk).only("id", "created_at", "action", "changes", "state")
+
+    # 1) Último snapshot até at + diffs seguintes (normalmente até N)
+    checkpoint = (
+        logs.filter(created_at__lte=at, state__isnull=False)
+        .order_by("-created_at", "-id").first()
+    )
+    if checkpoint is not None:
+        if checkpoint.action == "delete":
+            return None
+        state = dict(checkpoint.state)
+        replay = logs.filter(_after(checkpoint), created_at__lte=at).order_by("created_at", "id")
+        for log in replay.iterator(chunk_size=REPLAY_CHUNK_SIZE):
+            if log.action == "delete":
+                return None
+            if log.action == "update":
+                _apply(state, log.changes, 1)
+        return state
+
+    # 2) Sem snapshot anterior: desfaz a partir do próximo snapshot ou do banco
+    if logs.filter(created_at__gt=at, action="create").exists():
+        return None
+
+    base = (
+        logs.filter(created_at__gt=at, state__isnull=False)
+        .order_by("created_at", "id").first()
+    )
+    if base is not None:
+        state = dict(base.state)
+        if base.action == "update":
+            # O snapshot já inclui o diff do próprio log
+            _apply(state, base.changes, 0)
+        undo = logs.filter(created_at__gt=at).exclude(_after(base)).exclude(pk=base.pk)
+    else:
+        current = model._default_manager.filter(pk=pk).first()
+        if current is None:
+            return None
+        state = serialize_state(snapshot_instance(current))
+        undo = logs.filter(created_at__gt=at)
+
+    undo = undo.filter(action="update").order_by("-created_at", "-id")
+    for log in undo.iterator(chunk_size=REPLAY_CHUNK_SIZE):
+        _apply(state, log.changes, 0)
+    return state
+
+
+def build_instance(model, state):
+    """Monta uma instância (não salva) do modelo a partir de um estado"""
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.name not in state:
+            continue
+        raw = state[field.name]
+        try:
+            values[field.attname] = field.to_python(raw) if raw is not None else None
+        except ValidationError:
+            values[field.attname] = raw
+    return model(**values)
+
+
+def reconstruct(model, pk, at):
+    """
+    Objeto como estava no instante at
+
+    Returns:
+        Instância não salva do modelo, ou None se o objeto não existia
+    """
+    if model not in MONITORED_MODELS:
+        raise ValueError(f"{model._meta.label} não é auditado")
+    state = state_at(model, pk, at)
+    return build_instance(model, state) if state is not None else None
+
+
+def diff_between(model, pk, start, end):
+    """
+    Diferenças do objeto entre dois instantes
+
+    Returns:
+        dict: {campo: [valor_em_start, valor_em_end]} (None se não existia)
+    """
+    if model not in MONITORED_MODELS:
+        raise ValueError(f"{model._meta.label} não é auditado")
+    old = state_at(model, pk, start)
+    new = state_at(model, pk, end)
+    if old is None and new is None:
+        return {}
+
+    fields = set(old or {}) | set(new or {})
+    old = {field: (old or {}).get(field) for field in fields}
+    new = {field: (new or {}).get(field) for field in fields}
+    return diff_instances(old, new, exclude=MONITORED_MODELS[model]["exclude"]) or {}
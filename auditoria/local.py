@@ -1,23 +1,35 @@
 """
-Thread-local storage para capturar informações da requisição atual
+Requisição atual em uma ContextVar (usada pelos signals de auditoria)
+
+Com threading.local, requisições atendidas na mesma thread (ASGI, views
+assíncronas) veriam a requisição uma da outra e os logs sairiam com o ator
+ou o IP errado. Cada requisição roda no seu próprio contexto (contextvars):
+no WSGI equivale a um valor por thread; no ASGI, um valor por tarefa
+asyncio, copiado para as threads do sync_to_async.
 """
-import threading
+from contextvars import ContextVar
 
-# Storage thread-local para a requisição atual
-_local = threading.local()
+_current_request = ContextVar("auditoria_current_request", default=None)
 
 
 def set_current_request(request):
-    """Define a requisição atual no thread-local"""
-    _local.request = request
+    """
+    Define a requisição atual
+
+    Returns:
+        Token: para restaurar o valor anterior em clear_current_request
+    """
+    return _current_request.set(request)
 
 
 def get_current_request():
-    """Obtém a requisição atual do thread-local"""
-    return getattr(_local, "request", None)
+    """Obtém a requisição atual (ou None)"""
+    return _current_request.get()
 
 
-def clear_current_request():
-    """Limpa a requisição atual do thread-local"""
-    if hasattr(_local, "request"):
-        del _local.request
\ No newline at end of file
+def clear_current_request(token=None):
+    """Limpa a requisição atual (restaura o valor anterior se receber o token)"""
+    if token is not None:
+        _current_request.reset(token)
+    else:
+        _current_request.set(None)
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from auditoria.archive import ArchiveReader
+
+
+class Command(BaseCommand):
+    """
+    Consulta o histórico arquivado (segmentos .jsonl.gz) sem acessar o banco
+    
+    Uso:
+    python manage.py activity_log_history --content-type pages.contract --object-id 42
+    python manage.py activity_log_history --actor 5 --from 2024-01-01 --to 2024-06-30
+    """
+    
+    help = 'Lista logs arquivados por objeto, usuário e período'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help='Diretório dos segmentos (padrão: AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--content-type', help='Tipo do objeto no formato app_label.model')
+        parser.add_argument('--object-id', help='ID do objeto')
+        parser.add_argument('--actor', type=int, help='ID do usuário que executou a ação')
+        parser.add_argument('--from', dest='date_from', help='Data inicial (AAAA-MM-DD, inclusiva)')
+        parser.add_argument('--to', dest='date_to', help='Data final (AAAA-MM-DD, inclusiva)')
+        parser.add_argument('--json', action='store_true', help='Saída em JSONL (um registro por linha)')
+    
+    def _parse_day(self, value, name):
+        if not value:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'❌ Data inválida em {name}: {value}')
+        return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    
+    def handle(self, *args, **options):
+        if options['object_id'] and not options['content_type']:
+            raise CommandError('❌ --object-id exige --content-type')
+        
+        date_from = self._parse_day(options['date_from'], '--from')
+        date_to = self._parse_day(options['date_to'], '--to')
+        if date_to:
+            # --to é inclusivo: vai até o fim do dia
+            date_to += timedelta(days=1)
+        
+        reader = ArchiveReader(options['dir'])
+        records = reader.history(
+            content_type=options['content_type'],
+            object_id=options['object_id'],
+            actor_id=options['actor'],
+            date_from=date_from,
+            date_to=date_to,
+        )
+        
+        total = 0
+        for record in records:
+            total += 1
+            if options['json']:
+                self.stdout.write(json.dumps(record, ensure_ascii=False))
+                continue
+            self.stdout.write(
+                f"{record['created_at']} | {record['action']:<6} | "
+                f"usuário={record['actor_id']} | {record['content_type']}#{record['object_id']} | "
+                f"{record['object_repr']}"
+            )
+        
+        if not options['json']:
+            self.stdout.write(f'ℹ️ {total} registro(s) encontrado(s)')
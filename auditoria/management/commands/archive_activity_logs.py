@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria.archive import ArchiveWriter, default_archive_dir
+
+
+class Command(BaseCommand):
+    """
+    Arquiva logs de auditoria antigos em segmentos JSONL comprimidos (LGPD)
+    
+    Uso (agendar via cron, ex.: semanalmente):
+    python manage.py archive_activity_logs
+    python manage.py archive_activity_logs --older-than-days 180 --dir /mnt/auditoria
+    python manage.py archive_activity_logs --dry-run
+    """
+    
+    help = 'Move logs antigos do ActivityLog para arquivos .jsonl.gz com índice'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int,
+            default=getattr(settings, 'AUDIT_ARCHIVE_AFTER_DAYS', 365),
+            help='Arquiva logs mais antigos que N dias (padrão: AUDIT_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument(
+            '--dir', default=None,
+            help='Diretório dos segmentos (padrão: AUDIT_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Registros excluídos do banco por transação (padrão: 5000)'
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Grava os segmentos mas mantém os registros no banco'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas mostra quantos logs seriam arquivados por dia'
+        )
+    
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if days < 1:
+            raise CommandError('❌ --older-than-days deve ser maior que zero')
+        
+        # Corte sempre no início de um dia UTC: cada segmento cobre um dia inteiro
+        now = datetime.now(dt_timezone.utc) - timedelta(days=days)
+        cutoff = datetime(now.year, now.month, now.day, tzinfo=dt_timezone.utc)
+        directory = options['dir'] or default_archive_dir()
+        
+        self.stdout.write(self.style.SUCCESS('📦 ARQUIVAMENTO DO LOG DE AUDITORIA'))
+        self.stdout.write('=' * 50)
+        self.stdout.write(f'ℹ️ Logs anteriores a {cutoff:%d/%m/%Y} (UTC) → {directory}')
+        
+        writer = ArchiveWriter(directory, batch_size=options['batch_size'])
+        segments = writer.archive_before(
+            cutoff, delete=not options['keep'], dry_run=options['dry_run']
+        )
+        
+        if not segments:
+            self.stdout.write('ℹ️ Nenhum log para arquivar')
+            return
+        
+        total = 0
+        for segment in segments:
+            total += segment['count']
+            if options['dry_run']:
+                self.stdout.write(f"🔍 [dry-run] {segment['date']}: {segment['count']} logs")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {segment['file']}: {segment['count']} logs"
+                ))
+        
+        self.stdout.write('=' * 50)
+        if options['dry_run']:
+            self.stdout.write(f'🔍 Total que seria arquivado: {total}')
+        elif options['keep']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} logs arquivados (mantidos no banco)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} logs arquivados e removidos do banco'))
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from auditoria import partitions
+
+
+class Command(BaseCommand):
+    """
+    Manutenção das partições mensais da tabela de auditoria (PostgreSQL)
+    
+    Uso (agendar via cron, ex.: diariamente):
+    python manage.py manage_activitylog_partitions
+    python manage.py manage_activitylog_partitions --months-ahead 6 --retention-months 24
+    python manage.py manage_activitylog_partitions --drop --dry-run
+    """
+    
+    help = 'Cria partições futuras do ActivityLog e desanexa/exclui as expiradas'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help='Quantos meses futuros devem ter partição pronta (padrão: 3)'
+        )
+        parser.add_argument(
+            '--retention-months', type=int,
+            default=getattr(settings, 'AUDIT_RETENTION_MONTHS', 0),
+            help='Meses mantidos na tabela; 0 desativa a expiração (padrão: AUDIT_RETENTION_MONTHS)'
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help='Exclui as partições expiradas em vez de apenas desanexá-las'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas mostra o que seria feito'
+        )
+    
+    def handle(self, *args, **options):
+        if not partitions.is_supported(connection):
+            self.stdout.write(self.style.WARNING('ℹ️ Particionamento disponível apenas no PostgreSQL'))
+            return
+        if not partitions.is_partitioned(connection):
+            raise CommandError('❌ Tabela de auditoria não está particionada (rode as migrações)')
+        
+        dry_run = options['dry_run']
+        now = datetime.now(dt_timezone.utc)
+        
+        self.stdout.write(self.style.SUCCESS('🗂️ PARTIÇÕES DO LOG DE AUDITORIA'))
+        self.stdout.write('=' * 50)
+        
+        # 1) Partições futuras
+        existing = {name for name, _ in partitions.list_partitions(connection)}
+        month = partitions.month_start(now)
+        last = partitions.add_months(month, options['months_ahead'])
+        while month <= last:
+            name = partitions.partition_name(month)
+            if name not in existing and dry_run:
+                self.stdout.write(f'🔍 [dry-run] Partição seria criada: {name}')
+            elif name not in existing:
+                name, moved = partitions.create_month_partition(month, connection)
+                self.stdout.write(self.style.SUCCESS(f'✅ Partição criada: {name}'))
+                if moved:
+                    self.stdout.write(f'ℹ️ {moved} logs movidos da partição DEFAULT para {name}')
+            month = partitions.add_months(month, 1)
+        
+        # 2) Partições expiradas
+        retention = options['retention_months']
+        if retention <= 0:
+            self.stdout.write('ℹ️ Retenção desativada: nenhuma partição expirada')
+            return
+        
+        expired = partitions.expired_partitions(retention, connection, now=now)
+        if not expired:
+            self.stdout.write(f'ℹ️ Nenhuma partição com mais de {retention} meses')
+        
+        for name, _ in expired:
+            if dry_run:
+                action = 'excluída' if options['drop'] else 'desanexada'
+                self.stdout.write(f'🔍 [dry-run] {name} seria {action}')
+                continue
+            
+            with transaction.atomic():
+                partitions.detach_partition(name, connection)
+                if options['drop']:
+                    partitions.drop_partition(name, connection)
+            
+            if options['drop']:
+                self.stdout.write(self.style.WARNING(f'🗑️ Partição excluída: {name}'))
+            else:
+                self.stdout.write(self.style.WARNING(f'📦 Partição desanexada: {name} (tabela mantida)'))
@@ -1,27 +1,72 @@
 """
 Middleware para capturar informações da requisição e disponibilizar
-globalmente via thread-local storage
+globalmente via ContextVar (auditoria.local)
 """
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
 from .local import set_current_request, clear_current_request
+from .utils import BUFFER_ATTR, flush_audit_buffer
+
+logger = logging.getLogger(__name__)
 
 
 class RequestStoreMiddleware:
     """
-    Middleware que armazena a requisição atual em thread-local
-    para ser acessada pelos signals de auditoria
+    Middleware que armazena a requisição atual (ContextVar)
+    para ser acessada pelos signals de auditoria.
+
+    Também mantém o buffer de logs da requisição, gravado com um único
+    bulk_create ao final.
+
+    Funciona em WSGI e em ASGI: com uma cadeia assíncrona a requisição não
+    passa para uma thread só para este middleware.
     """
-    
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        # Armazena a requisição no contexto atual
+        token = set_current_request(request)
+        setattr(request, BUFFER_ATTR, [])
+        return token
+
+    def _finish(self, request):
+        # Grava os logs acumulados (um round trip só)
+        try:
+            flush_audit_buffer(request)
+        except Exception:
+            logger.exception("Falha ao gravar logs de auditoria da requisição")
+
+        # Remove o buffer: logs posteriores (ex.: streaming) gravam direto
+        delattr(request, BUFFER_ATTR)
 
     def __call__(self, request):
-        # Armazena a requisição no thread-local
-        set_current_request(request)
-        
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = self._start(request)
         try:
             # Processa a requisição
             response = self.get_response(request)
             return response
         finally:
-            # Limpa o thread-local após processar
-            clear_current_request()
\ No newline at end of file
+            self._finish(request)
+
+            # Limpa o contexto após processar
+            clear_current_request(token)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            # A gravação usa o ORM (síncrono)
+            await sync_to_async(self._finish)(request)
+            clear_current_request(token)
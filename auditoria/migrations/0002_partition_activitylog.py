@@ -0,0 +1,99 @@
+# Particionamento mensal da tabela de auditoria (apenas PostgreSQL)
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+from auditoria import partitions
+
+# Meses futuros criados já na migração
+MONTHS_AHEAD = 3
+
+
+def _recreate_indexes_and_fks(schema_editor, model):
+    """Recria índices (Meta.indexes + FKs) e FKs na tabela (pai propaga p/ partições)"""
+    for sql in schema_editor._model_indexes_sql(model):
+        schema_editor.execute(sql)
+    for field in model._meta.local_fields:
+        if field.remote_field and field.db_constraint:
+            schema_editor.execute(
+                schema_editor._create_fk_sql(model, field, "_fk_%(to_table)s_%(to_column)s")
+            )
+
+
+def partition_activitylog(apps, schema_editor):
+    """
+    Converte auditoria_activitylog em tabela particionada por mês (created_at)
+
+    A PK física passa a ser (id, created_at), exigência do PostgreSQL para
+    tabelas particionadas; o Django continua usando id como pk.
+    """
+    connection = schema_editor.connection
+    if not partitions.is_supported(connection) or partitions.is_partitioned(connection):
+        return
+
+    ActivityLog = apps.get_model('auditoria', 'ActivityLog')
+    table = ActivityLog._meta.db_table
+    legacy = f'{table}_legacy'
+    seq = f'{table}_part_id_seq'
+    execute = schema_editor.execute
+
+    execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    execute(f'ALTER TABLE "{legacy}" RENAME CONSTRAINT "{table}_pkey" TO "{legacy}_pkey"')
+
+    execute(f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+    execute(f'CREATE SEQUENCE "{seq}" OWNED BY "{table}".id')
+    execute(f'ALTER TABLE "{table}" ALTER COLUMN id SET DEFAULT nextval(\'"{seq}"\')')
+    execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, created_at)')
+
+    # Partições do mês mais antigo até MONTHS_AHEAD meses à frente + DEFAULT
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(created_at) FROM "{legacy}"')
+        oldest = cursor.fetchone()[0] or datetime.now(dt_timezone.utc)
+    partitions.ensure_partitions(oldest, MONTHS_AHEAD, connection)
+    execute(f'CREATE TABLE "{partitions.DEFAULT_PARTITION}" PARTITION OF "{table}" DEFAULT')
+
+    execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+    execute(f'SELECT setval(\'"{seq}"\', COALESCE((SELECT MAX(id) FROM "{table}"), 0) + 1, false)')
+    execute(f'DROP TABLE "{legacy}"')
+
+    _recreate_indexes_and_fks(schema_editor, ActivityLog)
+
+
+def unpartition_activitylog(apps, schema_editor):
+    """Volta para uma tabela comum (heap única) com os mesmos dados"""
+    connection = schema_editor.connection
+    if not partitions.is_partitioned(connection):
+        return
+
+    ActivityLog = apps.get_model('auditoria', 'ActivityLog')
+    table = ActivityLog._meta.db_table
+    partitioned = f'{table}_partitioned'
+    execute = schema_editor.execute
+
+    execute(f'ALTER TABLE "{table}" RENAME TO "{partitioned}"')
+    execute(f'ALTER TABLE "{partitioned}" RENAME CONSTRAINT "{table}_pkey" TO "{partitioned}_pkey"')
+
+    execute(f'CREATE TABLE "{table}" (LIKE "{partitioned}")')
+    execute(f'ALTER TABLE "{table}" ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+    execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id)')
+
+    execute(f'INSERT INTO "{table}" SELECT * FROM "{partitioned}"')
+    execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+        f'COALESCE((SELECT MAX(id) FROM "{table}"), 0) + 1, false)'
+    )
+    execute(f'DROP TABLE "{partitioned}" CASCADE')
+
+    _recreate_indexes_and_fks(schema_editor, ActivityLog)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_activitylog, unpartition_activitylog),
+    ]
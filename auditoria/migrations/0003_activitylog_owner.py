@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-18 15:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import BigIntegerField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+# Campo que identifica o dono nos modelos auditados
+OWNER_FIELD = 'usuario'
+
+
+def backfill_owner(apps, schema_editor):
+    """Preenche owner dos logs existentes a partir do campo usuario do alvo"""
+    ActivityLog = apps.get_model('auditoria', 'ActivityLog')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    for model in apps.get_models():
+        field_names = {f.name for f in model._meta.concrete_fields}
+        if OWNER_FIELD not in field_names:
+            continue
+        ct = ContentType.objects.filter(
+            app_label=model._meta.app_label, model=model._meta.model_name
+        ).first()
+        if ct is None:
+            continue
+        owner = model.objects.filter(
+            pk=Cast(OuterRef('object_id'), BigIntegerField())
+        ).values(f'{OWNER_FIELD}_id')[:1]
+        ActivityLog.objects.filter(
+            content_type=ct, owner__isnull=True, object_id__regex=r'^[0-9]+$'
+        ).update(owner_id=Subquery(owner))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0002_partition_activitylog'),
+        ('pages', '0009_company_consent_date'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='owned_activities', to=settings.AUTH_USER_MODEL, verbose_name='Dono do Objeto'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['owner', '-created_at'], name='auditoria_a_owner_i_521097_idx'),
+        ),
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+    ]
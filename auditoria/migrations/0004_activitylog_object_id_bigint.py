@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 16:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_non_numeric_ids(apps, schema_editor):
+    """Zera object_id não numéricos antes da conversão para bigint"""
+    ActivityLog = apps.get_model('auditoria', 'ActivityLog')
+    ActivityLog.objects.filter(object_id__isnull=False).exclude(
+        object_id__regex=r'^[0-9]{1,18}$'
+    ).update(object_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0003_activitylog_owner'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_non_numeric_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='activitylog',
+            name='object_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='ID do Objeto'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['content_type', 'object_id', '-created_at'], name='auditoria_a_content_a18a60_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0004_activitylog_object_id_bigint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='state',
+            field=models.JSONField(blank=True, help_text='Estado completo do objeto neste ponto do histórico', null=True, verbose_name='Snapshot'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.contrib.contenttypes.models import ContentType
+from django.urls import reverse
+
+from .models import ActivityLog
+from .pagination import KeysetPaginator
+
+
+class ObjectHistoryMixin:
+    """
+    Adiciona ao contexto de uma DetailView o histórico de auditoria do objeto
+    
+    Usa o índice (content_type, object_id, created_at) e paginação por chave:
+    cada página custa o mesmo, independente do tamanho do histórico.
+    O template inclui "auditoria/object_history.html".
+    """
+    history_paginate_by = 10
+    history_cursor_param = 'historico'
+    
+    def get_history_queryset(self):
+        ct = ContentType.objects.get_for_model(self.object.__class__)
+        return ActivityLog.objects.filter(
+            content_type=ct, object_id=self.object.pk
+        ).select_related('actor')
+    
+    def get_history_page(self):
+        """Página do histórico (calculada uma vez; a view pode antecipá-la)"""
+        if not hasattr(self, '_history_page'):
+            paginator = KeysetPaginator(
+                self.history_paginate_by, param=self.history_cursor_param
+            )
+            self._history_page = paginator.paginate(self.get_history_queryset(), self.request)
+        return self._history_page
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['history_page'] = self.get_history_page()
+        context['history_diff_url'] = reverse(
+            'auditoria:object-diff', args=[self.object._meta.label_lower, self.object.pk]
+        )
+        return context
@@ -27,6 +27,18 @@ class ActivityLog(models.Model):
         verbose_name="Usuário"
     )
     
+    # Dono do objeto afetado (campo "usuario" do alvo), gravado junto com o log
+    # para filtrar "Meus logs" por índice em vez de buscar texto em object_repr
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="owned_activities",
+        db_index=False,
+        verbose_name="Dono do Objeto"
+    )
+    
     # Que ação foi feita
     action = models.CharField(
         max_length=20, 
@@ -42,8 +54,8 @@ class ActivityLog(models.Model):
         on_delete=models.SET_NULL,
         verbose_name="Tipo de Objeto"
     )
-    object_id = models.CharField(
-        max_length=64, 
+    # Inteiro (como as pks dos modelos) para indexar/juntar sem conversões
+    object_id = models.BigIntegerField(
         null=True, 
         blank=True,
         verbose_name="ID do Objeto"
@@ -65,6 +77,16 @@ class ActivityLog(models.Model):
         help_text="JSON com as mudanças realizadas"
     )
     
+    # Estado completo do objeto (gravado na criação, na exclusão e a cada
+    # AUDIT_SNAPSHOT_EVERY alterações contadas por processo) - ponto de
+    # partida da reconstrução
+    state = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Snapshot",
+        help_text="Estado completo do objeto neste ponto do histórico"
+    )
+    
     # Metadados da requisição
     ip = models.GenericIPAddressField(
         null=True, 
@@ -90,8 +112,10 @@ class ActivityLog(models.Model):
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['actor', '-created_at']),
+            models.Index(fields=['owner', '-created_at']),
             models.Index(fields=['action', '-created_at']),
             models.Index(fields=['content_type', '-created_at']),
+            models.Index(fields=['content_type', 'object_id', '-created_at']),
         ]
 
     def __str__(self):
@@ -0,0 +1,227 @@
+"""
+Paginação por chave (keyset / seek) para listas com ordenação estável
+
+Em vez de OFFSET + COUNT (que percorrem todas as linhas anteriores), cada
+página continua a partir da chave de ordenação do último (ou do primeiro)
+registro da página anterior:
+
+    WHERE (created_at, id) < (cursor) ORDER BY created_at DESC, id DESC LIMIT n
+
+usando o mesmo índice da ordenação. O custo de abrir a página 1 ou a
+página 10.000 é o mesmo. A chave vai na URL como um cursor opaco
+(?cursor=...), então os filtros do GET e o escopo por usuário continuam
+valendo: o cursor só diz onde continuar.
+
+Usada pelo log de atividades, pelo histórico dos objetos e pelas listas do
+pages. Quando um filtro troca a ordenação (ex.: busca por relevância), o
+KeysetPaginationMixin volta para a paginação por número de página.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Parâmetro GET que carrega o cursor
+CURSOR_PARAM = "cursor"
+
+# Direção do cursor: próxima página (após o último) ou anterior (antes do primeiro)
+NEXT, PREVIOUS = "n", "p"
+
+
+def encode_cursor(direction, values):
+    """Cursor opaco (base64 de JSON) com a direção e os valores da chave"""
+    values = [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+    raw = json.dumps([direction, values], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Returns:
+        tuple: (direção, valores em JSON)
+
+    Raises:
+        ValueError: cursor inválido
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError, UnicodeDecodeError) as error:
+        raise ValueError(f"cursor inválido: {error}")
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise ValueError("cursor inválido")
+    return direction, values
+
+
+class KeysetPage:
+    """
+    Página com a interface dos templates (has_next, has_previous...)
+
+    next_query, previous_query e first_query são as querystrings das outras
+    páginas, com os filtros atuais do GET.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, querydict, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._querydict = querydict
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _query(self, cursor):
+        params = self._querydict.copy()
+        params.pop(self.paginator.param, None)
+        params.pop("page", None)
+        if cursor:
+            params[self.paginator.param] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query(self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self._query(self.previous_cursor)
+
+    @property
+    def first_query(self):
+        return self._query(None)
+
+
+class KeysetPaginator:
+    """
+    Pagina um queryset por uma ordenação única e estável (sem COUNT)
+
+    Args:
+        per_page: itens por página
+        ordering: campos do próprio modelo; o último deve ser único (ex.: "-id", "pk")
+        param: parâmetro GET do cursor (permite mais de uma lista por página)
+    """
+    count = None
+    num_pages = None
+
+    def __init__(self, per_page, ordering=("-created_at", "-id"), param=CURSOR_PARAM):
+        self.per_page = per_page
+        self.param = param
+        self.ordering = tuple(ordering)
+        self.keys = [(name.lstrip("-"), name.startswith("-")) for name in self.ordering]
+
+    def encode_cursor(self, obj, direction=NEXT):
+        return encode_cursor(direction, [getattr(obj, name) for name, _ in self.keys])
+
+    def decode_cursor(self, queryset, token):
+        """
+        Direção e valores do cursor convertidos pelos campos do modelo
+
+        Returns:
+            tuple: (direção, valores), ou (NEXT, None) sem cursor ou se inválido
+        """
+        if not token:
+            return NEXT, None
+        opts = queryset.model._meta
+        try:
+            direction, values = decode_cursor(token)
+            if len(values) != len(self.keys):
+                return NEXT, None
+            return direction, [
+                (opts.pk if name == "pk" else opts.get_field(name)).to_python(value)
+                for (name, _), value in zip(self.keys, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            # Cursor adulterado: volta para a primeira página
+            return NEXT, None
+
+    def _seek(self, values, backwards):
+        """
+        Registros depois (ou antes) da chave do cursor
+
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) ..., com k1 >= v1 repetido à parte
+        para o índice limitar o intervalo.
+        """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.keys, values):
+            lookup = "lt" if descending != backwards else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        name, descending = self.keys[0]
+        bound = "lte" if descending != backwards else "gte"
+        return Q(**{f"{name}__{bound}": values[0]}) & condition
+
+    def paginate(self, queryset, request):
+        direction, values = self.decode_cursor(queryset, request.GET.get(self.param))
+
+        # Voltando: ordem invertida a partir do primeiro da página seguinte
+        backwards = direction == PREVIOUS and values is not None
+        queryset = queryset.order_by(*[
+            f"{'-' if descending != backwards else ''}{name}" for name, descending in self.keys
+        ])
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+
+        # Um item a mais indica se existe outra página na direção, sem COUNT
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        # Avançando: há anterior se veio de um cursor; voltando: há próxima
+        has_next = values is not None if backwards else more
+        has_previous = more if backwards else values is not None
+        return KeysetPage(
+            rows,
+            self,
+            request.GET,
+            next_cursor=self.encode_cursor(rows[-1], NEXT) if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], PREVIOUS) if rows and has_previous else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Paginação por chave para ListView/FilterView
+
+    keyset_ordering é a ordenação da lista terminando em um campo único
+    (ex.: ("-created_at", "-id"), ("full_name", "pk")) e deve ter um índice
+    na mesma ordem. Se o queryset chega com outra ordenação (ex.: busca
+    por relevância), usa a paginação por número de página da ListView.
+    """
+    keyset_ordering = ("-created_at", "-id")
+    cursor_param = CURSOR_PARAM
+
+    def uses_keyset(self, queryset):
+        """A ordenação atual do queryset é a da lista (com ou sem o desempate final)?"""
+        if not self.keyset_ordering:
+            return False
+        current = tuple(queryset.query.order_by) or tuple(queryset.model._meta.ordering)
+        return current in (self.keyset_ordering, self.keyset_ordering[:-1])
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.uses_keyset(queryset):
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(page_size, self.keyset_ordering, self.cursor_param)
+        page = paginator.paginate(queryset, self.request)
+        return paginator, page, page.object_list, page.has_other_pages()
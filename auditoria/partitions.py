@@ -0,0 +1,180 @@
+"""
+Particionamento mensal (RANGE em created_at) da tabela de auditoria
+
+Só se aplica ao PostgreSQL. Cada mês fica em uma partição
+auditoria_activitylog_pAAAAMM; uma partição DEFAULT recebe o que cair
+fora das faixas já criadas. O comando manage_activitylog_partitions usa
+estas funções para criar meses futuros e desanexar/excluir os expirados.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection as default_connection, transaction
+
+TABLE = "auditoria_activitylog"
+DEFAULT_PARTITION = f"{TABLE}_default"
+_PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value):
+    """Primeiro instante (UTC) do mês de value"""
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value, months):
+    """Soma meses a um início de mês"""
+    index = value.year * 12 + (value.month - 1) + months
+    return month_start(datetime(index // 12, index % 12 + 1, 1))
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def is_supported(connection=None):
+    connection = connection or default_connection
+    return connection.vendor == "postgresql"
+
+
+def is_partitioned(connection=None):
+    """Verifica se a tabela de auditoria já está particionada"""
+    connection = connection or default_connection
+    if not is_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection=None):
+    """
+    Retorna as partições mensais anexadas
+
+    Returns:
+        list: [(nome, início_do_mês)] em ordem cronológica
+    """
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+            partitions.append((name, datetime(year, month, 1, tzinfo=dt_timezone.utc)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def create_month_partition(month, connection=None):
+    """
+    Cria (se não existir) a partição do mês informado
+
+    Se o mês já tem logs na partição DEFAULT (ex.: o cron atrasou), o
+    PostgreSQL recusa o CREATE ... PARTITION OF. Nesse caso, em uma única
+    transação, a DEFAULT é desanexada, o mês é criado, os logs do mês são
+    movidos para ele e a DEFAULT é anexada de volta. Inserções na tabela
+    esperam o fim da transação (DETACH trava a tabela).
+
+    Returns:
+        tuple: (nome da partição, logs movidos da DEFAULT)
+    """
+    connection = connection or default_connection
+    start = month_start(month)
+    end = add_months(start, 1)
+    name = partition_name(start)
+    bounds = [start, end]
+    create = (
+        f'CREATE TABLE "{name}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s), to_regclass(%s)", [name, DEFAULT_PARTITION])
+        exists, default = cursor.fetchone()
+        if exists:
+            return name, 0
+
+        stranded = False
+        if default:
+            cursor.execute(
+                f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE created_at >= %s AND created_at < %s LIMIT 1',
+                bounds,
+            )
+            stranded = cursor.fetchone() is not None
+        if not stranded:
+            cursor.execute(create)
+            return name, 0
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+        cursor.execute(create)
+        cursor.execute(
+            f'INSERT INTO "{TABLE}" SELECT * FROM "{DEFAULT_PARTITION}" '
+            f"WHERE created_at >= %s AND created_at < %s",
+            bounds,
+        )
+        cursor.execute(
+            f'DELETE FROM "{DEFAULT_PARTITION}" WHERE created_at >= %s AND created_at < %s',
+            bounds,
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+    return name, moved
+
+
+def ensure_partitions(start, months_ahead, connection=None, now=None):
+    """
+    Garante partições do mês de start até now + months_ahead
+
+    Returns:
+        list: nomes das partições garantidas
+    """
+    now = now or datetime.now(dt_timezone.utc)
+    month = month_start(start)
+    last = add_months(month_start(now), months_ahead)
+    names = []
+    while month <= last:
+        names.append(create_month_partition(month, connection)[0])
+        month = add_months(month, 1)
+    return names
+
+
+def expired_partitions(retention_months, connection=None, now=None):
+    """
+    Partições cujo mês inteiro é mais antigo que a retenção
+
+    Returns:
+        list: [(nome, início_do_mês)]
+    """
+    now = now or datetime.now(dt_timezone.utc)
+    cutoff = add_months(month_start(now), -retention_months)
+    return [
+        (name, month)
+        for name, month in list_partitions(connection)
+        if add_months(month, 1) <= cutoff
+    ]
+
+
+def detach_partition(name, connection=None):
+    """Desanexa a partição (a tabela continua existindo, fora das consultas)"""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+
+
+def drop_partition(name, connection=None):
+    """Exclui a partição e seus dados"""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{name}"')
@@ -1,18 +1,72 @@
 """
 Signals para capturar automaticamente ações de CRUD nos modelos
+
+O estado original é capturado quando a instância é carregada do banco
+(post_init), então atualizações não precisam de um SELECT extra para
+calcular o diff.
+
+Os receivers de CRUD são conectados por modelo (sender) em register(),
+chamado pelo AuditoriaConfig.ready; modelos não auditados nem entram
+nestas funções.
 """
-from django.db.models.signals import pre_save, post_save, post_delete
+import copy
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, post_delete, post_init
 from django.dispatch import receiver
 from django.forms.models import model_to_dict
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from .utils import log_action
 from .local import get_current_request
 
-# Lista de modelos que serão monitorados (preenchida no apps.py)
-MONITORED_MODELS = []
+# Modelos monitorados e suas opções (preenchido via register() no apps.py)
+# {ModelClass: {"exclude": (...), "snapshot": bool}}
+MONITORED_MODELS = {}
+
+# Campos nunca comparados no diff
+DEFAULT_EXCLUDE = ("id", "pk", "created_at", "updated_at", "usuario")
+
+# Atributos usados na instância para guardar o estado original
+SNAPSHOT_ATTR = "_audit_snapshot"
+OLD_STATE_ATTR = "_audit_old_state"
+
+# Instâncias com este atributo True não são registradas pelos receivers:
+# quem salvou grava o log por conta própria (ex.: pages.events)
+SKIP_ATTR = "_audit_skip"
 
+# Alterações sem snapshot por objeto ({(modelo, pk): n}), da mais antiga
+# para a mais recente; acima de TRACKED_OBJECTS a mais antiga é descartada.
+# Por processo: ver checkpoint_due
+TRACKED_OBJECTS = 10000
+_pending_changes = OrderedDict()
+_pending_lock = threading.Lock()
 
-def diff_instances(old, new, exclude=("id", "pk", "created_at", "updated_at", "usuario")):
+
+def snapshot_instance(instance):
+    """
+    Retorna os valores atuais dos campos concretos da instância
+    
+    Chaves são os nomes dos campos (FKs guardam o id). Campos adiados
+    (.only()/.defer()) que não foram carregados ficam de fora, sem query.
+    
+    Returns:
+        dict: {campo: valor}
+    """
+    loaded = instance.__dict__
+    state = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname not in loaded:
+            continue
+        value = loaded[field.attname]
+        if isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
+        state[field.name] = value
+    return state
+
+
+def diff_instances(old, new, exclude=DEFAULT_EXCLUDE):
     """
     Compara duas instâncias e retorna as diferenças
     
@@ -27,7 +81,7 @@ def diff_instances(old, new, exclude=("id", "pk", "created_at", "updated_at", "u
     changes = {}
     
     for k, v_old in old.items():
-        if k in exclude:
+        if k in exclude or k not in new:
             continue
             
         v_new = new.get(k)
@@ -42,62 +96,211 @@ def diff_instances(old, new, exclude=("id", "pk", "created_at", "updated_at", "u
     return changes or None
 
 
-@receiver(pre_save)
-def _pre_save_snapshot(sender, instance, **kwargs):
+def serialize_state(state):
     """
-    Captura o estado anterior do objeto antes da atualização
+    Converte um snapshot em dict JSON com valores em texto
+    
+    Mesma convenção do diff (str do valor), então snapshots e diffs são
+    reaplicados da mesma forma na reconstrução (auditoria.history).
     """
-    if sender.__name__ not in MONITORED_MODELS:
-        return
+    return {k: str(v) if v is not None else None for k, v in state.items()}
+
+
+def _checkpoint_key(instance):
+    return (instance._meta.label_lower, instance.pk)
+
+
+def checkpoint_due(instance):
+    """
+    Verifica se a próxima alteração do objeto deve gravar um snapshot completo
+    
+    Conta em memória as alterações desde o último snapshot de cada objeto,
+    sem consultar o banco nem depender do buffer da requisição. O contador
+    é de cada processo, então o intervalo não é estrito:
+    
+    - objeto que o processo não conhece (após reiniciar, ou descartado do
+      contador) recebe um snapshot na primeira alteração;
+    - com vários workers, cada um conta só as alterações que atendeu: o
+      intervalo entre snapshots de um objeto chega a
+      workers × AUDIT_SNAPSHOT_EVERY alterações.
+    
+    A reconstrução (auditoria.history) não depende do intervalo; ele só
+    limita quantos diffs são reaplicados.
+    """
+    every = getattr(settings, "AUDIT_SNAPSHOT_EVERY", 0)
+    if every <= 0:
+        return False
     
+    key = _checkpoint_key(instance)
+    with _pending_lock:
+        pending = _pending_changes.pop(key, None)
+        due = pending is None or pending + 1 >= every
+        _pending_changes[key] = 0 if due else pending + 1
+        if len(_pending_changes) > TRACKED_OBJECTS:
+            _pending_changes.popitem(last=False)
+    return due
+
+
+def reset_checkpoint(instance, deleted=False):
+    """Registra que o objeto acabou de receber um snapshot (criação/exclusão)"""
+    key = _checkpoint_key(instance)
+    with _pending_lock:
+        _pending_changes.pop(key, None)
+        if not deleted:
+            _pending_changes[key] = 0
+            if len(_pending_changes) > TRACKED_OBJECTS:
+                _pending_changes.popitem(last=False)
+
+
+def register(model, exclude=(), snapshot=True):
+    """
+    Conecta os receivers de auditoria apenas para o modelo informado
+    
+    Args:
+        model: Classe do modelo a ser auditado
+        exclude: Campos extras ignorados no diff de atualização
+        snapshot: Se False, não captura estado original (updates são
+            registrados sem diff e sem custo no carregamento)
+    """
+    MONITORED_MODELS[model] = {
+        "exclude": DEFAULT_EXCLUDE + tuple(exclude),
+        "snapshot": snapshot,
+    }
+    
+    uid = f"auditoria:{model._meta.label_lower}"
+    if snapshot:
+        post_init.connect(_post_init_snapshot, sender=model, dispatch_uid=uid)
+        pre_save.connect(_pre_save_snapshot, sender=model, dispatch_uid=uid)
+    post_save.connect(_post_save_log, sender=model, dispatch_uid=uid)
+    post_delete.connect(_post_delete_log, sender=model, dispatch_uid=uid)
+
+
+def _post_init_snapshot(sender, instance, **kwargs):
+    """
+    Captura o estado original quando a instância é construída/carregada
+    """
+    setattr(instance, SNAPSHOT_ATTR, snapshot_instance(instance))
+
+
+def _pre_save_snapshot(sender, instance, **kwargs):
+    """
+    Define o estado anterior do objeto antes da atualização
+    
+    Instâncias carregadas do banco já têm o snapshot do post_init.
+    Instâncias montadas à mão com pk (sem carregar) só têm estado anterior
+    se AUDIT_SNAPSHOT_FALLBACK estiver ativo (SELECT extra, comportamento antigo).
+    """
     # Só captura estado para atualizações (quando já tem PK)
     if not getattr(instance, "pk", None):
         return
     
-    try:
-        old_instance = sender.objects.get(pk=instance.pk)
-        instance.__old_state = model_to_dict(old_instance)
-    except sender.DoesNotExist:
-        instance.__old_state = None
+    if not instance._state.adding:
+        old_state = getattr(instance, SNAPSHOT_ATTR, None)
+    elif getattr(settings, "AUDIT_SNAPSHOT_FALLBACK", False):
+        try:
+            old_state = model_to_dict(sender.objects.get(pk=instance.pk))
+        except sender.DoesNotExist:
+            old_state = None
+    else:
+        old_state = None
+    
+    setattr(instance, OLD_STATE_ATTR, old_state)
 
 
-@receiver(post_save)
-def _post_save_log(sender, instance, created, **kwargs):
-    """
-    Registra criação ou atualização de objetos
+def describe_save(sender, instance, created):
     """
-    if sender.__name__ not in MONITORED_MODELS:
-        return
+    Calcula o que registrar para um save() já executado
     
-    req = get_current_request()
-    user = getattr(req, "user", None) if req else None
+    Atualiza o snapshot da instância (base para o próximo save()).
+    
+    Returns:
+        tuple: (action, changes, state), ou None se não há o que registrar
+    """
+    options = MONITORED_MODELS[sender]
+    new_state = snapshot_instance(instance) if options["snapshot"] else None
     
     if created:
-        # Objeto foi criado
-        log_action(user, "create", instance=instance)
+        # Objeto foi criado (com snapshot completo: início do histórico)
+        state = serialize_state(new_state) if new_state is not None else None
+        if state is not None:
+            reset_checkpoint(instance)
+        result = ("create", None, state)
+    elif new_state is None:
+        # Sem snapshot: registra a atualização sem diff
+        result = ("update", None, None)
     else:
         # Objeto foi atualizado - verificar mudanças
-        old_state = getattr(instance, "__old_state", None)
+        result = None
+        old_state = getattr(instance, OLD_STATE_ATTR, None)
         if old_state:
-            new_state = model_to_dict(instance)
-            changes = diff_instances(old_state, new_state)
+            changes = diff_instances(old_state, new_state, exclude=options["exclude"])
             
             if changes:
-                log_action(user, "update", instance=instance, changes=changes)
+                state = serialize_state(new_state) if checkpoint_due(instance) else None
+                result = ("update", changes, state)
+    
+    if new_state is not None:
+        # O estado salvo passa a ser a base para o próximo save()
+        setattr(instance, SNAPSHOT_ATTR, new_state)
+        setattr(instance, OLD_STATE_ATTR, None)
+    
+    return result
+
+
+def describe_delete(sender, instance):
+    """
+    Estado final (para reconstrução) de um objeto excluído
+    """
+    if MONITORED_MODELS[sender]["snapshot"]:
+        reset_checkpoint(instance, deleted=True)
+        return serialize_state(snapshot_instance(instance))
+    return None
+
+
+def checkpoint_state(sender, instance):
+    """
+    Snapshot de uma atualização registrada fora do save() (UPDATE em lote, upsert)
+    
+    Conta a alteração como describe_save; a instância já deve ter os valores novos.
+    
+    Returns:
+        dict ou None: estado serializado, quando o checkpoint é devido
+    """
+    if not MONITORED_MODELS[sender]["snapshot"] or not checkpoint_due(instance):
+        return None
+    return serialize_state(snapshot_instance(instance))
+
+
+def _post_save_log(sender, instance, created, **kwargs):
+    """
+    Registra criação ou atualização de objetos
+    """
+    if getattr(instance, SKIP_ATTR, False):
+        return
+    
+    result = describe_save(sender, instance, created)
+    if result is None:
+        return
+    
+    req = get_current_request()
+    user = getattr(req, "user", None) if req else None
+    
+    action, changes, state = result
+    log_action(user, action, instance=instance, changes=changes, state=state)
 
 
-@receiver(post_delete)
 def _post_delete_log(sender, instance, **kwargs):
     """
     Registra exclusão de objetos
     """
-    if sender.__name__ not in MONITORED_MODELS:
+    if getattr(instance, SKIP_ATTR, False):
         return
     
     req = get_current_request()
     user = getattr(req, "user", None) if req else None
     
-    log_action(user, "delete", instance=instance)
+    # Último estado do objeto, para reconstruí-lo mesmo depois de excluído
+    log_action(user, "delete", instance=instance, state=describe_delete(sender, instance))
 
 
 @receiver(user_logged_in)
@@ -1,3 +1,381 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User, Group
+from django.urls import reverse
+
+from pages.models import City, Company, State
+from . import partitions, signals
+from .archive import ArchiveReader, ArchiveWriter, load_index
+from .history import diff_between, reconstruct
+from .local import get_current_request, set_current_request, clear_current_request
+from .middleware import RequestStoreMiddleware
+from .models import ActivityLog
+from .pagination import KeysetPaginator
+from .utils import BUFFER_ATTR, build_log, flush_audit_buffer, log_action
+
+
+class AuditBufferTest(TestCase):
+    """
+    Testes para o buffer de logs de auditoria por requisição
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auditor', password='pass123')
+        self.request = RequestFactory().get('/', HTTP_USER_AGENT='tests')
+        self.request.user = self.user
+
+    def tearDown(self):
+        clear_current_request()
+
+    def test_immediate_write_outside_request(self):
+        """Sem requisição (ex.: management command) grava na hora"""
+        log_action(self.user, 'login', object_repr='Login: auditor')
+        self.assertEqual(ActivityLog.objects.filter(action='login').count(), 1)
+
+    def test_buffered_logs_flushed_in_one_insert(self):
+        """Vários logs na requisição custam um único INSERT"""
+        set_current_request(self.request)
+        setattr(self.request, BUFFER_ATTR, [])
+
+        # TestCase roda dentro de uma transação: executa os on_commit
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                log_action(self.user, 'update', object_repr='Contrato')
+        self.assertEqual(ActivityLog.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(flush_audit_buffer(self.request), 3)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityLog.objects.filter(user_agent='tests').count(), 3)
+
+
+class AuditSnapshotTest(TestCase):
+    """
+    Testes para o diff de atualização sem SELECT extra
+    """
+
+    def setUp(self):
+        self.state = State.objects.create(name='Sao Paulo', abbreviation='SP')
+
+    def test_update_diff_without_extra_select(self):
+        """Instância carregada do banco gera diff sem reconsultar o registro"""
+        state = State.objects.get(pk=self.state.pk)
+        state.name = 'São Paulo'
+
+        with CaptureQueriesContext(connection) as ctx:
+            state.save()
+        selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'pages_state' in q['sql']]
+        self.assertEqual(selects, [])
+
+        log = ActivityLog.objects.filter(action='update').get()
+        self.assertEqual(log.changes, {'name': ['Sao Paulo', 'São Paulo']})
+
+    @override_settings(AUDIT_SNAPSHOT_EVERY=2)
+    def test_checkpoint_counts_buffered_changes(self):
+        """Snapshots decididos sem consultar o log, contando os logs ainda no buffer"""
+        request = RequestFactory().get('/')
+        setattr(request, BUFFER_ATTR, [])
+        token = set_current_request(request)
+        try:
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+                for name in ('B', 'C', 'D'):
+                    self.state.name = name
+                    self.state.save()
+        finally:
+            clear_current_request(token)
+        self.assertFalse([q for q in ctx.captured_queries if 'auditoria_activitylog' in q['sql']])
+
+        buffered = getattr(request, BUFFER_ATTR)
+        self.assertEqual([log.state is not None for log in buffered], [False, True, False])
+
+    @override_settings(AUDIT_SNAPSHOT_EVERY=5)
+    def test_unknown_object_gets_snapshot(self):
+        """Objeto fora do contador (outro processo, reinício) ganha snapshot na hora"""
+        self.state.name = 'B'
+        self.state.save()
+        signals._pending_changes.clear()
+        self.state.name = 'C'
+        self.state.save()
+        states = ActivityLog.objects.filter(action='update').order_by('id').values_list('state__name', flat=True)
+        self.assertEqual(list(states), [None, 'C'])
+
+
+class ActivityArchiveTest(TestCase):
+    """
+    Testes para o arquivamento frio em segmentos .jsonl.gz
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.user = User.objects.create_user(username='arquivista', password='pass123')
+        old = datetime(2023, 3, 10, 12, 0, tzinfo=dt_timezone.utc)
+        for action in ('create', 'update', 'delete'):
+            log = log_action(self.user, action, object_repr='Contrato antigo')
+            log.object_id = 42
+            log.save()
+        ActivityLog.objects.update(created_at=old)
+        self.recent = log_action(self.user, 'login', object_repr='Login: arquivista')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_archive_and_read_back(self):
+        """Logs antigos saem do banco e são lidos do segmento pelo índice"""
+        cutoff = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        segments = ArchiveWriter(self.directory, batch_size=2).archive_before(cutoff)
+
+        self.assertEqual([s['count'] for s in segments], [3])
+        self.assertEqual(list(ActivityLog.objects.values_list('pk', flat=True)), [self.recent.pk])
+        self.assertEqual(load_index(self.directory)['segments'][0]['actors'], [self.user.pk])
+
+        reader = ArchiveReader(self.directory)
+        history = list(reader.history(actor_id=self.user.pk))
+        self.assertEqual([r['action'] for r in history], ['create', 'update', 'delete'])
+        self.assertEqual(list(reader.history(actor_id=self.user.pk + 1)), [])
+        self.assertEqual(list(reader.history(date_from=cutoff)), [])
+
+    def test_rearchive_replaces_index_entry(self):
+        """Arquivar o mesmo dia de novo substitui a entrada do índice"""
+        cutoff = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        writer = ArchiveWriter(self.directory)
+        writer.archive_before(cutoff, delete=False)
+        writer.archive_before(cutoff, delete=False)
+
+        segments = load_index(self.directory)['segments']
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(segments[0]['count'], 3)
+
+    def test_dry_run_does_not_create_directory(self):
+        """Simulação não cria o diretório do arquivo"""
+        directory = os.path.join(self.directory, 'novo')
+        segments = ArchiveWriter(directory).archive_before(datetime(2024, 1, 1, tzinfo=dt_timezone.utc), dry_run=True)
+
+        self.assertEqual(segments, [{'date': '2023-03-10', 'count': 3}])
+        self.assertFalse(os.path.exists(directory))
+
+
+class ActivityLogViewTest(TestCase):
+    """
+    Testes para o escopo por dono e a paginação por chave de "Meus logs"
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='pass123')
+        self.other = User.objects.create_user(username='outro', password='pass123')
+        state = State.objects.create(name='Paraná', abbreviation='PR')
+        City.objects.create(name='Curitiba', state=state)
+        self.company = Company.objects.create(
+            corporate_name='Empresa do Dono', cnpj='11.222.333/0001-81', usuario=self.owner
+        )
+
+    def test_owner_filled_at_write_time(self):
+        """Log sobre objeto de outro usuário aparece em "Meus logs" do dono"""
+        log_action(self.other, 'update', instance=self.company, changes={'phone': ['', '1']})
+        self.assertEqual(ActivityLog.objects.filter(owner=self.owner).count(), 2)
+
+        # force_login também registra o login de cada usuário
+        self.client.force_login(self.owner)
+        response = self.client.get('/auditoria/logs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_logs'], 3)
+        self.assertEqual(response.context['user_actions'], 1)
+
+        self.client.force_login(self.other)
+        response = self.client.get('/auditoria/logs/')
+        self.assertEqual(response.context['total_logs'], 2)
+
+    def test_keyset_pagination(self):
+        """Páginas seguem pelo cursor sem repetir nem pular registros"""
+        ActivityLog.objects.all().delete()
+        for i in range(7):
+            log_action(self.owner, 'login', object_repr=f'Login {i}')
+
+        request = RequestFactory().get('/', {'action': 'login'})
+        paginator = KeysetPaginator(3)
+        seen = []
+        while True:
+            page = paginator.paginate(ActivityLog.objects.all(), request)
+            seen.extend(log.pk for log in page)
+            if not page.has_next():
+                break
+            self.assertIn('action=login', page.next_query)
+            request = RequestFactory().get('/?' + page.next_query)
+
+        expected = list(ActivityLog.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+        # Voltando pelo cursor da última página: mesma página anterior, com os filtros
+        self.assertIn('action=login', page.previous_query)
+        back = paginator.paginate(ActivityLog.objects.all(), RequestFactory().get('/?' + page.previous_query))
+        self.assertEqual([log.pk for log in back], expected[3:6])
+        self.assertTrue(back.has_next() and back.has_previous())
+
+
+class ObjectHistoryPanelTest(TestCase):
+    """
+    Testes para o painel de histórico nas telas de detalhe
+    """
+
+    def test_company_detail_shows_own_history(self):
+        user = User.objects.create_user(username='funcionario1', password='pass123')
+        user.groups.add(Group.objects.get_or_create(name='funcionario')[0])
+        company = Company.objects.create(corporate_name='Acme', cnpj='11.222.333/0001-81', usuario=user)
+        other = Company.objects.create(corporate_name='Outra', cnpj='22.333.444/0001-81', usuario=user)
+        company.trade_name = 'Acme Ltda'
+        company.save()
+
+        log = ActivityLog.objects.filter(action='update').get()
+        self.assertEqual(log.object_id, company.pk)
+
+        self.client.force_login(user)
+        response = self.client.get(reverse('company-detail', args=[company.pk]))
+        self.assertEqual(response.status_code, 200)
+        history = [entry.action for entry in response.context['history_page']]
+        self.assertEqual(history, ['update', 'create'])
+        self.assertNotIn(other.pk, [entry.object_id for entry in response.context['history_page']])
+
+
+@override_settings(AUDIT_SNAPSHOT_EVERY=3)
+class PointInTimeTest(TestCase):
+    """
+    Testes para a reconstrução de objetos em um ponto do tempo
+    """
+
+    def setUp(self):
+        self.state = State.objects.create(name='A', abbreviation='AA')
+        for name in 'BCDE':
+            self.state.name = name
+            self.state.save()
+
+        # Um log por dia a partir de t0
+        self.t0 = datetime(2025, 1, 1, 12, 0, tzinfo=dt_timezone.utc)
+        self.moments = []
+        for i, log in enumerate(ActivityLog.objects.order_by('id')):
+            moment = self.t0 + timedelta(days=i)
+            ActivityLog.objects.filter(pk=log.pk).update(created_at=moment)
+            self.moments.append(moment)
+
+    def names_over_time(self):
+        names = []
+        for moment in [self.t0 - timedelta(hours=1)] + self.moments:
+            obj = reconstruct(State, self.state.pk, moment)
+            names.append(obj.name if obj else None)
+        return names
+
+    def test_snapshots_every_n_changes(self):
+        """Criação e a cada N alterações gravam o estado completo"""
+        with_state = list(ActivityLog.objects.order_by('id').values_list('action', 'state__name'))
+        self.assertEqual(
+            [name for _, name in with_state],
+            ['A', None, None, 'D', None],
+        )
+
+    def test_replay_from_snapshots(self):
+        self.assertEqual(self.names_over_time(), [None, 'A', 'B', 'C', 'D', 'E'])
+
+    def test_replay_without_snapshots(self):
+        """Histórico antigo (sem snapshots) é desfeito a partir do banco"""
+        ActivityLog.objects.update(state=None)
+        self.assertEqual(self.names_over_time()[1:], ['A', 'B', 'C', 'D', 'E'])
+
+    def test_replay_longer_than_interval(self):
+        """Intervalo maior que N (vários processos) continua reconstruído"""
+        ActivityLog.objects.filter(action='update').update(state=None)
+        self.assertEqual(self.names_over_time(), [None, 'A', 'B', 'C', 'D', 'E'])
+
+    def test_diff_between(self):
+        changes = diff_between(State, self.state.pk, self.moments[0], self.moments[3])
+        self.assertEqual(changes, {'name': ['A', 'D']})
+
+    def test_diff_view_owner_only(self):
+        """Comparação de datas: admin acessa, usuário sem vínculo não"""
+        admin = User.objects.create_user(username='admin1', password='pass123')
+        admin.groups.add(Group.objects.get_or_create(name='empresa_admin')[0])
+        stranger = User.objects.create_user(username='estranho', password='pass123')
+        url = reverse('auditoria:object-diff', args=['pages.state', self.state.pk])
+        params = {'de': '2025-01-01T12:00', 'ate': '2025-01-06T12:00'}
+
+        self.client.force_login(admin)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['changes']), 1)
+
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(url, params).status_code, 404)
+
+
+class RequestContextIsolationTest(TestCase):
+    """
+    Testes para a requisição atual por contexto (ASGI: várias requisições na mesma thread)
+    """
+
+    async def test_concurrent_async_requests(self):
+        threads = set()
+
+        async def view(request):
+            # Intercala as requisições no mesmo event loop
+            await asyncio.sleep(0.01)
+            threads.add(threading.get_ident())
+            return (get_current_request() is request, build_log(None, 'update', object_repr='x').ip)
+
+        middleware = RequestStoreMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        factory = RequestFactory()
+        requests = [factory.get('/', REMOTE_ADDR=f'10.0.0.{number}') for number in range(1, 6)]
+        results = await asyncio.gather(*(middleware(request) for request in requests))
+
+        self.assertEqual(len(threads), 1)
+        self.assertEqual(results, [(True, f'10.0.0.{number}') for number in range(1, 6)])
+        self.assertIsNone(get_current_request())
+        self.assertFalse(any(hasattr(request, BUFFER_ATTR) for request in requests))
+
+    def test_sync_request_restores_previous_context(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.9')
+        seen = RequestStoreMiddleware(lambda req: get_current_request())(request)
+        self.assertIs(seen, request)
+        self.assertIsNone(get_current_request())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Particionamento só existe no PostgreSQL')
+class PartitionMaintenanceTest(TestCase):
+    """
+    Testes para a criação de partições com logs já na partição DEFAULT
+    """
+
+    def test_month_with_rows_in_default(self):
+        # Mês sem partição: os logs dele caem na DEFAULT (cron atrasado)
+        month = partitions.add_months(partitions.month_start(datetime.now(dt_timezone.utc)), 120)
+        log = ActivityLog.objects.create(action='login', object_repr='atrasado')
+        ActivityLog.objects.filter(pk=log.pk).update(created_at=month + timedelta(days=1))
+
+        name, moved = partitions.create_month_partition(month)
+        self.assertEqual(moved, 1)
+        self.assertEqual(partitions.create_month_partition(month), (name, 0))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{name}"')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute(f'SELECT count(*) FROM "{partitions.DEFAULT_PARTITION}" WHERE id = %s', [log.pk])
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertTrue(ActivityLog.objects.filter(pk=log.pk).exists())
+
+    def test_dry_run_creates_nothing(self):
+        before = partitions.list_partitions(connection)
+        out = StringIO()
+        call_command('manage_activitylog_partitions', '--months-ahead', '130', '--dry-run', stdout=out)
+        self.assertIn('[dry-run] Partição seria criada', out.getvalue())
+        self.assertNotIn('Partição criada', out.getvalue())
+        self.assertEqual(partitions.list_partitions(connection), before)
@@ -5,4 +5,5 @@ app_name = 'auditoria'
 
 urlpatterns = [
     path('logs/', views.ActivityLogListView.as_view(), name='activity-logs'),
+    path('historico/<str:model>/<int:pk>/comparar/', views.ObjectDiffView.as_view(), name='object-diff'),
 ]
\ No newline at end of file
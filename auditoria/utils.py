@@ -1,10 +1,24 @@
 """
 Utilitários para registro de logs de auditoria
+
+Dentro de uma requisição os logs são acumulados em um buffer
+(criado pelo RequestStoreMiddleware) e gravados com um único bulk_create
+ao final da requisição. Fora de uma requisição (management commands,
+shell) a gravação é imediata.
 """
+from functools import partial
+
 from django.contrib.contenttypes.models import ContentType
+from django.db import router, transaction
 from .models import ActivityLog
 from .local import get_current_request
 
+# Atributo da requisição que guarda o buffer de logs pendentes
+BUFFER_ATTR = "_audit_buffer"
+
+# Campo dos modelos auditados que aponta para o usuário dono do registro
+OWNER_FIELD = "usuario"
+
 
 def _meta_from_request():
     """
@@ -12,7 +26,7 @@ def _meta_from_request():
     """
     req = get_current_request()
     if not req:
-        return None, None
+        return None, ""
     
     # Tenta obter o IP real (considerando proxies)
     ip = (
@@ -27,40 +41,101 @@ def _meta_from_request():
     return ip, ua
 
 
-def log_action(actor, action, instance=None, changes=None, object_repr=None):
+def _current_buffer():
+    """Retorna o buffer de logs da requisição atual (ou None)"""
+    return getattr(get_current_request(), BUFFER_ATTR, None)
+
+
+def build_log(actor, action, instance=None, changes=None, object_repr=None, state=None):
     """
-    Registra uma ação no log de auditoria
+    Monta (sem gravar) um registro de auditoria
     
-    Args:
-        actor: Usuário que executou a ação
-        action: Tipo da ação ('create', 'update', 'delete', 'login', 'logout')
-        instance: Instância do objeto afetado (opcional)
-        changes: Dicionário com as mudanças realizadas (opcional)
-        object_repr: Representação textual do objeto (opcional)
+    Usado por log_action e por quem grava os logs em lote junto com outros
+    registros (ex.: pages.events para contratos).
+    
+    Returns:
+        ActivityLog: instância não salva
     """
     ip, ua = _meta_from_request()
     
     # Informações do objeto (se fornecido)
-    ct = obj_id = None
+    ct = obj_id = owner_id = None
     if instance is not None:
         ct = ContentType.objects.get_for_model(instance.__class__)
-        obj_id = str(getattr(instance, "pk", None))
+        obj_id = getattr(instance, "pk", None)
+        owner_id = getattr(instance, f"{OWNER_FIELD}_id", None)
         if not object_repr:
             object_repr = str(instance)
     
-    # Cria o log
-    ActivityLog.objects.create(
+    return ActivityLog(
         actor=actor if actor and getattr(actor, "is_authenticated", False) else None,
+        owner_id=owner_id,
         action=action,
         content_type=ct,
         object_id=obj_id,
-        object_repr=object_repr,
+        object_repr=object_repr or "",
         changes=changes or None,
+        state=state,
         ip=ip,
         user_agent=ua
     )
 
 
+def log_action(actor, action, instance=None, changes=None, object_repr=None, state=None):
+    """
+    Registra uma ação no log de auditoria
+    
+    Args:
+        actor: Usuário que executou a ação
+        action: Tipo da ação ('create', 'update', 'delete', 'login', 'logout')
+        instance: Instância do objeto afetado (opcional)
+        changes: Dicionário com as mudanças realizadas (opcional)
+        object_repr: Representação textual do objeto (opcional)
+        state: Estado completo do objeto para reconstrução (opcional)
+    
+    Returns:
+        ActivityLog: o log (já salvo, ou pendente no buffer da requisição)
+    """
+    entry = build_log(actor, action, instance, changes, object_repr, state)
+    
+    buffer = _current_buffer()
+    if buffer is None:
+        # Fora de uma requisição: grava imediatamente
+        entry.save()
+        return entry
+    
+    # Dentro de uma transação o log só entra no buffer se ela for confirmada
+    # (fora de transação on_commit executa na hora)
+    transaction.on_commit(
+        partial(buffer.append, entry),
+        using=router.db_for_write(ActivityLog)
+    )
+    return entry
+
+
+def flush_audit_buffer(request=None):
+    """
+    Grava de uma vez (bulk_create) os logs pendentes da requisição
+    
+    Returns:
+        int: quantidade de logs gravados
+    """
+    request = request or get_current_request()
+    buffer = getattr(request, BUFFER_ATTR, None)
+    if not buffer:
+        return 0
+    
+    entries = list(buffer)
+    buffer.clear()
+    
+    db = router.db_for_write(ActivityLog)
+    transaction.on_commit(
+        partial(ActivityLog.objects.using(db).bulk_create, entries),
+        using=db
+    )
+    return len(entries)
+
+
 def log_login(user):
     """Registra login do usuário"""
     log_action(
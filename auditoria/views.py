@@ -1,11 +1,45 @@
+from datetime import datetime, time, timedelta
+
+from django.http import Http404
 from django.shortcuts import render
-from django.views.generic import ListView
+from django.views.generic import ListView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from pages import counts
+from usuarios import roles
+
+from .history import diff_between, get_monitored_model
 from .models import ActivityLog
+from .pagination import KeysetPaginationMixin
+from .utils import OWNER_FIELD
+
+
+def _day_start(value):
+    """Início do dia (fuso atual) de uma data AAAA-MM-DD, ou None se inválida"""
+    try:
+        day = parse_date(value or "")
+    except ValueError:
+        day = None
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min))
 
 
-class ActivityLogListView(LoginRequiredMixin, ListView):
+def _moment(value):
+    """Data/hora de um input datetime-local (fuso atual), ou None"""
+    try:
+        moment = parse_datetime(value or "")
+    except ValueError:
+        moment = None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class ActivityLogListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     View para listar logs de atividade do usuário atual
     """
@@ -14,44 +48,110 @@ class ActivityLogListView(LoginRequiredMixin, ListView):
     context_object_name = 'logs'
     paginate_by = 50
     
-    def get_queryset(self):
-        """Filtra logs do usuário atual ou relacionados a seus objetos"""
+    def get_base_queryset(self):
+        """Logs visíveis ao usuário, sem os filtros do GET"""
         user = self.request.user
         
         # Admin vê tudo
-        if user.is_superuser or user.groups.filter(name='empresa_admin').exists():
-            queryset = ActivityLog.objects.all()
-        else:
-            # Usuário comum vê apenas seus logs
-            queryset = ActivityLog.objects.filter(
-                Q(actor=user) |  # Ações que ele fez
-                Q(object_repr__icontains=f'usuario={user.id}')  # Objetos dele
-            )
+        if roles.is_admin(user):
+            return ActivityLog.objects.all()
+        
+        # Usuário comum vê as ações que fez e as feitas sobre objetos dele
+        # (ambos por índice: actor/owner + created_at)
+        return ActivityLog.objects.filter(Q(actor=user) | Q(owner=user))
+    
+    def get_queryset(self):
+        """Filtra logs do usuário atual ou relacionados a seus objetos"""
+        queryset = self.get_base_queryset()
         
         # Filtros opcionais via GET
         action = self.request.GET.get('action')
         if action:
             queryset = queryset.filter(action=action)
         
-        date_from = self.request.GET.get('date_from')
+        # Faixas de created_at (usam o índice; created_at__date não usa)
+        date_from = _day_start(self.request.GET.get('date_from'))
         if date_from:
-            queryset = queryset.filter(created_at__date__gte=date_from)
+            queryset = queryset.filter(created_at__gte=date_from)
         
-        date_to = self.request.GET.get('date_to')
+        date_to = _day_start(self.request.GET.get('date_to'))
         if date_to:
-            queryset = queryset.filter(created_at__date__lte=date_to)
+            queryset = queryset.filter(created_at__lt=date_to + timedelta(days=1))
         
-        return queryset.order_by('-created_at')
+        return queryset.select_related('actor', 'content_type')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Estatísticas para o contexto
+        # Estatísticas para o contexto (uma única consulta). Sem cache: o log
+        # recebe inclusões a quase toda requisição; tabelas grandes (admin sem
+        # filtros) usam a estimativa do planejador (pages.counts)
         user = self.request.user
-        context['total_logs'] = self.get_queryset().count()
-        context['user_actions'] = self.get_queryset().filter(actor=user).count()
+        total = counts.estimated_count(self.object_list)
+        if total is None:
+            stats = self.object_list.order_by().aggregate(
+                total_logs=Count('id'),
+                user_actions=Count('id', filter=Q(actor=user)),
+            )
+            context.update({name: counts.ListCount(value) for name, value in stats.items()})
+        else:
+            context['total_logs'] = total
+            context['user_actions'] = counts.list_count(self.object_list.filter(actor=user), timeout=0)
         context['actions_choices'] = ActivityLog.ACTIONS
         
         return context
 
+
+class ObjectDiffView(LoginRequiredMixin, TemplateView):
+    """
+    Compara um objeto auditado entre dois instantes (reconstrução pelo log)
+    
+    Admin vê qualquer objeto; demais usuários apenas objetos de que são donos.
+    """
+    template_name = 'auditoria/object_diff.html'
+    
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.audited_model = get_monitored_model(kwargs['model'])
+        except LookupError:
+            raise Http404("Modelo não auditado.")
+        return super().dispatch(request, *args, **kwargs)
+    
+    def can_view(self, pk):
+        user = self.request.user
+        if roles.is_admin(user):
+            return True
+        if not any(f.name == OWNER_FIELD for f in self.audited_model._meta.concrete_fields):
+            return False
+        # Logs guardam o dono mesmo depois que o objeto é excluído
+        ct = ContentType.objects.get_for_model(self.audited_model)
+        return ActivityLog.objects.filter(content_type=ct, object_id=pk, owner=user).exists()
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        pk = kwargs['pk']
+        if not self.can_view(pk):
+            raise Http404("Nenhum objeto encontrado.")
+        
+        start = _moment(self.request.GET.get('de'))
+        end = _moment(self.request.GET.get('ate')) or timezone.now()
+        
+        changes = []
+        if start:
+            labels = {f.name: f.verbose_name for f in self.audited_model._meta.concrete_fields}
+            diff = diff_between(self.audited_model, pk, start, end)
+            changes = [
+                (labels.get(field, field), old, new)
+                for field, (old, new) in sorted(diff.items())
+            ]
+        
+        context.update({
+            'model_name': self.audited_model._meta.verbose_name,
+            'object_pk': pk,
+            'start': start,
+            'end': end,
+            'changes': changes,
+        })
+        return context
+
 # Create your views here.
@@ -0,0 +1,193 @@
+"""
+Contadores de contratos na empresa (Company)
+
+total_contracts, total_contract_value e last_contract_date são mantidos
+com UPDATE atômico (F()) a cada criação, ativação/desativação, mudança de
+valor, troca de empresa e exclusão de contrato, sem recontar os contratos
+e sem disputa de "último a gravar vence" entre requisições simultâneas.
+
+O delta de uma atualização parte do estado do contrato no banco, relido
+com SELECT ... FOR UPDATE antes do save (locked_state): duas requisições
+que desativam o mesmo contrato não subtraem duas vezes. Fora de uma
+transação (sem como travar a linha) vale o estado de quando a instância
+foi carregada.
+
+O comando reconcile_company_counters reconstrói tudo em um único UPDATE
+(reconcile_counters) caso algo tenha sido alterado por fora (ex.:
+queryset.update() ou SQL direto).
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+# Estado de um contrato relevante para os contadores
+ContractState = namedtuple("ContractState", "company_id is_active value created_at")
+
+ZERO = Decimal("0")
+
+# Atributo da instância com o estado carregado do banco
+STATE_ATTR = "_counter_state"
+
+# Marca instâncias cujos contadores já são ajustados pela operação em lote
+BULK_ATTR = "_counter_bulk"
+
+# Campos do contrato que entram nos contadores (para save(update_fields=...))
+COUNTER_FIELDS = frozenset({"company", "company_id", "is_active", "value"})
+
+
+def contract_state(contract):
+    """
+    Estado atual do contrato para os contadores
+
+    Returns:
+        ContractState, ou None se algum campo não foi carregado (.only/.defer)
+    """
+    loaded = contract.__dict__
+    if not all(name in loaded for name in ("company_id", "is_active", "value", "created_at")):
+        return None
+    return ContractState(
+        loaded["company_id"], loaded["is_active"], loaded["value"], loaded["created_at"]
+    )
+
+
+def locked_state(contract, using=None):
+    """
+    Estado do contrato no banco, com a linha travada até o fim da transação
+
+    Uma atualização concorrente do mesmo contrato espera o commit desta e
+    então lê o estado já atualizado.
+
+    Returns:
+        ContractState, ou None se a linha não existe
+    """
+    from .models import Contract
+
+    row = (
+        Contract._default_manager.db_manager(using).select_for_update()
+        .filter(pk=contract.pk).values_list("company_id", "is_active", "value", "created_at")
+        .first()
+    )
+    return ContractState(*row) if row else None
+
+
+def _contribution(state):
+    """(contratos ativos, valor ativo) que o contrato soma à empresa"""
+    if state is None or not state.is_active:
+        return 0, ZERO
+    return 1, Decimal(state.value or 0)
+
+
+def apply_contract_change(old, new):
+    """
+    Aplica nos contadores a mudança de um contrato
+
+    Args:
+        old: ContractState antes (None na criação)
+        new: ContractState depois (None na exclusão)
+    """
+    from .models import Company
+
+    old_company = old.company_id if old else None
+    new_company = new.company_id if new else None
+
+    if old_company == new_company:
+        # Mesma empresa: apenas a diferença entre as contribuições
+        old_count, old_value = _contribution(old)
+        new_count, new_value = _contribution(new)
+        count, value = new_count - old_count, new_value - old_value
+        if new_company and (count or value):
+            Company.objects.filter(pk=new_company).update(
+                total_contracts=F("total_contracts") + count,
+                total_contract_value=F("total_contract_value") + value,
+            )
+        return
+
+    if old_company:
+        # Saiu da empresa (exclusão ou troca): subtrai e recalcula a última data
+        count, value = _contribution(old)
+        Company.objects.filter(pk=old_company).update(
+            total_contracts=F("total_contracts") - count,
+            total_contract_value=F("total_contract_value") - value,
+            last_contract_date=_last_contract_subquery(),
+        )
+
+    if new_company:
+        # Entrou na empresa (criação ou troca)
+        count, value = _contribution(new)
+        created = Value(new.created_at)
+        Company.objects.filter(pk=new_company).update(
+            total_contracts=F("total_contracts") + count,
+            total_contract_value=F("total_contract_value") + value,
+            last_contract_date=Greatest(Coalesce("last_contract_date", created), created),
+        )
+
+
+def apply_company_deltas(deltas, refresh_last_date=False):
+    """
+    Aplica deltas já agrupados por empresa (operações em lote)
+
+    Um UPDATE por empresa afetada, independente de quantos contratos
+    mudaram nela.
+
+    Args:
+        deltas: {company_id: (contratos ativos, valor ativo)}
+        refresh_last_date: recalcula last_contract_date (exclusões)
+
+    Returns:
+        int: empresas atualizadas
+    """
+    from .models import Company
+
+    updated = 0
+    for company_id, (count, value) in deltas.items():
+        fields = {}
+        if count or value:
+            fields["total_contracts"] = F("total_contracts") + count
+            fields["total_contract_value"] = F("total_contract_value") + value
+        if refresh_last_date:
+            fields["last_contract_date"] = _last_contract_subquery()
+        if fields:
+            updated += Company.objects.filter(pk=company_id).update(**fields)
+    return updated
+
+
+def _last_contract_subquery(contract_model=None):
+    if contract_model is None:
+        from .models import Contract as contract_model
+    return Subquery(
+        contract_model.objects.filter(company=OuterRef("pk"))
+        .order_by("-created_at").values("created_at")[:1]
+    )
+
+
+def counter_expressions(contract_model=None):
+    """Valores corretos dos contadores como subconsultas correlacionadas"""
+    if contract_model is None:
+        from .models import Contract as contract_model
+    active = (
+        contract_model.objects.filter(company=OuterRef("pk"), is_active=True)
+        .order_by().values("company")
+    )
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return {
+        "total_contracts": Coalesce(
+            Subquery(active.annotate(n=Count("pk")).values("n")), 0
+        ),
+        "total_contract_value": Coalesce(
+            Subquery(active.annotate(total=Sum("value")).values("total")),
+            Value(ZERO), output_field=money,
+        ),
+        "last_contract_date": _last_contract_subquery(contract_model),
+    }
+
+
+def reconcile_counters(queryset, contract_model=None):
+    """
+    Recalcula os contadores das empresas do queryset em um único UPDATE
+
+    Returns:
+        int: empresas atualizadas
+    """
+    return queryset.update(**counter_expressions(contract_model))
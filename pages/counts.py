@@ -0,0 +1,254 @@
+"""
+Contagens das listas: exatas em cache ou estimadas pelo planejador
+
+COUNT(*) de uma tabela grande (ex.: admin sem filtros) percorre todas as
+linhas a cada abertura da lista. Aqui cada contagem é:
+
+- calculada uma vez por requisição: a view guarda o resultado e o mesmo
+  valor vai para o paginador e para o template (ListCountMixin);
+- guardada no cache por settings.LIST_COUNT_CACHE_TIMEOUT segundos, com
+  chave pelo SQL da consulta (que já inclui o escopo do usuário e os
+  filtros) e pela versão do modelo, incrementada a cada gravação (signals,
+  importação, sincronização e operações em lote). Só com um cache
+  compartilhado entre os processos (ex.: Redis, settings.CACHES): no
+  LocMemCache padrão cada worker do gunicorn teria a sua cópia e a
+  invalidação feita em um não chegaria aos outros;
+- no PostgreSQL, a partir de settings.LIST_COUNT_ESTIMATE_THRESHOLD linhas,
+  trocada pela estimativa do planejador (linhas do EXPLAIN, que vêm de
+  pg_class.reltuples e das estatísticas das colunas), exibida como "~1,2M".
+  Tabela com menos linhas que o limite (pg_class.reltuples, guardado por
+  TABLE_ROWS_TIMEOUT segundos) vai direto ao COUNT, sem o EXPLAIN: uma
+  consulta por abertura, como antes das estimativas.
+
+Listas paginadas por chave não precisam do total para paginar: sem cache
+compartilhado, list_count(exact=False) devolve None fora do PostgreSQL em
+vez de um COUNT a cada abertura.
+
+Gravações em tabelas relacionadas (ex.: filtro de contratos pelo nome da
+empresa) dependem apenas do TTL.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections, router, transaction
+from django.utils.formats import number_format
+
+# Sufixos das contagens estimadas
+ESTIMATE_UNITS = ((10 ** 9, "B"), (10 ** 6, "M"), (10 ** 3, "K"))
+
+# Segundos em cache de pg_class.reltuples (só decide entre COUNT e EXPLAIN;
+# um valor por processo basta)
+TABLE_ROWS_TIMEOUT = 300
+
+# Backends de cache com uma cópia por processo
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+class ListCount:
+    """Total de uma lista; str() formata para exibição ("1.234" ou "~1,2M")"""
+
+    def __init__(self, value, approximate=False):
+        self.value = int(value)
+        self.approximate = approximate
+
+    def __int__(self):
+        return self.value
+
+    def __bool__(self):
+        return self.value > 0
+
+    def __eq__(self, other):
+        if isinstance(other, ListCount):
+            return (self.value, self.approximate) == (other.value, other.approximate)
+        return self.value == other
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return f"ListCount({self.value}, approximate={self.approximate})"
+
+    def __str__(self):
+        if not self.approximate:
+            return number_format(self.value)
+        for limit, suffix in ESTIMATE_UNITS:
+            if self.value >= limit:
+                scaled = round(self.value / limit, 1)
+                return f"~{number_format(int(scaled) if scaled.is_integer() else scaled)}{suffix}"
+        return f"~{number_format(self.value)}"
+
+
+def shared_cache():
+    """O cache padrão é visto por todos os processos (não é LocMem/Dummy)?"""
+    return settings.CACHES["default"]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def cache_timeout(name):
+    """Segundos do setting name, ou 0 (sem cache) se o cache não é compartilhado"""
+    return getattr(settings, name, 0) if shared_cache() else 0
+
+
+def _version_key(model):
+    return f"counts:version:{model._meta.label_lower}"
+
+
+def _cache_key(queryset):
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.sha1(repr((queryset.db, sql, params)).encode()).hexdigest()
+    version = cache.get(_version_key(queryset.model), 0)
+    return f"counts:{queryset.model._meta.label_lower}:v{version}:{digest}"
+
+
+def bump_version(key, using=None):
+    """
+    Incrementa uma chave de versão do cache
+
+    Na hora (a própria transação já vê os dados novos) e de novo após o
+    commit (outra requisição pode ter guardado o valor antigo nesse meio tempo).
+    """
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    bump()
+    transaction.on_commit(bump, using=using)
+
+
+def invalidate(model):
+    """Descarta as contagens em cache do modelo"""
+    bump_version(_version_key(model), using=router.db_for_write(model))
+
+
+def estimate_count(queryset):
+    """
+    Linhas estimadas pelo planejador (sem executar a consulta)
+
+    Returns:
+        int, ou None fora do PostgreSQL
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().select_related(None).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def table_rows(queryset):
+    """
+    Linhas da tabela do modelo segundo as estatísticas (pg_class.reltuples)
+
+    Returns:
+        int (0 se a tabela nunca foi analisada), ou None fora do PostgreSQL
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    table = queryset.model._meta.db_table
+    key = f"counts:reltuples:{queryset.db}:{table}"
+    rows = cache.get(key)
+    if rows is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(table)],
+            )
+            rows = max(cursor.fetchone()[0], 0)
+        cache.set(key, rows, TABLE_ROWS_TIMEOUT)
+    return rows
+
+
+def estimated_count(queryset):
+    """
+    Estimativa, quando passa de settings.LIST_COUNT_ESTIMATE_THRESHOLD
+
+    A tabela inteira abaixo do limite dispensa o EXPLAIN (o filtro só reduz).
+
+    Returns:
+        ListCount aproximado, ou None (abaixo do limite ou fora do PostgreSQL)
+    """
+    threshold = getattr(settings, "LIST_COUNT_ESTIMATE_THRESHOLD", 0)
+    if not threshold or queryset.query.is_empty():
+        return None
+    rows = table_rows(queryset)
+    if rows is None or rows < threshold:
+        return None
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < threshold:
+        return None
+    return ListCount(estimate, approximate=True)
+
+
+def list_count(queryset, timeout=None, exact=True):
+    """
+    Total do queryset: do cache, estimado (acima do limite) ou COUNT(*)
+
+    Args:
+        timeout: segundos em cache (padrão settings.LIST_COUNT_CACHE_TIMEOUT,
+            se o cache é compartilhado; 0 = sem cache)
+        exact: False dispensa o COUNT(*) fora do PostgreSQL quando não há
+            cache (devolve None); no PostgreSQL vale a regra acima
+
+    Returns:
+        ListCount (ou None, com exact=False)
+    """
+    if queryset.query.is_empty():
+        # .none(): não há SQL para a chave nem para o EXPLAIN
+        return ListCount(0)
+    if timeout is None:
+        timeout = cache_timeout("LIST_COUNT_CACHE_TIMEOUT")
+    key = _cache_key(queryset) if timeout else None
+    if key:
+        cached = cache.get(key)
+        if cached is not None:
+            return ListCount(*cached)
+
+    if not exact and not key and connections[queryset.db].vendor != "postgresql":
+        return None
+    count = estimated_count(queryset) or ListCount(queryset.count())
+
+    if key:
+        cache.set(key, (count.value, count.approximate), timeout)
+    return count
+
+
+class CountedPaginator(Paginator):
+    """Paginator com o total já conhecido (não executa outro COUNT)"""
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            self.count = int(count)
+
+
+class ListCountMixin:
+    """
+    Total da lista calculado uma vez por requisição
+
+    O paginador por número de página usa o mesmo valor que a view coloca
+    no contexto (get_list_count). Páginas por chave pedem exact=False: o
+    total é só para exibição.
+    """
+
+    def get_list_count(self, exact=True):
+        if not hasattr(self, "_list_count"):
+            self._list_count = list_count(self.object_list, exact=exact)
+        return self._list_count
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return CountedPaginator(
+            queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+            count=self.get_list_count() if queryset is self.object_list else None, **kwargs,
+        )
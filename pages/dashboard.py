@@ -0,0 +1,85 @@
+"""
+Dados do dashboard (HomeView) com cache por usuário
+
+Os três totais vêm de uma única consulta (um COUNT por dono em subconsulta)
+e, junto com os registros recentes, formam um snapshot guardado no cache
+por settings.DASHBOARD_CACHE_TIMEOUT segundos. A chave leva a versão do
+usuário, incrementada pelos signals de save/delete de Person, Company e
+Contract e pelas gravações em lote (importação, sincronização, ações em
+lote). Com o snapshot em cache, abrir o dashboard não consulta o banco.
+
+O cache só é usado se for compartilhado entre os processos (ex.: Redis,
+settings.CACHES): no LocMemCache cada worker do gunicorn teria o seu
+snapshot e a invalidação feita em um não chegaria aos outros.
+
+Sem cache, as quatro consultas (totais e três listas) são independentes e
+rodam ao mesmo tempo (pages.parallel).
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .counts import bump_version, cache_timeout
+from .models import Company, Contract, Person
+from .parallel import run_parallel
+
+# Registros em cada lista de recentes
+RECENT_LIMIT = 5
+
+
+def _version_key(user_id):
+    return f"dashboard:version:{user_id}"
+
+
+def invalidate(*user_ids):
+    """Descarta o snapshot dos usuários (donos dos registros gravados)"""
+    for user_id in {user_id for user_id in user_ids if user_id is not None}:
+        bump_version(_version_key(user_id))
+
+
+def _owned_total(model):
+    """COUNT dos registros do usuário da consulta externa (0 se não houver)"""
+    totals = (
+        model.objects.filter(usuario=OuterRef("pk")).order_by()
+        .values("usuario").annotate(total=Count("pk")).values("total")
+    )
+    return Coalesce(Subquery(totals), 0)
+
+
+def build_snapshot(user):
+    """Totais (uma consulta) e registros recentes do usuário, em paralelo"""
+    results = run_parallel(
+        totals=lambda: get_user_model().objects.filter(pk=user.pk).values(
+            total_persons=_owned_total(Person),
+            total_companies=_owned_total(Company),
+            total_contracts=_owned_total(Contract),
+        ).get(),
+        recent_persons=lambda: list(
+            Person.objects.filter(usuario=user).order_by("-created_at")[:RECENT_LIMIT]
+        ),
+        recent_companies=lambda: list(
+            Company.objects.filter(usuario=user).order_by("-created_at")[:RECENT_LIMIT]
+        ),
+        recent_contracts=lambda: list(
+            Contract.objects.filter(usuario=user).select_related("company", "person")
+            .defer("search_vector").order_by("-created_at")[:RECENT_LIMIT]
+        ),
+    )
+    snapshot = results.pop("totals")
+    snapshot.update(results)
+    return snapshot
+
+
+def get_snapshot(user):
+    """Snapshot do cache ou montado agora (e guardado)"""
+    timeout = cache_timeout("DASHBOARD_CACHE_TIMEOUT")
+    if not timeout:
+        return build_snapshot(user)
+
+    key = f"dashboard:{user.pk}:v{cache.get(_version_key(user.pk), 0)}"
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(user)
+        cache.set(key, snapshot, timeout)
+    return snapshot
@@ -0,0 +1,310 @@
+"""
+Pipeline de eventos de contrato
+
+Toda gravação de contrato feita pelas views (e por operações em lote)
+passa por aqui: o contrato é salvo, o diff é calculado uma única vez e
+gera juntos o ContractMovement e o ActivityLog, gravados em lote
+(bulk_create) na mesma transação. Movimento e auditoria não divergem e
+não há round trips separados para cada registro.
+
+Os contadores da empresa continuam sendo atualizados pelos signals de
+Contract (pages.counters).
+
+Exemplo:
+    from pages import events
+    events.create_contract(contract, request.user)
+    events.update_contract(contract, request.user)
+    events.delete_contract(contract, request.user)
+
+    with events.ContractEventBatch(request.user) as batch:
+        for contract in contratos:
+            contract.is_active = False
+            batch.save(contract)
+
+    # Em lote (UPDATE/DELETE por conjunto, sem save() por contrato)
+    events.set_contracts_active(queryset, False, request.user)
+    events.delete_contracts(queryset, request.user)
+"""
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from auditoria.models import ActivityLog
+from auditoria.signals import SKIP_ATTR, checkpoint_state, describe_delete, describe_save
+from auditoria.utils import build_log
+
+from . import counters, counts, dashboard
+from .models import Contract, ContractMovement
+
+# Quantidade de ids por UPDATE/DELETE nas operações em lote
+BULK_CHUNK_SIZE = 1000
+
+# Verbo usado na descrição de cada tipo de movimento
+MOVEMENT_VERBS = {
+    'created': 'criado',
+    'updated': 'atualizado',
+    'activated': 'ativado',
+    'deactivated': 'desativado',
+    'deleted': 'excluído',
+}
+
+
+def movement_type_for(action, changes):
+    """Tipo do ContractMovement a partir da ação de auditoria e do diff"""
+    if action == 'create':
+        return 'created'
+    if action == 'delete':
+        return 'deleted'
+    if changes and 'is_active' in changes and len(changes) == 1:
+        return 'activated' if changes['is_active'][1] == 'True' else 'deactivated'
+    return 'updated'
+
+
+class ContractEventBatch:
+    """
+    Acumula eventos de contratos e grava movimentos + logs em lote
+
+    Usado como context manager: abre uma transação, os saves/exclusões
+    acontecem dentro dela e, na saída, movimentos e logs são gravados com
+    um bulk_create por tabela antes do commit.
+    """
+
+    def __init__(self, actor):
+        self.actor = actor
+        self.movements = []
+        self.logs = []
+        self._atomic = None
+
+    def __enter__(self):
+        self._atomic = transaction.atomic(using=router.db_for_write(Contract))
+        self._atomic.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.flush()
+            except BaseException as error:
+                # Falha na gravação em lote desfaz também os contratos
+                self._atomic.__exit__(type(error), error, error.__traceback__)
+                raise
+        return self._atomic.__exit__(exc_type, exc, tb)
+
+    def _username(self):
+        return getattr(self.actor, 'username', '') or 'sistema'
+
+    def _add(self, contract, action, changes=None, state=None, metadata=None):
+        movement_type = movement_type_for(action, changes)
+        if movement_type != 'deleted':
+            # Movimentos de exclusão seriam removidos junto com o contrato (CASCADE);
+            # a exclusão fica registrada no ActivityLog (com o estado final)
+            self.movements.append(ContractMovement(
+                contract=contract,
+                movement_type=movement_type,
+                description=f'Contrato {MOVEMENT_VERBS[movement_type]} por {self._username()}',
+                performed_by=self.actor if getattr(self.actor, 'is_authenticated', False) else None,
+                metadata={
+                    'title': contract.title,
+                    'company_id': contract.company_id,
+                    'person_id': contract.person_id,
+                    'changed_fields': sorted(changes or {}),
+                    **(metadata or {}),
+                },
+            ))
+        self.logs.append(build_log(self.actor, action, instance=contract, changes=changes, state=state))
+
+    def save(self, contract, metadata=None):
+        """Salva o contrato e registra criação/atualização com o mesmo diff"""
+        created = contract._state.adding
+        setattr(contract, SKIP_ATTR, True)
+        try:
+            contract.save()
+        finally:
+            setattr(contract, SKIP_ATTR, False)
+
+        result = describe_save(Contract, contract, created)
+        if result is not None:
+            action, changes, state = result
+            self._add(contract, action, changes, state, metadata)
+        return contract
+
+    def delete(self, contract):
+        """Exclui o contrato e registra a exclusão com o estado final"""
+        state = describe_delete(Contract, contract)
+        self._add(contract, 'delete', state=state)
+        setattr(contract, SKIP_ATTR, True)
+        contract.delete()
+        return contract
+
+    def _locked(self, queryset, **filters):
+        """
+        Contratos do queryset (escopo do usuário + filtros), travados até o commit
+
+        Só a tabela de contratos é travada (of=self); empresa e pessoa vêm no
+        mesmo SELECT para o object_repr dos logs.
+        """
+        return list(
+            Contract.objects.filter(pk__in=queryset.order_by().values('pk'), **filters)
+            .select_related('company', 'person')
+            .select_for_update(of=('self',))
+            .order_by('pk')
+        )
+
+    def set_active(self, queryset, active, metadata=None):
+        """
+        Ativa/desativa em lote os contratos do queryset
+
+        Um UPDATE por bloco de BULK_CHUNK_SIZE ids, movimentos e logs no
+        flush e contadores ajustados uma vez por empresa. Os logs levam o
+        diff de is_active e, a cada AUDIT_SNAPSHOT_EVERY alterações do
+        contrato, o snapshot (como describe_save).
+
+        Returns:
+            int: contratos alterados (os que já estavam no estado são ignorados)
+        """
+        return self.apply_active(self._locked(queryset, is_active=not active), active, metadata)
+
+    def apply_active(self, contracts, active, metadata=None):
+        """
+        Ativa/desativa contratos já carregados e travados pela transação
+
+        Usado por set_active e por quem seleciona o lote por conta própria
+        (ex.: expire_contracts com SKIP LOCKED).
+
+        Returns:
+            int: contratos alterados
+        """
+        if not contracts:
+            return 0
+
+        now = timezone.now()
+        ids = [contract.pk for contract in contracts]
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            Contract.objects.filter(pk__in=ids[start:start + BULK_CHUNK_SIZE]).update(
+                is_active=active, updated_at=now
+            )
+
+        changes = {'is_active': [str(not active), str(active)]}
+        sign = 1 if active else -1
+        deltas = defaultdict(lambda: [0, counters.ZERO])
+        for contract in contracts:
+            contract.is_active = active
+            contract.updated_at = now
+            self._add(contract, 'update', changes, checkpoint_state(Contract, contract), metadata)
+            deltas[contract.company_id][0] += sign
+            deltas[contract.company_id][1] += sign * (contract.value or counters.ZERO)
+
+        counters.apply_company_deltas(deltas)
+        return len(contracts)
+
+    def delete_many(self, queryset):
+        """
+        Exclui em lote os contratos do queryset
+
+        Os movimentos (CASCADE) e os contratos saem com DELETE ... IN por
+        bloco; cada exclusão fica no ActivityLog com o estado final e os
+        contadores são ajustados uma vez por empresa.
+
+        Returns:
+            int: contratos excluídos
+        """
+        contracts = self._locked(queryset)
+        if not contracts:
+            return 0
+
+        deltas = defaultdict(lambda: [0, counters.ZERO])
+        for contract in contracts:
+            self._add(contract, 'delete', state=describe_delete(Contract, contract))
+            # Os receivers de auditoria e de contadores ignoram estas instâncias
+            setattr(contract, SKIP_ATTR, True)
+            setattr(contract, counters.BULK_ATTR, True)
+            if contract.is_active:
+                deltas[contract.company_id][0] -= 1
+                deltas[contract.company_id][1] -= contract.value or counters.ZERO
+            else:
+                deltas.setdefault(contract.company_id, [0, counters.ZERO])
+
+        using = router.db_for_write(Contract)
+        for start in range(0, len(contracts), BULK_CHUNK_SIZE):
+            collector = Collector(using=using)
+            collector.collect(contracts[start:start + BULK_CHUNK_SIZE])
+            collector.delete()
+
+        counters.apply_company_deltas(deltas, refresh_last_date=True)
+        return len(contracts)
+
+    def record_bulk(self, created=(), updated=(), metadata=None):
+        """
+        Registra contratos gravados em lote (bulk_create / INSERT ... ON CONFLICT)
+
+        Esses caminhos não disparam signals: aqui são gerados os movimentos,
+        os logs (criação com snapshot, atualização com o diff e os snapshots
+        devidos) e os ajustes
+        de contadores, uma vez por empresa.
+
+        Args:
+            created: contratos inseridos
+            updated: tuplas (contrato, ContractState anterior, diff)
+
+        Returns:
+            int: contratos registrados
+        """
+        deltas = defaultdict(lambda: [0, counters.ZERO])
+
+        def move(state, sign):
+            entry = deltas[state.company_id]
+            if state.is_active:
+                entry[0] += sign
+                entry[1] += sign * (state.value or counters.ZERO)
+
+        for contract in created:
+            action, changes, state = describe_save(Contract, contract, True)
+            self._add(contract, action, changes, state, metadata)
+            move(counters.contract_state(contract), 1)
+
+        for contract, old, changes in updated:
+            self._add(contract, 'update', changes, checkpoint_state(Contract, contract), metadata)
+            move(old, -1)
+            move(counters.contract_state(contract), 1)
+
+        counters.apply_company_deltas(deltas, refresh_last_date=True)
+        return len(created) + len(updated)
+
+    def flush(self):
+        """Grava os movimentos e logs pendentes (um INSERT por tabela)"""
+        if self.logs:
+            # UPDATE/DELETE/INSERT em lote não disparam os signals de save/delete
+            counts.invalidate(Contract)
+            dashboard.invalidate(*(log.owner_id for log in self.logs))
+        if self.movements:
+            ContractMovement.objects.bulk_create(self.movements)
+        if self.logs:
+            ActivityLog.objects.using(router.db_for_write(ActivityLog)).bulk_create(self.logs)
+        self.movements, self.logs = [], []
+
+
+def create_contract(contract, actor):
+    with ContractEventBatch(actor) as batch:
+        return batch.save(contract)
+
+
+def update_contract(contract, actor):
+    with ContractEventBatch(actor) as batch:
+        return batch.save(contract)
+
+
+def delete_contract(contract, actor):
+    with ContractEventBatch(actor) as batch:
+        return batch.delete(contract)
+
+
+def set_contracts_active(queryset, active, actor):
+    with ContractEventBatch(actor) as batch:
+        return batch.set_active(queryset, active)
+
+
+def delete_contracts(queryset, actor):
+    with ContractEventBatch(actor) as batch:
+        return batch.delete_many(queryset)
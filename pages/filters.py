@@ -3,25 +3,81 @@ Filtros usando django-filter para as ListViews
 """
 import django_filters as df
 from django import forms
+from django.db.models import Q
+from django_filters.constants import EMPTY_VALUES
 from .models import Contract, Company, Person, State, City  # ✅ ADICIONAR State, City
+from .search import search_contracts, search_names
+from .validators import only_digits
+
+
+class NameSearchFilter(df.CharFilter):
+    """
+    Busca por trecho do nome sem diferenciar acentos ("joao" acha "João")
+    
+    No PostgreSQL usa unaccent + pg_trgm com índice GIN (pages.search.search_names).
+    Com order=True ordena pela similaridade com o texto buscado.
+    """
+    
+    def __init__(self, *args, order=False, **kwargs):
+        self.order = order
+        super().__init__(*args, **kwargs)
+    
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        return search_names(qs, self.field_name, value, order=self.order)
+
+
+class DocumentFilter(df.CharFilter):
+    """
+    Busca de CPF/CNPJ pelos dígitos, com ou sem máscara
+    
+    Usa a coluna canônica (<campo>_digits, índice único): documento completo
+    é busca exata, trecho inicial é busca por prefixo. field_name deve ser
+    a coluna de dígitos; length é o total de dígitos do documento.
+    """
+    
+    def __init__(self, *args, length, **kwargs):
+        self.length = length
+        super().__init__(*args, **kwargs)
+    
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        digits = only_digits(value)
+        if not digits:
+            return qs.none()
+        lookup = "exact" if len(digits) >= self.length else "startswith"
+        return qs.filter(**{f"{self.field_name}__{lookup}": digits})
 
 
 class ContractFilter(df.FilterSet):
     """
     Filtro para contratos com campos de busca por:
-    - Número do contrato
+    - Texto livre no título e na descrição (busca textual com ranking)
+    - Número (id) ou ID externo do contrato
     - Nome da pessoa
     - Nome da empresa
+    - Tipo de contrato
     - Status ativo/inativo
     - Data de criação/vencimento
     """
+    busca = df.CharFilter(
+        method="filter_busca",
+        label="Busca",
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Buscar no título e na descrição...'
+        })
+    )
+    
+    # ✅ CORRIGIDO: o modelo não tem numero_contrato (usa o id ou o ID externo)
     numero = df.CharFilter(
-        field_name="numero_contrato",
-        lookup_expr="icontains",
+        method="filter_numero",
         label="Número do Contrato",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Buscar por número...'
+            'placeholder': 'Buscar por número ou ID externo...'
         })
     )
     
@@ -36,7 +92,7 @@ class ContractFilter(df.FilterSet):
     )
     
     empresa = df.CharFilter(
-        field_name="company__company_name",
+        field_name="company__corporate_name",  # ✅ CORRIGIDO: era company_name
         lookup_expr="icontains",
         label="Nome da Empresa",
         widget=forms.TextInput(attrs={
@@ -45,6 +101,14 @@ class ContractFilter(df.FilterSet):
         })
     )
     
+    contract_type = df.ChoiceFilter(
+        field_name="contract_type",
+        choices=Contract.CONTRACT_TYPES,
+        label="Tipo de Contrato",
+        empty_label="Todos",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
     is_active = df.BooleanFilter(
         field_name="is_active",
         label="Contrato Ativo",
@@ -123,20 +187,31 @@ class ContractFilter(df.FilterSet):
     
     class Meta:
         model = Contract
-        fields = ["numero", "pessoa", "empresa", "is_active", "criado_de", "criado_ate", "inicio_de", "inicio_ate", "fim_de", "fim_ate"]
+        fields = ["busca", "numero", "pessoa", "empresa", "contract_type", "is_active", "criado_de", "criado_ate", "inicio_de", "inicio_ate", "fim_de", "fim_ate"]
+    
+    def filter_busca(self, queryset, name, value):
+        """Busca textual (PostgreSQL) ordenada por relevância - ver pages.search"""
+        return search_contracts(queryset, value)
+    
+    def filter_numero(self, queryset, name, value):
+        value = value.strip()
+        condition = Q(external_id__icontains=value)
+        if value.isdigit():
+            condition |= Q(pk=int(value))
+        return queryset.filter(condition)
 
 
 class CompanyFilter(df.FilterSet):
     """
     Filtro para empresas com campos de busca por:
-    - Razão Social (icontains)
-    - CNPJ (icontains)
-    - Cidade (icontains)
+    - Razão Social (sem acento, por trecho - ordena por similaridade)
+    - CNPJ (dígitos, com ou sem máscara - exato ou por prefixo)
+    - Cidade (sem acento, por trecho)
     - Data de criação (gte/lte)
     """
-    razao_social = df.CharFilter(
-        field_name="company_name",
-        lookup_expr="icontains",
+    razao_social = NameSearchFilter(
+        field_name="corporate_name",  # ✅ CORRIGIDO: era company_name
+        order=True,
         label="Razão Social",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
@@ -144,9 +219,9 @@ class CompanyFilter(df.FilterSet):
         })
     )
     
-    cnpj = df.CharFilter(
-        field_name="cnpj",
-        lookup_expr="icontains",
+    cnpj = DocumentFilter(
+        field_name="cnpj_digits",
+        length=14,
         label="CNPJ",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
@@ -154,9 +229,8 @@ class CompanyFilter(df.FilterSet):
         })
     )
     
-    cidade = df.CharFilter(
+    cidade = NameSearchFilter(
         field_name="city__name",
-        lookup_expr="icontains",
         label="Cidade",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
@@ -192,14 +266,14 @@ class CompanyFilter(df.FilterSet):
 class PersonFilter(df.FilterSet):
     """
     Filtro para pessoas com campos de busca por:
-    - Nome (icontains)
-    - CPF (icontains)
-    - Cidade (icontains)
+    - Nome (sem acento, por trecho - ordena por similaridade)
+    - CPF (dígitos, com ou sem máscara - exato ou por prefixo)
+    - Cidade (sem acento, por trecho)
     - Data de criação (gte/lte)
     """
-    nome = df.CharFilter(
+    nome = NameSearchFilter(
         field_name="full_name",
-        lookup_expr="icontains",
+        order=True,
         label="Nome Completo",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
@@ -207,9 +281,9 @@ class PersonFilter(df.FilterSet):
         })
     )
     
-    cpf = df.CharFilter(
-        field_name="cpf",
-        lookup_expr="icontains",
+    cpf = DocumentFilter(
+        field_name="cpf_digits",
+        length=11,
         label="CPF",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
@@ -217,9 +291,8 @@ class PersonFilter(df.FilterSet):
         })
     )
     
-    cidade = df.CharFilter(
+    cidade = NameSearchFilter(
         field_name="city__name",
-        lookup_expr="icontains",
         label="Cidade",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
@@ -289,12 +362,12 @@ class StateFilter(df.FilterSet):
 class CityFilter(df.FilterSet):
     """
     Filtro para cidades com campos de busca por:
-    - Nome da cidade (icontains)
+    - Nome da cidade (sem acento, por trecho - ordena por similaridade)
     - Estado (FK)
     """
-    nome = df.CharFilter(
+    nome = NameSearchFilter(
         field_name="name",
-        lookup_expr="icontains",
+        order=True,
         label="Nome da Cidade",
         widget=forms.TextInput(attrs={
             'class': 'form-control',
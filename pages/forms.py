@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from .models import Person, Company, Contract, State, City
+from .imports import KIND_CHOICES, check_utf8
+from .validators import format_cnpj, format_cpf, only_digits
 
 User = get_user_model()
 
@@ -60,6 +62,15 @@ class PersonForm(forms.ModelForm):
         # Remove o argumento 'user' se presente para evitar erro
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
+    
+    def clean_cpf(self):
+        """Grava com máscara; duplicidade comparada pelos dígitos (cpf_digits)"""
+        digits = only_digits(self.cleaned_data['cpf'])
+        if len(digits) != 11:
+            raise forms.ValidationError("CPF deve ter 11 dígitos.")
+        if Person.objects.exclude(pk=self.instance.pk).filter(cpf_digits=digits).exists():
+            raise forms.ValidationError("Já existe uma pessoa com este CPF.")
+        return format_cpf(digits)
 
 
 class CompanyForm(forms.ModelForm):
@@ -130,6 +141,15 @@ class CompanyForm(forms.ModelForm):
         # Remove o argumento 'user' se presente para evitar erro
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
+    
+    def clean_cnpj(self):
+        """Grava com máscara; duplicidade comparada pelos dígitos (cnpj_digits)"""
+        digits = only_digits(self.cleaned_data['cnpj'])
+        if len(digits) != 14:
+            raise forms.ValidationError("CNPJ deve ter 14 dígitos.")
+        if Company.objects.exclude(pk=self.instance.pk).filter(cnpj_digits=digits).exists():
+            raise forms.ValidationError("Já existe uma empresa com este CNPJ.")
+        return format_cnpj(digits)
 
 
 class ContractForm(forms.ModelForm):
@@ -261,4 +281,34 @@ class CityForm(forms.ModelForm):
         # Remove o argumento 'user' se presente
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
+
+
+class DataImportForm(forms.Form):
+    """Upload de arquivo CSV/JSONL para importação em lote"""
+    
+    kind = forms.ChoiceField(
+        choices=KIND_CHOICES,
+        label='Tipo de Registro',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    arquivo = forms.FileField(
+        label='Arquivo (CSV ou JSONL)',
+        help_text='CSV separado por ";" ou "," (mesmas colunas da exportação) ou JSONL, em UTF-8',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson,.txt'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Apenas validar (não grava nada)',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
+    def clean_arquivo(self):
+        """Codificação conferida em blocos antes de gravar qualquer lote"""
+        arquivo = self.cleaned_data['arquivo']
+        try:
+            check_utf8(arquivo.chunks())
+        except UnicodeDecodeError:
+            raise forms.ValidationError("O arquivo precisa estar em UTF-8.")
+        arquivo.seek(0)
+        return arquivo
 # Deploy: 2025-11-06 00:04:16
@@ -0,0 +1,580 @@
+"""
+Importação em lote de empresas, pessoas e contratos (CSV ou JSONL)
+
+O arquivo é lido como stream e processado em lotes de BATCH_SIZE linhas:
+
+1. cada linha do lote é validada (obrigatórios, CPF/CNPJ, datas, valores);
+2. as referências do lote inteiro são resolvidas com poucas consultas
+   (cidades/UF, CPF/CNPJ já cadastrados, empresa e pessoa dos contratos),
+   com cache em memória entre os lotes;
+3. o lote é gravado com um bulk_create dentro de um savepoint, junto com os
+   logs de auditoria (e, para contratos, movimentos e contadores das
+   empresas), uma vez por lote e não por linha.
+
+Linhas com erro não interrompem a importação: vão para o relatório (CSV com
+linha, erro e registro original). Os nomes de coluna aceitos são os mesmos
+da exportação (pages.exports), tanto a chave quanto o cabeçalho, então um
+CSV exportado pode ser reimportado.
+
+Exemplo:
+    from pages.imports import import_file
+    with open("contratos.csv", encoding="utf-8-sig", newline="") as fh:
+        result = import_file("contracts", fh, "csv", user, report=relatorio)
+"""
+import codecs
+import csv
+import json
+import re
+import time
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, router, transaction
+
+from auditoria.models import ActivityLog
+from auditoria.signals import describe_save
+from auditoria.utils import build_log
+from usuarios import roles
+
+from . import counts, dashboard, exports
+from .events import ContractEventBatch
+from .models import City, Company, Contract, Person, State
+from .validators import format_cnpj, format_cpf, is_valid_cnpj, is_valid_cpf, only_digits
+
+# Linhas por lote (validação, consultas e bulk_create)
+BATCH_SIZE = 1000
+
+# Erros guardados no resultado para exibição (o relatório tem todos)
+ERROR_SAMPLE_SIZE = 200
+
+# Relatório de erros do upload guardado na sessão para download (caracteres);
+# acima disso, só pelo comando import_data
+REPORT_MAX_SIZE = 2 * 1024 * 1024
+
+TRUE_VALUES = {"1", "true", "sim", "s", "yes", "y", "ativo", "verdadeiro"}
+FALSE_VALUES = {"0", "false", "não", "nao", "n", "no", "inativo", "falso"}
+
+FORMATS = ("csv", "jsonl")
+
+CENTS = Decimal("0.01")
+
+# Número já sem separador de milhar (ponto decimal) e só pontos de milhar
+DECIMAL_RE = re.compile(r"^-?\d+(\.\d+)?$")
+THOUSANDS_RE = re.compile(r"^-?\d{1,3}(\.\d{3})+$")
+
+
+class RowError(Exception):
+    """Erro de validação de uma linha (vai para o relatório)"""
+
+
+class ImportResult:
+    """Totais de uma importação"""
+
+    def __init__(self):
+        self.read = 0
+        self.created = 0
+        self.valid = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.error_samples = []
+
+    @property
+    def rows_per_minute(self):
+        return self.read / self.elapsed * 60 if self.elapsed else 0
+
+
+def guess_format(filename):
+    """Formato pela extensão do arquivo (.jsonl/.ndjson ou CSV)"""
+    return "jsonl" if str(filename).lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def check_utf8(chunks):
+    """
+    Confere se os blocos de bytes formam um texto UTF-8 válido
+
+    Feito antes de importar: a gravação é lote a lote e um byte inválido no
+    meio do arquivo deixaria os lotes anteriores gravados.
+
+    Raises:
+        UnicodeDecodeError
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        decoder.decode(chunk)
+    decoder.decode(b"", final=True)
+
+
+def read_rows(stream, fmt):
+    """
+    Lê um arquivo texto e gera (número da linha, registro)
+
+    O registro é None quando a linha não pôde ser interpretada.
+    """
+    if fmt == "jsonl":
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record if isinstance(record, dict) else None
+        return
+
+    first = stream.readline()
+    delimiter = ";" if first.count(";") >= first.count(",") else ","
+    header = next(csv.reader([first], delimiter=delimiter), [])
+    reader = csv.DictReader(stream, fieldnames=header, delimiter=delimiter)
+    for record in reader:
+        if not any((value or "").strip() for value in record.values() if isinstance(value, str)):
+            continue
+        yield reader.line_num + 1, record
+
+
+# ===========================================
+# CONVERSÃO DE VALORES
+# ===========================================
+
+def parse_date(value, required=False, label="data"):
+    """Aceita AAAA-MM-DD e DD/MM/AAAA"""
+    value = str(value or "").strip()
+    if not value:
+        if required:
+            raise RowError(f"{label} obrigatória")
+        return None
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(value[:10], fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f"{label} inválida: {value}")
+
+
+def parse_decimal(value, label="valor"):
+    """
+    Aceita 1234.56, 1234,56, 1.234,56 e 1.234 (ponto seguido de 3 dígitos é milhar)
+
+    Não arredonda: mais de 2 casas decimais é erro da linha.
+    """
+    text = str(value if value is not None else "").strip()
+    if not text:
+        return None
+    number = text
+    if "," in number:
+        integer, _, fraction = number.partition(",")
+        if "." in integer and not THOUSANDS_RE.match(integer):
+            raise RowError(f"{label} inválido: {text}")
+        number = f"{integer.replace('.', '')}.{fraction}"
+    elif THOUSANDS_RE.match(number):
+        number = number.replace(".", "")
+    if not DECIMAL_RE.match(number):
+        raise RowError(f"{label} inválido: {text}")
+    amount = Decimal(number)
+    if amount.as_tuple().exponent < -2:
+        raise RowError(f"{label} com mais de 2 casas decimais: {text}")
+    return amount.quantize(CENTS)
+
+
+def parse_bool(value, default=True):
+    if isinstance(value, bool):
+        return value
+    value = str(value if value is not None else "").strip().lower()
+    if not value:
+        return default
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f"valor booleano inválido: {value}")
+
+
+def required(data, field, label):
+    value = str(data.get(field) or "").strip()
+    if not value:
+        raise RowError(f"{label} obrigatório")
+    return value
+
+
+def optional(data, field):
+    return str(data.get(field) or "").strip()
+
+
+# ===========================================
+# IMPORTADORES
+# ===========================================
+
+class BaseImporter:
+    """
+    Processa lotes de registros de um modelo
+
+    Subclasses definem clean (uma linha -> dict validado) e resolve (lote
+    validado -> instâncias prontas, com as referências resolvidas).
+    """
+    model = None
+    columns = {}
+    extra_fields = ()
+
+    # Documento já cadastrado é erro (a sincronização, pages.sync, atualiza)
+    reject_existing = True
+
+    def __init__(self, user, batch_size=BATCH_SIZE, report=None, dry_run=False):
+        self.user = user
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.result = ImportResult()
+        self.db = router.db_for_write(self.model)
+        self._cities = {}
+
+        # Aceita a chave da coluna e o cabeçalho da exportação
+        self.aliases = {}
+        for key, (header, _) in self.columns.items():
+            self.aliases[key] = key
+            self.aliases[header.lower()] = key
+        for key in self.extra_fields:
+            self.aliases[key] = key
+
+        self._report = csv.writer(report, delimiter=";") if report is not None else None
+        if self._report:
+            self._report.writerow(["Linha", "Erro", "Registro"])
+
+    # --- fluxo ---
+
+    def run(self, rows):
+        started = time.monotonic()
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.process(batch)
+        self.result.elapsed = time.monotonic() - started
+        return self.result
+
+    def process(self, batch):
+        self.result.read += len(batch)
+
+        cleaned = []
+        for number, record in batch:
+            if record is None:
+                self.error(number, "linha inválida (esperado um objeto JSON)", record)
+                continue
+            try:
+                cleaned.append((number, record, self.clean(self.normalize(record))))
+            except RowError as error:
+                self.error(number, str(error), record)
+
+        items = self.resolve(cleaned)
+        if self.dry_run:
+            self.result.valid += len(items)
+        elif items:
+            self.write(items)
+
+    def normalize(self, record):
+        data = {}
+        for key, value in record.items():
+            name = self.aliases.get(str(key or "").strip().lower())
+            if name:
+                data[name] = value.strip() if isinstance(value, str) else value
+        return data
+
+    def write(self, items):
+        """Grava o lote em um savepoint; em conflito, isola linha a linha"""
+        try:
+            with transaction.atomic(using=self.db):
+                created = self.model.objects.using(self.db).bulk_create([obj for _, _, obj in items])
+                self.after_create(created)
+        except IntegrityError:
+            # Ex.: o mesmo CPF/CNPJ cadastrado por outra requisição no meio do lote
+            created = []
+            for number, record, obj in items:
+                try:
+                    with transaction.atomic(using=self.db):
+                        self.model.objects.using(self.db).bulk_create([obj])
+                    created.append(obj)
+                except IntegrityError as error:
+                    self.error(number, f"conflito ao gravar: {error}", record)
+            with transaction.atomic(using=self.db):
+                self.after_create(created)
+        if created:
+            counts.invalidate(self.model)
+            dashboard.invalidate(*(obj.usuario_id for obj in created))
+        self.result.created += len(created)
+
+    def after_create(self, created):
+        """Logs de auditoria do lote (um bulk_create)"""
+        logs = [
+            build_log(self.user, "create", instance=obj, state=describe_save(self.model, obj, True)[2])
+            for obj in created
+        ]
+        ActivityLog.objects.using(router.db_for_write(ActivityLog)).bulk_create(logs)
+
+    def error(self, number, message, record):
+        self.result.errors += 1
+        if len(self.result.error_samples) < ERROR_SAMPLE_SIZE:
+            self.result.error_samples.append((number, message))
+        if self._report:
+            self._report.writerow([number, message, json.dumps(record, ensure_ascii=False, default=str)])
+
+    # --- referências ---
+
+    def _city_key(self, data, required_city):
+        city, uf = optional(data, "city"), optional(data, "state").upper()
+        if not city and not uf:
+            if required_city:
+                raise RowError("cidade e UF obrigatórias")
+            return None
+        if not city or not uf:
+            raise RowError("informe cidade e UF juntas")
+        return city, uf
+
+    def resolve_cities(self, keys):
+        """
+        Cidades por (nome, UF), com poucas consultas por lote
+
+        Cidades que ainda não existem são criadas quando a UF existe.
+
+        Returns:
+            dict: {(nome em minúsculas, UF): City}
+        """
+        missing = {(name, uf) for name, uf in keys if (name.lower(), uf) not in self._cities}
+        if missing:
+            states = {
+                state.abbreviation.upper(): state
+                for state in State.objects.filter(abbreviation__in={uf for _, uf in missing})
+            }
+            names = {name for name, _ in missing}
+
+            def load():
+                for city in City.objects.filter(state__in=states.values(), name__in=names).select_related("state"):
+                    self._cities[(city.name.lower(), city.state.abbreviation.upper())] = city
+
+            load()
+            new = {
+                (name.lower(), uf): City(name=name, state=states[uf])
+                for name, uf in missing
+                if uf in states and (name.lower(), uf) not in self._cities
+            }
+            if new:
+                City.objects.bulk_create(new.values(), ignore_conflicts=True)
+                counts.invalidate(City)
+                load()
+        return self._cities
+
+    def _existing(self, field, values):
+        return set(
+            self.model.objects.filter(**{f"{field}__in": values}).values_list(field, flat=True)
+        )
+
+
+class CompanyImporter(BaseImporter):
+    model = Company
+    columns = exports.COMPANY_COLUMNS
+    extra_fields = ("data_controller_name", "data_controller_email", "consent_text")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._seen = set()
+
+    def clean(self, data):
+        cnpj = required(data, "cnpj", "CNPJ")
+        if not is_valid_cnpj(cnpj):
+            raise RowError(f"CNPJ inválido: {cnpj}")
+        email = optional(data, "data_controller_email")
+        if email:
+            try:
+                validate_email(email)
+            except ValidationError:
+                raise RowError(f"e-mail do controlador inválido: {email}")
+        return {
+            "corporate_name": required(data, "corporate_name", "razão social"),
+            "trade_name": optional(data, "trade_name"),
+            "cnpj": format_cnpj(cnpj),
+            "cnpj_digits": only_digits(cnpj),
+            "phone": optional(data, "phone"),
+            "address": optional(data, "address"),
+            "data_controller_name": optional(data, "data_controller_name"),
+            "data_controller_email": email,
+            "consent_text": optional(data, "consent_text"),
+            "_city": self._city_key(data, required_city=False),
+        }
+
+    def resolve(self, cleaned):
+        existing = set()
+        if self.reject_existing:
+            existing = self._existing("cnpj_digits", [values["cnpj_digits"] for _, _, values in cleaned])
+        cities = self.resolve_cities({v["_city"] for _, _, v in cleaned if v["_city"]})
+
+        items = []
+        for number, record, values in cleaned:
+            city_key = values.pop("_city")
+            city = None
+            if city_key:
+                city = cities.get((city_key[0].lower(), city_key[1]))
+                if city is None:
+                    self.error(number, f"UF não encontrada: {city_key[1]}", record)
+                    continue
+            if values["cnpj_digits"] in existing or values["cnpj_digits"] in self._seen:
+                self.error(number, f"CNPJ já cadastrado ou repetido: {values['cnpj']}", record)
+                continue
+            self._seen.add(values["cnpj_digits"])
+            items.append((number, record, Company(city=city, usuario=self.user, **values)))
+        return items
+
+
+class PersonImporter(BaseImporter):
+    model = Person
+    columns = exports.PERSON_COLUMNS
+    extra_fields = ("data_processing_purpose",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._seen = set()
+
+    def clean(self, data):
+        cpf = required(data, "cpf", "CPF")
+        if not is_valid_cpf(cpf):
+            raise RowError(f"CPF inválido: {cpf}")
+        return {
+            "full_name": required(data, "full_name", "nome"),
+            "cpf": format_cpf(cpf),
+            "cpf_digits": only_digits(cpf),
+            "phone": optional(data, "phone"),
+            "birth_date": parse_date(data.get("birth_date"), required=True, label="data de nascimento"),
+            "address": required(data, "address", "endereço"),
+            "data_processing_purpose": optional(data, "data_processing_purpose"),
+            "_city": self._city_key(data, required_city=True),
+        }
+
+    def resolve(self, cleaned):
+        existing = set()
+        if self.reject_existing:
+            existing = self._existing("cpf_digits", [values["cpf_digits"] for _, _, values in cleaned])
+        cities = self.resolve_cities({v["_city"] for _, _, v in cleaned})
+
+        items = []
+        for number, record, values in cleaned:
+            name, uf = values.pop("_city")
+            city = cities.get((name.lower(), uf))
+            if city is None:
+                self.error(number, f"UF não encontrada: {uf}", record)
+                continue
+            if values["cpf_digits"] in existing or values["cpf_digits"] in self._seen:
+                self.error(number, f"CPF já cadastrado ou repetido: {values['cpf']}", record)
+                continue
+            self._seen.add(values["cpf_digits"])
+            items.append((number, record, Person(city=city, usuario=self.user, **values)))
+        return items
+
+
+class ContractImporter(BaseImporter):
+    model = Contract
+    columns = exports.CONTRACT_COLUMNS
+    extra_fields = ("description", "data_processing_purpose")
+
+    CONTRACT_TYPES = {
+        **{code.lower(): code for code, _ in Contract.CONTRACT_TYPES},
+        **{label.lower(): code for code, label in Contract.CONTRACT_TYPES},
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._companies = {}
+        self._persons = {}
+
+    def clean(self, data):
+        cnpj, cpf = required(data, "cnpj", "CNPJ da empresa"), required(data, "cpf", "CPF da pessoa")
+        if not is_valid_cnpj(cnpj):
+            raise RowError(f"CNPJ inválido: {cnpj}")
+        if not is_valid_cpf(cpf):
+            raise RowError(f"CPF inválido: {cpf}")
+
+        contract_type = optional(data, "contract_type")
+        code = self.CONTRACT_TYPES.get(contract_type.lower()) if contract_type else "SERVICO"
+        if code is None:
+            raise RowError(f"tipo de contrato inválido: {contract_type}")
+
+        start = parse_date(data.get("start_date"), label="data de início")
+        end = parse_date(data.get("end_date"), label="data de fim")
+        if start and end and end <= start:
+            raise RowError("a data de fim deve ser posterior à data de início")
+
+        return {
+            "title": required(data, "title", "título"),
+            "description": optional(data, "description"),
+            "contract_type": code,
+            "start_date": start,
+            "end_date": end,
+            "value": parse_decimal(data.get("value")),
+            "is_active": parse_bool(data.get("is_active")),
+            "data_processing_purpose": optional(data, "data_processing_purpose"),
+            "external_id": optional(data, "external_id") or None,
+            "_cnpj": only_digits(cnpj),
+            "_cpf": only_digits(cpf),
+        }
+
+    def _lookup(self, model, field, values, cache):
+        """Preenche o cache {documento: id} com o que falta (escopo do usuário)"""
+        missing = {value for value in values if value not in cache}
+        if missing:
+            qs = model.objects.filter(**{f"{field}__in": missing})
+            if not roles.is_admin(self.user):
+                qs = qs.filter(usuario=self.user)
+            cache.update(qs.values_list(field, "pk"))
+        return cache
+
+    def resolve(self, cleaned):
+        companies = self._lookup(Company, "cnpj_digits", {v["_cnpj"] for _, _, v in cleaned}, self._companies)
+        persons = self._lookup(Person, "cpf_digits", {v["_cpf"] for _, _, v in cleaned}, self._persons)
+
+        items = []
+        for number, record, values in cleaned:
+            cnpj, cpf = values.pop("_cnpj"), values.pop("_cpf")
+            if cnpj not in companies:
+                self.error(number, f"empresa não encontrada (CNPJ {format_cnpj(cnpj)})", record)
+                continue
+            if cpf not in persons:
+                self.error(number, f"pessoa não encontrada (CPF {format_cpf(cpf)})", record)
+                continue
+            items.append((number, record, Contract(
+                company_id=companies[cnpj], person_id=persons[cpf], usuario=self.user, **values
+            )))
+        return items
+
+    def after_create(self, created):
+        """Movimentos, logs e contadores das empresas: uma vez por lote"""
+        with ContractEventBatch(self.user) as batch:
+            batch.record_bulk(created, metadata={"source": "import"})
+
+
+IMPORTERS = {
+    "companies": CompanyImporter,
+    "persons": PersonImporter,
+    "contracts": ContractImporter,
+}
+
+KIND_CHOICES = [
+    ("companies", "Empresas"),
+    ("persons", "Pessoas"),
+    ("contracts", "Contratos"),
+]
+
+
+def import_file(kind, stream, fmt, user, report=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Importa um arquivo texto (CSV ou JSONL) de empresas, pessoas ou contratos
+
+    Args:
+        kind: "companies", "persons" ou "contracts"
+        stream: arquivo texto aberto (newline="" para CSV)
+        fmt: "csv" ou "jsonl"
+        user: dono dos registros criados (e autor nos logs)
+        report: arquivo texto para o relatório de erros (opcional)
+
+    Returns:
+        ImportResult
+    """
+    importer = IMPORTERS[kind](user, batch_size=batch_size, report=report, dry_run=dry_run)
+    return importer.run(read_rows(stream, fmt))
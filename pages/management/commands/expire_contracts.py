@@ -0,0 +1,117 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from pages.events import ContractEventBatch
+from pages.models import Contract
+
+
+class Command(BaseCommand):
+    """
+    Desativa contratos ativos cuja data de fim já passou
+
+    Pensado para rodar pelo cron junto com o tráfego normal: os vencidos são
+    encontrados pelo índice parcial (end_date) WHERE is_active e desativados
+    em lotes pequenos, cada um na sua transação, com SELECT ... FOR UPDATE
+    SKIP LOCKED (contratos sendo editados no momento ficam para a próxima
+    execução). Movimentos "deactivated", logs de auditoria e contadores das
+    empresas são gravados em lote por pages.events.
+
+    Uso:
+    python manage.py expire_contracts
+    python manage.py expire_contracts --batch-size 200 --sleep 0.5
+    python manage.py expire_contracts --date 2025-12-31 --dry-run
+    """
+
+    help = 'Desativa contratos com data de fim vencida'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', type=date.fromisoformat,
+            help='Data de referência AAAA-MM-DD (vencidos: end_date anterior a ela); padrão: hoje'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Contratos por lote/transação (padrão: 500)'
+        )
+        parser.add_argument(
+            '--max-batches', type=int, default=0,
+            help='Para depois de N lotes (padrão: 0 = até acabar)'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Pausa em segundos entre lotes, para aliviar o banco (padrão: 0)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas lista os contratos que seriam desativados'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero')
+
+        reference = options['date'] or timezone.localdate()
+        expired = Contract.objects.filter(is_active=True, end_date__lt=reference)
+
+        self.stdout.write(self.style.SUCCESS('⏰ CONTRATOS VENCIDOS'))
+        self.stdout.write('=' * 50)
+        self.stdout.write(f'📅 Vencidos antes de {reference:%d/%m/%Y}')
+
+        if options['dry_run']:
+            self._dry_run(expired)
+            return
+
+        started = time.monotonic()
+        total = batches = 0
+        while not options['max_batches'] or batches < options['max_batches']:
+            batch_started = time.monotonic()
+            with ContractEventBatch(None) as batch:
+                contracts = list(
+                    expired.select_related('company', 'person')
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .order_by('end_date')[:options['batch_size']]
+                )
+                done = batch.apply_active(contracts, False, metadata={'reason': 'expired'})
+            if not done:
+                break
+
+            total += done
+            batches += 1
+            if options['verbosity'] >= 2:
+                elapsed = time.monotonic() - batch_started
+                self.stdout.write(f'   Lote {batches}: {done} contrato(s) em {elapsed:.2f}s')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total} contrato(s) desativado(s) em {batches} lote(s), '
+            f'{elapsed:.2f}s ({rate:.1f} contratos/s)'
+        ))
+
+        # Lote limitado ou contratos travados por outras transações
+        pending = expired.count()
+        if pending:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {pending} contrato(s) vencido(s) ficaram para a próxima execução'
+            ))
+
+    def _dry_run(self, expired):
+        """Lista o que seria desativado, sem travar nem alterar nada"""
+        rows = (
+            expired.order_by('end_date', 'pk')
+            .values_list('pk', 'title', 'end_date', 'company__corporate_name')
+        )
+        for pk, title, end_date, company in rows.iterator():
+            self.stdout.write(f'   #{pk} {title} ({company}) - fim em {end_date:%d/%m/%Y}')
+
+        summary = expired.aggregate(total=Count('pk'), value=Sum('value'), companies=Count('company', distinct=True))
+        self.stdout.write(
+            f'🔍 [dry-run] {summary["total"]} contrato(s) seriam desativados '
+            f'em {summary["companies"]} empresa(s) (valor ativo: R$ {summary["value"] or 0})'
+        )
@@ -0,0 +1,94 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.imports import BATCH_SIZE, FORMATS, IMPORTERS, check_utf8, guess_format, import_file
+
+
+class Command(BaseCommand):
+    """
+    Importa empresas, pessoas ou contratos de um arquivo CSV ou JSONL
+
+    O arquivo é lido em stream e gravado em lotes (bulk_create), com
+    auditoria e contadores das empresas gravados uma vez por lote. Linhas
+    com erro vão para o relatório (padrão: <arquivo>.erros.csv).
+
+    Uso:
+    python manage.py import_data companies empresas.csv --user admin
+    python manage.py import_data persons pessoas.jsonl --user admin --batch-size 2000
+    python manage.py import_data contracts contratos.csv --user admin --dry-run
+    """
+
+    help = 'Importa empresas, pessoas ou contratos em lote (CSV ou JSONL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(IMPORTERS), help='Tipo de registro do arquivo')
+        parser.add_argument('path', help='Arquivo CSV (";" ou ",") ou JSONL')
+        parser.add_argument(
+            '--user', required=True,
+            help='Usuário dono dos registros importados'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Formato do arquivo; padrão: pela extensão (.jsonl/.ndjson ou CSV)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help=f'Linhas por lote (padrão: {BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--report',
+            help='Arquivo do relatório de erros (padrão: <arquivo>.erros.csv)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas valida e resolve as referências, sem gravar'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Usuário '{options['user']}' não encontrado")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero')
+
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        report_path = options['report'] or f'{path}.erros.csv'
+
+        self.stdout.write(self.style.SUCCESS('📥 IMPORTAÇÃO EM LOTE'))
+        self.stdout.write('=' * 50)
+        self.stdout.write(f'📄 {path} ({fmt}) -> {options["kind"]}')
+
+        try:
+            # Codificação conferida antes: a gravação é lote a lote
+            with open(path, 'rb') as raw:
+                check_utf8(iter(lambda: raw.read(64 * 1024), b''))
+            with open(path, encoding='utf-8-sig', newline='') as stream, \
+                    open(report_path, 'w', encoding='utf-8-sig', newline='') as report:
+                result = import_file(
+                    options['kind'], stream, fmt, user, report=report,
+                    batch_size=options['batch_size'], dry_run=options['dry_run'],
+                )
+        except OSError as error:
+            raise CommandError(f'Não foi possível ler o arquivo: {error}')
+        except UnicodeDecodeError:
+            raise CommandError('O arquivo precisa estar em UTF-8 (nada foi importado).')
+
+        if options['dry_run']:
+            self.stdout.write(f'🔍 [dry-run] {result.valid} de {result.read} linha(s) válidas')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {result.created} de {result.read} registro(s) importado(s)'
+            ))
+        self.stdout.write(
+            f'⏱️ {result.elapsed:.2f}s ({result.rows_per_minute:,.0f} linhas/min)'
+        )
+        if result.errors:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {result.errors} linha(s) com erro - relatório em {report_path}'
+            ))
+        else:
+            os.remove(report_path)
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from pages.counters import counter_expressions, reconcile_counters
+from pages.models import Company
+
+
+class Command(BaseCommand):
+    """
+    Reconstrói os contadores de contratos das empresas em um único UPDATE
+    
+    Os contadores são mantidos por deltas atômicos a cada alteração de
+    contrato; este comando corrige divergências causadas por alterações
+    feitas por fora (queryset.update(), SQL direto, restauração de backup).
+    
+    Uso:
+    python manage.py reconcile_company_counters
+    python manage.py reconcile_company_counters --company 12 --company 15
+    python manage.py reconcile_company_counters --dry-run
+    """
+    
+    help = 'Recalcula total_contracts, total_contract_value e last_contract_date'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company', type=int, action='append', dest='companies',
+            help='ID da empresa (pode repetir); padrão: todas'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas mostra quantas empresas estão com contadores divergentes'
+        )
+    
+    def handle(self, *args, **options):
+        queryset = Company.objects.all()
+        if options['companies']:
+            queryset = queryset.filter(pk__in=options['companies'])
+        
+        self.stdout.write(self.style.SUCCESS('🔢 CONTADORES DE CONTRATOS'))
+        self.stdout.write('=' * 50)
+        
+        expected = counter_expressions()
+        drifted = queryset.annotate(
+            expected_total=expected['total_contracts'],
+            expected_value=expected['total_contract_value'],
+            expected_last=expected['last_contract_date'],
+        ).exclude(
+            Q(total_contracts=F('expected_total'))
+            & Q(total_contract_value=F('expected_value'))
+            & (Q(last_contract_date=F('expected_last'))
+               | Q(last_contract_date__isnull=True, expected_last__isnull=True))
+        ).count()
+        
+        if options['dry_run']:
+            self.stdout.write(f'🔍 [dry-run] {drifted} empresa(s) com contadores divergentes')
+            return
+        
+        with transaction.atomic():
+            updated = reconcile_counters(queryset)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {updated} empresa(s) recalculada(s) ({drifted} estavam divergentes)'
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 16:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+from pages.counters import reconcile_counters
+
+
+def fill_counters(apps, schema_editor):
+    """Preenche os novos contadores (e corrige total_contracts) em um UPDATE"""
+    Company = apps.get_model('pages', 'Company')
+    Contract = apps.get_model('pages', 'Contract')
+    reconcile_counters(Company.objects.all(), Contract)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0009_company_consent_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='last_contract_date',
+            field=models.DateTimeField(blank=True, help_text='Data de criação do contrato mais recente da empresa', null=True, verbose_name='Último Contrato'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='total_contract_value',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Soma dos valores dos contratos ativos vinculados a esta empresa', max_digits=14, verbose_name='Valor Total em Contratos'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['company', '-created_at'], name='pages_contr_company_fb9cdd_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0012_person_usuario_fk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Identificador do contrato no sistema de origem (sincronização)', max_length=64, null=True, unique=True, verbose_name='ID Externo'),
+        ),
+    ]
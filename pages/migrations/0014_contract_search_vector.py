@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-18 16:26
+# Busca textual em contratos: tsvector (português) mantido por trigger + índice GIN (apenas PostgreSQL)
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='pages_contract_search_idx')
+
+# Título com peso A e descrição com peso B (o título pesa mais no ranking)
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION pages_contract_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.portuguese', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.portuguese', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS pages_contract_search_vector_trigger ON pages_contract;
+CREATE TRIGGER pages_contract_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON pages_contract
+    FOR EACH ROW EXECUTE FUNCTION pages_contract_search_vector_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS pages_contract_search_vector_trigger ON pages_contract;
+DROP FUNCTION IF EXISTS pages_contract_search_vector_update();
+"""
+
+
+def create_search(apps, schema_editor):
+    """Trigger, preenchimento das linhas existentes e índice GIN"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER)
+    # O trigger recalcula o vetor (UPDATE OF search_vector)
+    schema_editor.execute('UPDATE pages_contract SET search_vector = NULL')
+    schema_editor.add_index(apps.get_model('pages', 'Contract'), SEARCH_INDEX)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('pages', 'Contract'), SEARCH_INDEX)
+    schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0013_contract_external_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Fora do estado dos modelos: o SQLite recria a tabela em AlterField
+        # com todos os índices do estado e não conhece GIN
+        migrations.RunPython(create_search, drop_search),
+    ]
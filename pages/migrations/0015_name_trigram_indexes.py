@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 16:29
+# Busca por nome sem acento e por trecho: unaccent + pg_trgm, índices GIN (apenas PostgreSQL)
+
+import django.contrib.postgres.indexes
+import pages.search
+from django.conf import settings
+from django.db import migrations
+
+NAME_INDEXES = [
+    ('city', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(pages.search.Unaccent('name'), name='gin_trgm_ops'), name='pages_city_name_trgm_idx')),
+    ('company', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(pages.search.Unaccent('corporate_name'), name='gin_trgm_ops'), name='pages_company_name_trgm_idx')),
+    ('person', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(pages.search.Unaccent('full_name'), name='gin_trgm_ops'), name='pages_person_name_trgm_idx')),
+]
+
+# unaccent() da extensão é STABLE (depende do search_path); a versão com
+# schema e dicionário fixos pode ser IMMUTABLE e usada em índices
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION pages_unaccent(text) RETURNS text AS $$
+    SELECT {schema}.unaccent('{schema}.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+"""
+
+
+def create_name_search(apps, schema_editor):
+    """Extensões, função pages_unaccent e índices trigram"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with schema_editor.connection.cursor() as cursor:
+        # Pode estar fora do public (ex.: schema "extensions" no Supabase)
+        cursor.execute("SELECT extnamespace::regnamespace::text FROM pg_extension WHERE extname = 'unaccent'")
+        schema = cursor.fetchone()[0]
+    schema_editor.execute(CREATE_FUNCTION.format(schema=schema))
+    for model_name, index in NAME_INDEXES:
+        schema_editor.add_index(apps.get_model('pages', model_name), index)
+
+
+def drop_name_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in NAME_INDEXES:
+        schema_editor.remove_index(apps.get_model('pages', model_name), index)
+    schema_editor.execute('DROP FUNCTION IF EXISTS pages_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0014_contract_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Fora do estado dos modelos (ver 0014)
+        migrations.RunPython(create_name_search, drop_name_search),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-18 16:41
+# CPF/CNPJ canônicos (só dígitos) com índice único: busca exata e por prefixo
+
+from django.db import migrations, models
+from django.db.models import Count
+
+from pages.validators import only_digits
+
+BATCH_SIZE = 2000
+
+
+def fill_digits(model, field):
+    """Preenche <campo>_digits a partir do documento com máscara"""
+    target = f'{field}_digits'
+    pending = []
+    for pk, value in model.objects.values_list('pk', field).iterator(chunk_size=BATCH_SIZE):
+        pending.append(model(pk=pk, **{target: only_digits(value)}))
+        if len(pending) >= BATCH_SIZE:
+            model.objects.bulk_update(pending, [target])
+            pending = []
+    if pending:
+        model.objects.bulk_update(pending, [target])
+
+    # Agrupado no banco: só os documentos repetidos voltam
+    duplicated = list(
+        model.objects.values(target).annotate(n=Count('pk')).filter(n__gt=1)
+        .order_by(target).values_list(target, flat=True)[:20]
+    )
+    if duplicated:
+        raise RuntimeError(
+            f'{model.__name__}: documentos repetidos com máscaras diferentes, '
+            f'corrija antes de migrar: {", ".join(duplicated)}'
+        )
+
+
+def fill_document_digits(apps, schema_editor):
+    fill_digits(apps.get_model('pages', 'Person'), 'cpf')
+    fill_digits(apps.get_model('pages', 'Company'), 'cnpj')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0015_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='cpf_digits',
+            field=models.CharField(editable=False, max_length=11, null=True, verbose_name='CPF (dígitos)'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='cnpj_digits',
+            field=models.CharField(editable=False, max_length=14, null=True, verbose_name='CNPJ (dígitos)'),
+        ),
+        migrations.RunPython(fill_document_digits, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='person',
+            name='cpf_digits',
+            field=models.CharField(editable=False, max_length=11, unique=True, verbose_name='CPF (dígitos)'),
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='cnpj_digits',
+            field=models.CharField(editable=False, max_length=14, unique=True, verbose_name='CNPJ (dígitos)'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 16:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0016_document_digits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['usuario', 'corporate_name', 'id'], name='pages_company_owner_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['corporate_name', 'id'], name='pages_company_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['usuario', '-created_at', '-id'], name='pages_contract_owner_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['usuario', 'full_name', 'id'], name='pages_person_owner_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['full_name', 'id'], name='pages_person_name_idx'),
+        ),
+    ]
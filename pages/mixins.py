@@ -4,6 +4,8 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.http import Http404
 
+from usuarios import roles
+
 
 class OwnerQuerysetMixin(LoginRequiredMixin):
     """
@@ -14,9 +16,8 @@ class OwnerQuerysetMixin(LoginRequiredMixin):
     owner_field_name = "usuario"  # Padrão do projeto Athena
 
     def is_admin(self):
-        """Verifica se o usuário é admin ou superuser"""
-        u = self.request.user
-        return u.is_superuser or u.groups.filter(name="empresa_admin").exists()
+        """Verifica se o usuário é admin ou superuser (grupos em cache por requisição)"""
+        return roles.is_admin(self.request.user)
 
     def get_queryset(self):
         """Aplica filtro de escopo por usuário"""
@@ -35,29 +36,32 @@ class OwnerObjectPermissionMixin(UserPassesTestMixin):
     """
     Garante que o objeto pertence ao usuário (ou que ele é admin).
     Use em Detail/Update/DeleteView.
+
+    O objeto é buscado UMA única vez por requisição, com o queryset otimizado
+    da view (select_related/prefetch_related) e com o filtro de dono já no
+    WHERE para usuários comuns. test_func e a view genérica reutilizam a
+    mesma instância.
     """
     owner_field_name = "usuario"  # Padrão do projeto Athena
 
     def is_admin(self):
-        """Verifica se o usuário é admin ou superuser"""
-        u = self.request.user
-        return u.is_superuser or u.groups.filter(name="empresa_admin").exists()
+        """Verifica se o usuário é admin ou superuser (grupos em cache por requisição)"""
+        return roles.is_admin(self.request.user)
 
     def test_func(self):
         """Testa se o usuário pode acessar o objeto"""
         try:
             obj = self.get_object()
-            
-            # Admin pode tudo
-            if self.is_admin():
-                return True
-            
-            # Verifica se o objeto pertence ao usuário
-            owner = getattr(obj, self.owner_field_name, None)
-            return owner == self.request.user
-            
         except Exception:
             return False
+        
+        # Admin pode tudo
+        if self.is_admin():
+            return True
+        
+        # Verifica o dono no registro já carregado (sem nova query)
+        owner_id = getattr(obj, f'{self.owner_field_name}_id', None)
+        return owner_id == self.request.user.pk
 
     def handle_no_permission(self):
         """Customiza tratamento de acesso negado"""
@@ -72,32 +76,44 @@ class OwnerObjectPermissionMixin(UserPassesTestMixin):
         except:
             return redirect('home')
 
-    def get_object(self, queryset=None):
+    def get_owner_scoped_queryset(self, queryset=None):
         """
-        Sobrescreve get_object para garantir escopo por usuário
+        Queryset da view com escopo de dono aplicado no WHERE
+
+        Mantém select_related/prefetch_related definidos em get_queryset().
+        Se a view já usa OwnerQuerysetMixin o escopo não é duplicado.
         """
         if queryset is None:
             queryset = self.get_queryset()
+            if isinstance(self, OwnerQuerysetMixin):
+                return queryset
+        
+        if self.is_admin():
+            return queryset
+        
+        return queryset.filter(**{self.owner_field_name: self.request.user})
+
+    def get_object(self, queryset=None):
+        """
+        Busca o objeto uma única vez por requisição (com escopo por usuário)
+        """
+        use_cache = queryset is None
+        if use_cache and getattr(self, '_owner_object_cache', None) is not None:
+            return self._owner_object_cache
+        
+        queryset = self.get_owner_scoped_queryset(queryset)
         
-        # Busca o objeto pelo pk
         pk = self.kwargs.get(self.pk_url_kwarg)
         if pk is not None:
-            # Admin pode acessar qualquer objeto
-            if self.is_admin():
-                queryset = self.model.objects.all()
-            else:
-                # Usuário comum apenas seus objetos
-                filter_kwargs = {
-                    'pk': pk,
-                    self.owner_field_name: self.request.user
-                }
-                queryset = queryset.filter(**filter_kwargs)
+            queryset = queryset.filter(pk=pk)
         
         try:
             obj = queryset.get()
         except queryset.model.DoesNotExist:
             raise Http404(f"Nenhum {self.model._meta.verbose_name} encontrado.")
         
+        if use_cache:
+            self._owner_object_cache = obj
         return obj
 
 
@@ -128,24 +144,17 @@ class GroupRequiredMixin(UserPassesTestMixin):
             
         user = self.request.user
         
-        # Superuser sempre pode acessar
-        if user.is_superuser:
+        # Superuser e empresa_admin (grupo master) sempre podem acessar
+        if roles.is_admin(user):
             return True
         
-        # Empresa admin sempre pode acessar (grupo master)
-        if user.groups.filter(name="empresa_admin").exists():
-            return True
-        
-        # Verificar grupo específico
+        # Verificar grupo específico (nomes dos grupos já em cache)
         if isinstance(self.group_required, str):
             # Grupo único
-            return user.groups.filter(name=self.group_required).exists()
+            return roles.in_group(user, self.group_required)
         elif isinstance(self.group_required, (list, tuple)):
             # Lista de grupos - usuário deve estar em pelo menos um
-            for group_name in self.group_required:
-                if user.groups.filter(name=group_name).exists():
-                    return True
-            return False
+            return roles.in_group(user, *self.group_required)
         
         return False
     
@@ -191,8 +200,7 @@ class AdminOnlyMixin(UserPassesTestMixin):
     """Apenas superuser ou empresa_admin - versão legacy"""
     
     def test_func(self):
-        u = self.request.user
-        return u.is_superuser or u.groups.filter(name="empresa_admin").exists()
+        return roles.is_admin(self.request.user)
     
     def handle_no_permission(self):
         messages.error(self.request, "❌ Acesso restrito a administradores.")
@@ -1,8 +1,11 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.utils import timezone
 
+from .validators import only_digits
+
 User = get_user_model()
 
 
@@ -30,6 +33,8 @@ class City(models.Model):
         verbose_name_plural = "Cidades"
         ordering = ['name']
         unique_together = ['name', 'state']
+        # Índice GIN trigram (pages_city_name_trgm_idx) criado só no PostgreSQL pela
+        # migração 0015 (pages.search.search_names)
     
     def __str__(self):
         return f"{self.name}/{self.state.abbreviation}"
@@ -42,6 +47,8 @@ class Person(models.Model):
     # Dados pessoais
     full_name = models.CharField(max_length=200, verbose_name="Nome Completo")
     cpf = models.CharField(max_length=14, unique=True, verbose_name="CPF")
+    # Chave canônica (só dígitos), preenchida no save(): busca exata/por prefixo e unicidade
+    cpf_digits = models.CharField(max_length=11, unique=True, editable=False, verbose_name="CPF (dígitos)")
     
     # ✅ Phone opcional (pode preencher depois)
     phone = models.CharField(
@@ -65,11 +72,11 @@ class Person(models.Model):
         default=""
     )
     
-    # Relacionamento
-    usuario = models.OneToOneField(
+    # Relacionamento com usuário (owner) - um usuário cadastra várias pessoas
+    usuario = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.CASCADE, 
-        related_name="person",
+        related_name="persons",
         verbose_name="Usuário Responsável"
     )
     
@@ -81,9 +88,23 @@ class Person(models.Model):
         verbose_name = "Pessoa Física"
         verbose_name_plural = "Pessoas Físicas"
         ordering = ['full_name']
+        # Paginação por chave (auditoria.pagination): mesma ordem da lista, com e sem escopo por usuário
+        indexes = [
+            models.Index(fields=['usuario', 'full_name', 'id'], name='pages_person_owner_name_idx'),
+            models.Index(fields=['full_name', 'id'], name='pages_person_name_idx'),
+        ]
+        # Índice GIN trigram (pages_person_name_trgm_idx) criado só no PostgreSQL pela
+        # migração 0015 (pages.search.search_names)
     
     def __str__(self):
         return self.full_name
+    
+    def save(self, *args, **kwargs):
+        self.cpf_digits = only_digits(self.cpf)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'cpf' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'cpf_digits'}
+        super().save(*args, **kwargs)
 
 
 class Company(models.Model):
@@ -93,6 +114,8 @@ class Company(models.Model):
     # Dados básicos obrigatórios
     corporate_name = models.CharField(max_length=200, verbose_name="Razão Social")
     cnpj = models.CharField(max_length=18, unique=True, verbose_name="CNPJ")
+    # Chave canônica (só dígitos), preenchida no save(): busca exata/por prefixo e unicidade
+    cnpj_digits = models.CharField(max_length=14, unique=True, editable=False, verbose_name="CNPJ (dígitos)")
     
     # ✅ TODOS OS CAMPOS OPCIONAIS COM blank=True E default
     trade_name = models.CharField(
@@ -156,13 +179,28 @@ class Company(models.Model):
         blank=True
     )
     
-    # Contador de contratos (automático)
+    # Contadores de contratos (automáticos, mantidos por pages.counters)
     total_contracts = models.IntegerField(
         default=0,
         verbose_name="Total de Contratos",
         help_text="Número total de contratos ativos vinculados a esta empresa"
     )
     
+    total_contract_value = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Valor Total em Contratos",
+        help_text="Soma dos valores dos contratos ativos vinculados a esta empresa"
+    )
+    
+    last_contract_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Último Contrato",
+        help_text="Data de criação do contrato mais recente da empresa"
+    )
+    
     # Relacionamento com usuário (owner)
     usuario = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
@@ -175,13 +213,37 @@ class Company(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
     
+    # Campos atualizados apenas por UPDATE atômico (F()), nunca pelo save()
+    COUNTER_FIELDS = ('total_contracts', 'total_contract_value', 'last_contract_date')
+    
     class Meta:
         verbose_name = "Empresa"
         verbose_name_plural = "Empresas"
         ordering = ['corporate_name']
+        # Paginação por chave (auditoria.pagination): mesma ordem da lista, com e sem escopo por usuário
+        indexes = [
+            models.Index(fields=['usuario', 'corporate_name', 'id'], name='pages_company_owner_name_idx'),
+            models.Index(fields=['corporate_name', 'id'], name='pages_company_name_idx'),
+        ]
+        # Índice GIN trigram (pages_company_name_trgm_idx) criado só no PostgreSQL pela
+        # migração 0015 (pages.search.search_names)
     
     def __str__(self):
         return self.trade_name if self.trade_name else self.corporate_name
+    
+    def save(self, *args, **kwargs):
+        self.cnpj_digits = only_digits(self.cnpj)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'cnpj' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'cnpj_digits'}
+        # Uma instância carregada antes de um contrato ser criado/excluído tem
+        # contadores desatualizados; o save() comum não os grava de volta
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
 
 class Contract(models.Model):
@@ -277,6 +339,19 @@ class Contract(models.Model):
         verbose_name="Usuário Responsável"
     )
     
+    # Identificador no sistema de origem (RH/ERP), chave da sincronização
+    external_id = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="ID Externo",
+        help_text="Identificador do contrato no sistema de origem (sincronização)"
+    )
+    
+    # Busca textual (PostgreSQL): preenchido por trigger a partir de title e description
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # Controle
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
@@ -287,8 +362,19 @@ class Contract(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['company', 'is_active']),
+            models.Index(fields=['company', '-created_at']),
             models.Index(fields=['person', 'is_active']),
             models.Index(fields=['-created_at']),
+            # Paginação por chave da lista (auditoria.pagination) com escopo por usuário
+            models.Index(fields=['usuario', '-created_at', '-id'], name='pages_contract_owner_date_idx'),
+            # Só contratos ativos: usado para achar os vencidos (expire_contracts)
+            models.Index(
+                fields=['end_date'],
+                name='pages_contract_expiring_idx',
+                condition=models.Q(is_active=True),
+            ),
+            # Busca textual: pages_contract_search_idx (GIN) é criado só no
+            # PostgreSQL pela migração 0014 (pages.search)
         ]
     
     def __str__(self):
@@ -0,0 +1,106 @@
+"""
+Consultas independentes em paralelo (uma conexão por thread)
+
+Com o banco remoto (pooler do Supabase) cada consulta custa ao menos um
+round trip, e uma página com várias consultas independentes (dashboard,
+detalhe do contrato) paga a soma delas. run_parallel executa as funções em
+um pool de threads, cada thread com a sua conexão (as conexões do Django
+são por thread), e a página passa a custar perto da consulta mais lenta.
+
+O ORM assíncrono do Django não resolve isso: as chamadas passam por
+sync_to_async(thread_sensitive=True) e rodam uma de cada vez na mesma
+thread. Com o pool, as views continuam síncronas e funcionam igual no
+gunicorn (WSGI) e em ASGI (Athena/Athena/asgi.py).
+
+As conexões das threads do pool ficam abertas entre as tarefas (no máximo
+PARALLEL_QUERY_WORKERS por processo): abrir uma conexão com o pooler
+(TCP + TLS + autenticação) custa vários round trips, mais do que as
+próprias consultas. Sem CONN_MAX_AGE (padrão 0), close_old_connections()
+fecharia a conexão a cada tarefa. Ao fim de cada tarefa a conexão só é
+fechada se ficou inutilizável após um erro de banco (ex.: derrubada pelo
+pooler) ou com o autocommit alterado; a próxima tarefa abre outra.
+Cada tarefa roda em uma cópia do contexto de quem chamou (contextvars), então
+a requisição atual da auditoria (auditoria.local) continua visível.
+
+Roda em sequência, na thread atual, quando:
+- settings.PARALLEL_QUERY_WORKERS é 0;
+- há uma transação aberta: as outras conexões não veem os dados dela
+  (inclui os testes, que rodam dentro de uma transação);
+- a chamada já vem de uma thread do pool (evita esperar pelo próprio pool).
+
+Exemplo:
+    results = run_parallel(
+        persons=lambda: list(Person.objects.filter(usuario=user)[:5]),
+        companies=lambda: list(Company.objects.filter(usuario=user)[:5]),
+    )
+    results["persons"]
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _workers():
+    return getattr(settings, "PARALLEL_QUERY_WORKERS", 0)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="athena-query")
+    return _executor
+
+
+def _release_connections():
+    """Mantém as conexões da thread abertas, exceto as que não podem ser reusadas"""
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is None:
+            continue
+        if connection.in_atomic_block or connection.get_autocommit() != connection.settings_dict["AUTOCOMMIT"]:
+            connection.close()
+        elif connection.errors_occurred:
+            if connection.is_usable():
+                connection.errors_occurred = False
+            else:
+                connection.close()
+
+
+def _run(func):
+    _worker.active = True
+    try:
+        return func()
+    finally:
+        _release_connections()
+
+
+def _in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+def run_parallel(**calls):
+    """
+    Executa as funções (sem argumentos) ao mesmo tempo
+
+    Returns:
+        dict: {nome: resultado}, na ordem dos argumentos
+
+    Raises:
+        a primeira exceção levantada por uma das funções
+    """
+    if len(calls) < 2 or not _workers() or _in_transaction() or getattr(_worker, "active", False):
+        return {name: func() for name, func in calls.items()}
+
+    executor = _get_executor()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _run, func)
+        for name, func in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,95 @@
+"""
+Busca textual em contratos e busca por nome (pessoas, empresas, cidades)
+
+No PostgreSQL usa Contract.search_vector (tsvector em português, título
+com peso A e descrição com peso B, mantido por trigger - migração 0014) e o
+índice GIN pages_contract_search_idx: o filtro não varre a tabela e os
+resultados vêm ordenados por relevância (ts_rank).
+
+A consulta aceita a sintaxe de busca web (websearch_to_tsquery):
+    rescisão multa            -> as duas palavras
+    "prestação de serviços"   -> a frase
+    consultoria -mensal       -> sem "mensal"
+
+Nomes (search_names) usam unaccent + pg_trgm: "joao" acha "João" e
+"sao paulo" acha "São Paulo", por trecho, com índices GIN (gin_trgm_ops)
+sobre pages_unaccent(nome) - migração 0015 - e ordenação por similaridade.
+
+Em outros bancos (ex.: SQLite nos testes) cai para icontains.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import BooleanField, F, Func, Q, TextField, Value
+
+SEARCH_CONFIG = "portuguese"
+
+_LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+
+class Unaccent(Func):
+    """
+    unaccent() imutável (função pages_unaccent, criada na migração 0015)
+
+    O unaccent() da extensão não é IMMUTABLE e não pode ser indexado.
+    """
+    function = "pages_unaccent"
+    output_field = TextField()
+
+
+class ILike(Func):
+    """lhs ILIKE padrão (usa os índices gin_trgm_ops; icontains gera UPPER() LIKE)"""
+    template = "%(expressions)s"
+    arg_joiner = " ILIKE "
+    output_field = BooleanField()
+
+
+def is_supported(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def search_contracts(queryset, text):
+    """
+    Filtra os contratos pelo texto e ordena por relevância
+
+    Mantém os filtros e o escopo já aplicados no queryset.
+    """
+    text = (text or "").strip()
+    if not text:
+        return queryset
+
+    if not is_supported(queryset):
+        return queryset.filter(Q(title__icontains=text) | Q(description__icontains=text))
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "-created_at")
+    )
+
+
+def search_names(queryset, field, text, order=False):
+    """
+    Filtra por trecho do nome, sem diferenciar acentos e maiúsculas
+
+    Args:
+        field: campo de texto (ex.: "full_name", "city__name")
+        order: ordena pela similaridade com o texto buscado (nome principal da lista)
+    """
+    text = (text or "").strip()
+    if not text:
+        return queryset
+
+    if not is_supported(queryset):
+        return queryset.filter(**{f"{field}__icontains": text})
+
+    # %, _ e \ do texto são literais no ILIKE
+    pattern = "%" + _LIKE_SPECIAL.sub(r"\\\1", text) + "%"
+    queryset = queryset.filter(ILike(Unaccent(field), Unaccent(Value(pattern))))
+    if order:
+        queryset = queryset.annotate(
+            similarity=TrigramSimilarity(Unaccent(field), Unaccent(Value(text)))
+        ).order_by("-similarity", field)
+    return queryset
@@ -1,7 +1,12 @@
-from django.db.models.signals import post_migrate
+from django.db import transaction
+from django.db.models.signals import post_migrate, post_init, pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import Group
 
+from auditoria.signals import SKIP_ATTR
+from . import counters, counts, dashboard
+from .models import City, Company, Contract, Person, State
+
 @receiver(post_migrate)
 def create_default_groups(sender, **kwargs):
     """
@@ -20,4 +25,99 @@ def create_default_groups(sender, **kwargs):
             print("Grupo 'funcionario' criado automaticamente")
         
         print("Grupos padrão criados/atualizados com sucesso!")
+
+
+@receiver(post_init, sender=Contract)
+def capture_contract_counter_state(sender, instance, **kwargs):
+    """
+    Guarda o estado do contrato ao carregar (para calcular o delta no save)
+    """
+    if instance.pk is not None:
+        setattr(instance, counters.STATE_ATTR, counters.contract_state(instance))
+
+
+@receiver(pre_save, sender=Contract)
+def lock_contract_counter_state(sender, instance, raw, using, update_fields, **kwargs):
+    """
+    Relê com lock o estado do contrato no banco (base do delta no post_save)
+    
+    O estado do post_init pode estar desatualizado: duas requisições que
+    desativam o mesmo contrato subtrairiam duas vezes.
+    """
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not counters.COUNTER_FIELDS.intersection(update_fields):
+        # Os contadores não mudam: o delta (instância x post_init) é zero
+        return
+    if not transaction.get_connection(using).in_atomic_block:
+        # select_for_update exige transação: fica o estado do post_init
+        return
+    state = counters.locked_state(instance, using)
+    if state is not None:
+        setattr(instance, counters.STATE_ATTR, state)
+
+
+@receiver(post_save, sender=Contract)
+def update_company_counters_on_save(sender, instance, created, **kwargs):
+    """
+    Atualiza os contadores da empresa com F() (criação, status, valor, troca)
+    """
+    new = counters.contract_state(instance)
+    old = None if created else getattr(instance, counters.STATE_ATTR, None)
+    
+    if not created and old is None:
+        # Instância sem estado original conhecido: recalcula só esta empresa
+        counters.reconcile_counters(Company.objects.filter(pk=instance.company_id))
+    else:
+        counters.apply_contract_change(old, new)
+    
+    setattr(instance, counters.STATE_ATTR, new)
+
+
+@receiver(post_delete, sender=Contract)
+def update_company_counters_on_delete(sender, instance, **kwargs):
+    """
+    Remove a contribuição do contrato excluído dos contadores da empresa
+    """
+    if getattr(instance, counters.BULK_ATTR, False):
+        # Exclusão em lote: contadores ajustados uma vez por empresa
+        return
+    
+    old = getattr(instance, counters.STATE_ATTR, None) or counters.contract_state(instance)
+    if old is not None:
+        counters.apply_contract_change(old, None)
+    elif instance.company_id:
+        counters.reconcile_counters(Company.objects.filter(pk=instance.company_id))
+
+
+def in_event_batch(instance):
+    """Gravado pelo pipeline de eventos (pages.events), que invalida uma vez por lote no flush"""
+    return getattr(instance, SKIP_ATTR, False) or getattr(instance, counters.BULK_ATTR, False)
+
+
+# Por modelo (sender): gravações de outros modelos nem entram no receiver
+@receiver([post_save, post_delete], sender=Person)
+@receiver([post_save, post_delete], sender=Company)
+@receiver([post_save, post_delete], sender=Contract)
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=State)
+def invalidate_list_counts(sender, instance, **kwargs):
+    """
+    Descarta os totais das listas em cache (pages.counts) do modelo gravado
+    """
+    if in_event_batch(instance):
+        return
+    counts.invalidate(sender)
+
+
+@receiver([post_save, post_delete], sender=Person)
+@receiver([post_save, post_delete], sender=Company)
+@receiver([post_save, post_delete], sender=Contract)
+def invalidate_dashboard(sender, instance, **kwargs):
+    """
+    Descarta o snapshot do dashboard (pages.dashboard) do dono do registro
+    """
+    if in_event_batch(instance):
+        return
+    dashboard.invalidate(instance.usuario_id)
 # Deploy: 2025-11-06 00:04:16
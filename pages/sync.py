@@ -0,0 +1,284 @@
+"""
+Sincronização em lote com sistemas externos (RH/ERP)
+
+Recebe empresas (chave: dígitos do CNPJ), pessoas (chave: dígitos do CPF)
+e contratos (chave: external_id) e grava com upsert em lote: um INSERT ... ON CONFLICT DO UPDATE
+por lote (bulk_create com update_conflicts). A validação e a resolução de
+referências são as mesmas da importação (pages.imports).
+
+Antes do upsert, os registros existentes do lote são lidos (e travados)
+com uma consulta, para:
+- devolver o resultado de cada registro (created/updated/unchanged/error);
+- gravar ContractMovement/ActivityLog em lote apenas do que mudou;
+- manter o dono original (usuários comuns não alteram registros de outros).
+
+Campos opcionais ausentes no registro mantêm o valor atual.
+
+Formatos aceitos:
+    JSON:   {"companies": [...], "persons": [...], "contracts": [...]}
+    NDJSON: uma linha por registro, com "type": "company" | "person" | "contract"
+
+O "index" de cada resultado começa em 1 nos dois formatos: posição do
+registro na sua lista (JSON) ou número da linha do corpo (NDJSON), o mesmo
+número das mensagens de erro ("linha 3") e do relatório da importação.
+"""
+import json
+
+from django.db import router, transaction
+
+from auditoria.models import ActivityLog
+from auditoria.signals import MONITORED_MODELS, checkpoint_state, describe_save, diff_instances, snapshot_instance
+from auditoria.utils import build_log
+from usuarios import roles
+
+from . import counters, counts, dashboard
+from .events import ContractEventBatch
+from .imports import BATCH_SIZE, CompanyImporter, ContractImporter, PersonImporter, RowError
+
+# Ordem de gravação: contratos referenciam empresas e pessoas da mesma carga
+SYNC_KINDS = ("companies", "persons", "contracts")
+
+# "type" de cada linha NDJSON
+NDJSON_TYPES = {"company": "companies", "person": "persons", "contract": "contracts"}
+
+CREATED, UPDATED, UNCHANGED, ERROR = "created", "updated", "unchanged", "error"
+
+
+class UpsertMixin:
+    """
+    Troca a gravação da importação (somente inclusão) por upsert
+
+    Subclasses definem key_field (campo único do ON CONFLICT) e sync_fields
+    (campos atualizados quando o registro já existe).
+    """
+    reject_existing = False
+    key_field = None
+    sync_fields = ()
+
+    # Campo do modelo -> chaves do registro que o preenchem
+    field_sources = {}
+
+    def __init__(self, user, **kwargs):
+        super().__init__(user, **kwargs)
+        self.records = []
+
+    def error(self, number, message, record):
+        self.result.errors += 1
+        self.records.append({"index": number, "status": ERROR, "error": message})
+
+    def _present_fields(self, record):
+        """Campos do modelo informados no registro (os demais mantêm o valor atual)"""
+        keys = set(self.normalize(record))
+        return {
+            field for field in self.sync_fields
+            if keys.intersection(self.field_sources.get(field, (field,)))
+        }
+
+    def _compare_state(self, instance):
+        state = snapshot_instance(instance)
+        return {field: state.get(field) for field in self.sync_fields}
+
+    def write(self, items):
+        with transaction.atomic(using=self.db):
+            keys = [getattr(obj, self.key_field) for _, _, obj in items]
+            existing = {
+                getattr(obj, self.key_field): obj
+                for obj in self.model.objects.using(self.db)
+                .select_for_update().filter(**{f"{self.key_field}__in": keys})
+            }
+
+            created, updated, pending = [], [], []
+            for number, record, obj in items:
+                key = getattr(obj, self.key_field)
+                old = existing.get(key)
+                if old is None:
+                    entry = {"index": number, "key": key, "status": CREATED}
+                    created.append(obj)
+                    pending.append((entry, obj))
+                    self.records.append(entry)
+                    continue
+
+                if old.usuario_id != self.user.pk and not roles.is_admin(self.user):
+                    self.error(number, "registro pertence a outro usuário", record)
+                    continue
+
+                present = self._present_fields(record)
+                for name in self.sync_fields:
+                    if name not in present:
+                        attname = self.model._meta.get_field(name).attname
+                        setattr(obj, attname, getattr(old, attname))
+                obj.usuario_id = old.usuario_id
+
+                changes = diff_instances(
+                    self._compare_state(old), self._compare_state(obj),
+                    exclude=MONITORED_MODELS[self.model]["exclude"],
+                )
+                entry = {"index": number, "key": key, "id": old.pk}
+                if not changes:
+                    entry["status"] = UNCHANGED
+                    self.records.append(entry)
+                    continue
+
+                entry.update(status=UPDATED, changes=sorted(changes))
+                updated.append((obj, old, changes))
+                pending.append((entry, obj))
+                self.records.append(entry)
+
+            objs = [obj for _, obj in pending]
+            if objs:
+                self.model.objects.using(self.db).bulk_create(
+                    objs,
+                    update_conflicts=True,
+                    unique_fields=[self.key_field],
+                    update_fields=[*self.sync_fields, "updated_at"],
+                )
+                self._fill_pks(objs)
+                for obj, old, _ in updated:
+                    # bulk_create preenche created_at; no banco continua o original
+                    obj.created_at = old.created_at
+                for entry, obj in pending:
+                    entry["id"] = obj.pk
+                self.after_upsert(created, updated)
+                counts.invalidate(self.model)
+                dashboard.invalidate(*(obj.usuario_id for obj in objs))
+
+        self.result.created += len(created)
+
+    def _fill_pks(self, objs):
+        """Ids das linhas gravadas, caso o banco não os devolva no upsert"""
+        missing = [obj for obj in objs if obj.pk is None]
+        if missing:
+            ids = dict(
+                self.model.objects.using(self.db)
+                .filter(**{f"{self.key_field}__in": [getattr(o, self.key_field) for o in missing]})
+                .values_list(self.key_field, "pk")
+            )
+            for obj in missing:
+                obj.pk = ids[getattr(obj, self.key_field)]
+
+    def after_upsert(self, created, updated):
+        """Logs de auditoria do lote (um bulk_create)"""
+        logs = [
+            build_log(self.user, "create", instance=obj, state=describe_save(self.model, obj, True)[2])
+            for obj in created
+        ]
+        logs += [
+            build_log(self.user, "update", instance=obj, changes=changes, state=checkpoint_state(self.model, obj))
+            for obj, _, changes in updated
+        ]
+        ActivityLog.objects.using(router.db_for_write(ActivityLog)).bulk_create(logs)
+
+
+class CompanySync(UpsertMixin, CompanyImporter):
+    key_field = "cnpj_digits"
+    sync_fields = (
+        "corporate_name", "trade_name", "phone", "address",
+        "data_controller_name", "data_controller_email", "consent_text", "city",
+    )
+    field_sources = {"city": ("city", "state")}
+
+
+class PersonSync(UpsertMixin, PersonImporter):
+    key_field = "cpf_digits"
+    sync_fields = ("full_name", "phone", "birth_date", "address", "data_processing_purpose", "city")
+    field_sources = {"city": ("city", "state")}
+
+
+class ContractSync(UpsertMixin, ContractImporter):
+    key_field = "external_id"
+    sync_fields = (
+        "title", "description", "contract_type", "start_date", "end_date",
+        "value", "is_active", "data_processing_purpose", "company", "person",
+    )
+    field_sources = {"company": ("cnpj",), "person": ("cpf",)}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._seen = set()
+
+    def clean(self, data):
+        values = super().clean(data)
+        if not values["external_id"]:
+            raise RowError("external_id obrigatório")
+        if values["external_id"] in self._seen:
+            raise RowError(f"external_id repetido: {values['external_id']}")
+        self._seen.add(values["external_id"])
+        return values
+
+    def after_upsert(self, created, updated):
+        """Movimentos, logs e contadores: apenas o que mudou, uma vez por lote"""
+        with ContractEventBatch(self.user) as batch:
+            batch.record_bulk(
+                created,
+                [(obj, counters.contract_state(old), changes) for obj, old, changes in updated],
+                metadata={"source": "sync"},
+            )
+
+
+SYNCERS = {
+    "companies": CompanySync,
+    "persons": PersonSync,
+    "contracts": ContractSync,
+}
+
+
+def parse_payload(body, ndjson=False):
+    """
+    Separa os registros do corpo da requisição por tipo
+
+    Returns:
+        dict: {tipo: [(índice a partir de 1, registro), ...]}
+
+    Raises:
+        ValueError: corpo inválido
+    """
+    payload = {kind: [] for kind in SYNC_KINDS}
+    text = body.decode("utf-8-sig") if isinstance(body, bytes) else body
+
+    if ndjson:
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise ValueError(f"linha {number}: JSON inválido")
+            kind = NDJSON_TYPES.get(record.get("type")) if isinstance(record, dict) else None
+            if kind is None:
+                raise ValueError(f"linha {number}: type deve ser company, person ou contract")
+            payload[kind].append((number, record))
+        return payload
+
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("esperado um objeto com companies, persons e/ou contracts")
+    for kind in SYNC_KINDS:
+        records = data.get(kind) or []
+        if not isinstance(records, list):
+            raise ValueError(f"{kind} deve ser uma lista")
+        payload[kind] = [
+            (index, record if isinstance(record, dict) else None)
+            for index, record in enumerate(records, start=1)
+        ]
+    return payload
+
+
+def sync_records(payload, user, batch_size=BATCH_SIZE):
+    """
+    Aplica a carga (empresas, depois pessoas, depois contratos)
+
+    Returns:
+        dict: {"results": {tipo: [resultado por registro]}, "summary": {status: total}}
+    """
+    results = {}
+    summary = {CREATED: 0, UPDATED: 0, UNCHANGED: 0, ERROR: 0}
+    for kind in SYNC_KINDS:
+        if not payload.get(kind):
+            continue
+        syncer = SYNCERS[kind](user, batch_size=batch_size)
+        syncer.run(payload[kind])
+        records = sorted(syncer.records, key=lambda entry: entry["index"])
+        for entry in records:
+            summary[entry["status"]] += 1
+        results[kind] = records
+    return {"results": results, "summary": summary}
@@ -1,7 +1,58 @@
-from django.test import TestCase, Client
+import base64
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User, Group
 from django.urls import reverse
-from .models import Person, Company, State, City
+from django.utils import timezone, translation
+from auditoria.models import ActivityLog
+from auditoria.pagination import NEXT, encode_cursor
+from .counts import ListCount
+from .forms import CompanyForm, PersonForm
+from .imports import RowError, import_file, parse_decimal
+from .models import Person, Company, State, City, Contract, ContractMovement
+from . import counts, dashboard, events, parallel
+from .filters import CityFilter
+from .search import search_contracts, search_names
+from .views import CityListView
+
+# Cache visto por todos os processos (pages.counts.shared_cache) e o padrão, por processo
+SHARED_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'athena-tests-cache'),
+}}
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_owner(username, full_name, corporate_name, cpf='529.982.247-25', cnpj='11.222.333/0001-81',
+                 state=('Minas Gerais', 'MG'), city='Belo Horizonte', group='funcionario'):
+    """
+    Usuário (senha pass123) com uma pessoa e uma empresa próprias
+
+    Returns:
+        tuple: (usuário, pessoa, empresa)
+    """
+    user = User.objects.create_user(username=username, password='pass123')
+    if group:
+        user.groups.add(Group.objects.get_or_create(name=group)[0])
+    city = City.objects.create(name=city, state=State.objects.create(name=state[0], abbreviation=state[1]))
+    person = Person.objects.create(
+        full_name=full_name, cpf=cpf, birth_date='1990-01-01', address='Rua A, 1', city=city, usuario=user
+    )
+    company = Company.objects.create(corporate_name=corporate_name, cnpj=cnpj, usuario=user)
+    return user, person, company
+
 
 class GroupProtectionTest(TestCase):
     """
@@ -145,4 +196,859 @@ class GroupProtectionTest(TestCase):
         new_person = Person.objects.get(cpf='111.222.333-44')
         self.assertEqual(new_person.usuario, self.test_user)
 
+
+class CompanyCounterTest(TestCase):
+    """
+    Testes para os contadores atômicos de contratos na empresa
+    """
+    
+    def setUp(self):
+        self.user, self.person, self.company = create_owner(
+            'contador', 'Pessoa Contratada', 'Alfa', cpf='111.222.333-44', cnpj='11.111.111/0001-11', group=None
+        )
+        self.other = Company.objects.create(corporate_name='Beta', cnpj='22.222.222/0001-22', usuario=self.user)
+    
+    def new_contract(self, value, company=None):
+        return Contract.objects.create(
+            title='Contrato', value=value, company=company or self.company,
+            person=self.person, usuario=self.user
+        )
+    
+    def counters(self, company=None):
+        company = Company.objects.get(pk=(company or self.company).pk)
+        return company.total_contracts, company.total_contract_value, company.last_contract_date
+    
+    def test_deltas_follow_contract_changes(self):
+        first = self.new_contract(Decimal('100.00'))
+        second = self.new_contract(Decimal('50.00'))
+        self.assertEqual(self.counters()[:2], (2, Decimal('150.00')))
+        self.assertEqual(self.counters()[2], second.created_at)
+        
+        # Desativar e mudar valor (instância recarregada, como nas views)
+        contract = Contract.objects.get(pk=first.pk)
+        contract.is_active = False
+        contract.save()
+        self.assertEqual(self.counters()[:2], (1, Decimal('50.00')))
+        
+        contract = Contract.objects.get(pk=second.pk)
+        contract.value = Decimal('80.00')
+        contract.save()
+        self.assertEqual(self.counters()[:2], (1, Decimal('80.00')))
+        
+        # Troca de empresa
+        contract.company = self.other
+        contract.save()
+        self.assertEqual(self.counters(), (0, Decimal('0.00'), first.created_at))
+        self.assertEqual(self.counters(self.other)[:2], (1, Decimal('80.00')))
+        
+        # Exclusão
+        Contract.objects.get(pk=second.pk).delete()
+        self.assertEqual(self.counters(self.other), (0, Decimal('0.00'), None))
+    
+    def test_stale_instances_apply_delta_once(self):
+        """Duas requisições desativam o mesmo contrato: a segunda não subtrai de novo"""
+        contract = self.new_contract(Decimal('40.00'))
+        first, second = Contract.objects.get(pk=contract.pk), Contract.objects.get(pk=contract.pk)
+        for stale in (first, second):
+            stale.is_active = False
+            events.update_contract(stale, self.user)
+        self.assertEqual(self.counters()[:2], (0, Decimal('0.00')))
+        
+        second.is_active = True
+        events.update_contract(second, self.user)
+        self.assertEqual(self.counters()[:2], (1, Decimal('40.00')))
+    
+    def test_company_save_keeps_counters(self):
+        """Empresa carregada antes do contrato não sobrescreve os contadores"""
+        stale = Company.objects.get(pk=self.company.pk)
+        self.new_contract(10)
+        stale.trade_name = 'Alfa Ltda'
+        stale.save()
+        self.assertEqual(self.counters()[0], 1)
+    
+    def test_reconcile_command(self):
+        self.new_contract(Decimal('30.00'))
+        Company.objects.update(total_contracts=99, total_contract_value=0, last_contract_date=None)
+        call_command('reconcile_company_counters', stdout=StringIO())
+        total, value, last = self.counters()
+        self.assertEqual((total, value), (1, Decimal('30.00')))
+        self.assertIsNotNone(last)
+
+
+class ContractEventPipelineTest(TestCase):
+    """
+    Testes para o pipeline único de eventos de contrato
+    """
+    
+    def setUp(self):
+        self.user, person, company = create_owner('gestor', 'Pessoa Evento', 'Gama', group=None)
+        self.contract = events.create_contract(
+            Contract(title='Serviço', company=company, person=person, usuario=self.user), self.user
+        )
+    
+    def test_update_writes_movement_and_log_together(self):
+        contract = Contract.objects.get(pk=self.contract.pk)
+        contract.title = 'Serviço de TI'
+        with CaptureQueriesContext(connection) as ctx:
+            events.update_contract(contract, self.user)
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+        
+        movement = contract.movements.get(movement_type='updated')
+        log = ActivityLog.objects.get(action='update', object_id=contract.pk)
+        self.assertEqual(movement.metadata['changed_fields'], list(log.changes))
+        self.assertEqual(log.changes, {'title': ['Serviço', 'Serviço de TI']})
+    
+    def test_deactivate_and_delete(self):
+        contract = Contract.objects.get(pk=self.contract.pk)
+        contract.is_active = False
+        events.update_contract(contract, self.user)
+        self.assertTrue(contract.movements.filter(movement_type='deactivated').exists())
+        
+        pk = contract.pk
+        events.delete_contract(contract, self.user)
+        log = ActivityLog.objects.get(action='delete', object_id=pk)
+        self.assertEqual(log.state['title'], 'Serviço')
+        self.assertEqual(ActivityLog.objects.filter(object_id=pk, content_type=log.content_type).count(), 3)
+
+
+class ContractBulkActionTest(TestCase):
+    """
+    Testes para as ações em lote da lista de contratos
+    """
+    
+    def setUp(self):
+        self.user, person, self.company = create_owner('lote', 'Pessoa Lote', 'Delta')
+        other = User.objects.create_user(username='outro', password='pass123')
+        self.contracts = [
+            Contract.objects.create(title=f'Lote {i}', value=100, company=self.company, person=person, usuario=self.user)
+            for i in range(3)
+        ]
+        self.foreign = Contract.objects.create(
+            title='Lote alheio', value=100, company=self.company, person=person, usuario=other
+        )
+        self.client.login(username='lote', password='pass123')
+    
+    def test_deactivate_all_matching_filter(self):
+        self.assertContains(self.client.get(reverse('contract-list')), 'id="bulk-form"')
+        response = self.client.post(reverse('contract-bulk-action'), {
+            'action': 'deactivate', 'scope': 'all', 'filters': 'title=Lote',
+        })
+        self.assertRedirects(response, reverse('contract-list') + '?title=Lote', fetch_redirect_response=False)
+        
+        # Apenas os contratos do usuário (o alheio continua ativo)
+        for contract in self.contracts:
+            contract.refresh_from_db()
+            self.assertFalse(contract.is_active)
+        self.foreign.refresh_from_db()
+        self.assertTrue(self.foreign.is_active)
+        
+        self.assertEqual(ContractMovement.objects.filter(movement_type='deactivated').count(), 3)
+        self.assertEqual(
+            ActivityLog.objects.filter(action='update', changes={'is_active': ['True', 'False']}).count(), 3
+        )
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.total_contracts, 1)
+        self.assertEqual(self.company.total_contract_value, 100)
+    
+    @override_settings(AUDIT_SNAPSHOT_EVERY=2)
+    def test_bulk_updates_write_snapshots(self):
+        """UPDATE em lote também grava o snapshot a cada AUDIT_SNAPSHOT_EVERY alterações"""
+        owned = Contract.objects.filter(usuario=self.user)
+        events.set_contracts_active(owned, False, self.user)
+        events.set_contracts_active(owned, True, self.user)
+        logs = list(ActivityLog.objects.filter(action='update').order_by('pk'))
+        self.assertEqual([log.state is not None for log in logs], [False] * 3 + [True] * 3)
+        self.assertEqual(logs[-1].state['is_active'], 'True')
+    
+    def test_invalid_filter_changes_nothing(self):
+        """Filtro adulterado não é ignorado: nenhum contrato é excluído"""
+        response = self.client.post(reverse('contract-bulk-action'), {
+            'action': 'delete', 'scope': 'all', 'filters': 'criado_de=abc&is_active=true',
+        }, follow=True)
+        self.assertContains(response, 'Filtro inválido')
+        self.assertEqual(Contract.objects.count(), 4)
+    
+    def test_delete_selected(self):
+        ids = [self.contracts[0].pk, self.contracts[1].pk, self.foreign.pk]
+        self.client.post(reverse('contract-bulk-action'), {
+            'action': 'delete', 'scope': 'selected', 'contracts': ids,
+        })
+        
+        remaining = set(Contract.objects.values_list('pk', flat=True))
+        self.assertEqual(remaining, {self.contracts[2].pk, self.foreign.pk})
+        self.assertEqual(ActivityLog.objects.filter(action='delete').count(), 2)
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.total_contracts, 2)
+        self.assertEqual(self.company.last_contract_date, self.foreign.created_at)
+
+
+class ContractExpirationTest(TestCase):
+    """
+    Testes para o comando expire_contracts
+    """
+    
+    def setUp(self):
+        user, person, self.company = create_owner('cron', 'Pessoa Prazo', 'Épsilon', group=None)
+        
+        def contract(title, end_date):
+            return Contract.objects.create(
+                title=title, value=50, start_date='2024-01-01', end_date=end_date,
+                company=self.company, person=person, usuario=user
+            )
+        self.expired = [contract(f'Vencido {i}', '2025-01-10') for i in range(3)]
+        self.current = contract('Vigente', '2025-12-31')
+        self.open_ended = contract('Indeterminado', None)
+    
+    def test_dry_run_changes_nothing(self):
+        out = StringIO()
+        call_command('expire_contracts', '--date', '2025-06-01', '--dry-run', stdout=out)
+        self.assertIn('3 contrato(s) seriam desativados', out.getvalue())
+        self.assertEqual(Contract.objects.filter(is_active=True).count(), 5)
+    
+    def test_deactivates_expired_in_batches(self):
+        out = StringIO()
+        call_command('expire_contracts', '--date', '2025-06-01', '--batch-size', '2', stdout=out)
+        self.assertIn('3 contrato(s) desativado(s) em 2 lote(s)', out.getvalue())
+        
+        active = set(Contract.objects.filter(is_active=True).values_list('title', flat=True))
+        self.assertEqual(active, {'Vigente', 'Indeterminado'})
+        movements = ContractMovement.objects.filter(movement_type='deactivated')
+        self.assertEqual(movements.count(), 3)
+        self.assertEqual(movements.first().metadata['reason'], 'expired')
+        self.assertEqual(ActivityLog.objects.filter(action='update', actor__isnull=True).count(), 3)
+        
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.total_contracts, 2)
+        self.assertEqual(self.company.total_contract_value, 100)
+
+
+class CsvExportTest(TestCase):
+    """
+    Testes para a exportação CSV das listas
+    """
+    
+    def setUp(self):
+        self.user, person, company = create_owner('exporta', 'Pessoa CSV', 'Zeta', cpf='343.434.343-43')
+        other = User.objects.create_user(username='alheio', password='pass123')
+        Contract.objects.create(
+            title='Consultoria', value='1234.50', start_date='2025-03-01', is_active=False,
+            company=company, person=person, usuario=self.user
+        )
+        Contract.objects.create(title='Ativo', company=company, person=person, usuario=self.user)
+        Contract.objects.create(title='De outro', is_active=False, company=company, person=person, usuario=other)
+        self.client.login(username='exporta', password='pass123')
+    
+    def test_contract_export_streams_filtered_rows(self):
+        response = self.client.get(reverse('contract-export'), {
+            'is_active': 'false', 'colunas': 'title,value,start_date,is_active',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="contratos-', response['Content-Disposition'])
+        
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines, [
+            'Título;Valor;Início;Ativo',
+            'Consultoria;1234,50;01/03/2025;Não',
+        ])
+    
+    def test_person_export_default_columns(self):
+        response = self.client.get(reverse('person-export'))
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('ID;Nome Completo;CPF'))
+        self.assertIn('Pessoa CSV;343.434.343-43', lines[1])
+        self.assertIn(';01/01/1990;', lines[1])
+
+
+class DataImportTest(TestCase):
+    """
+    Testes para a importação em lote (import_data e upload)
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='importa', password='pass123')
+        self.user.groups.add(Group.objects.get_or_create(name='funcionario')[0])
+        State.objects.create(name='Minas Gerais', abbreviation='MG')
+    
+    def _import(self, kind, content, fmt='csv'):
+        report = StringIO()
+        result = import_file(kind, StringIO(content), fmt, self.user, report=report, batch_size=2)
+        return result, report.getvalue()
+    
+    def test_companies_persons_and_contracts(self):
+        result, report = self._import('companies', (
+            'corporate_name;cnpj;city;state\n'
+            'Alfa Ltda;11.222.333/0001-81;Belo Horizonte;MG\n'
+            'Beta Ltda;11222333000180;Belo Horizonte;MG\n'
+            'Gama Ltda;11444777000161;Uberlândia;MG\n'
+        ))
+        self.assertEqual((result.read, result.created, result.errors), (3, 2, 1))
+        self.assertIn('CNPJ inválido', report)
+        self.assertEqual(City.objects.filter(state__abbreviation='MG').count(), 2)
+        
+        result, _ = self._import('persons', (
+            'Nome Completo,CPF,Data de Nascimento,Endereço,Cidade,UF\n'
+            'Ana,529.982.247-25,15/03/1990,Rua A,Belo Horizonte,MG\n'
+            'Bruno,11144477735,1985-07-01,Rua B,Belo Horizonte,MG\n'
+        ))
+        self.assertEqual(result.created, 2)
+        self.assertEqual(Person.objects.filter(usuario=self.user).count(), 2)
+        
+        result, report = self._import('contracts', '\n'.join([
+            '{"title": "Serviço 1", "cnpj": "11.222.333/0001-81", "cpf": "52998224725", "value": "1.000,50"}',
+            '{"title": "Serviço 2", "cnpj": "11.222.333/0001-81", "cpf": "111.444.777-35", "value": "500"}',
+            '{"title": "Inativo", "cnpj": "11.444.777/0001-61", "cpf": "111.444.777-35", "is_active": "não"}',
+            '{"title": "Sem pessoa", "cnpj": "11.222.333/0001-81", "cpf": "123.456.789-09"}',
+            'não é json',
+        ]), fmt='jsonl')
+        self.assertEqual((result.created, result.errors), (3, 2))
+        self.assertIn('pessoa não encontrada', report)
+        
+        alfa = Company.objects.get(cnpj='11.222.333/0001-81')
+        self.assertEqual(alfa.total_contracts, 2)
+        self.assertEqual(str(alfa.total_contract_value), '1500.50')
+        self.assertIsNotNone(alfa.last_contract_date)
+        self.assertEqual(ContractMovement.objects.filter(movement_type='created').count(), 3)
+        self.assertEqual(ActivityLog.objects.filter(action='create', actor=self.user).count(), 2 + 2 + 3)
+        self.assertEqual(Contract.objects.get(title='Inativo').is_active, False)
+    
+    def test_parse_decimal_without_rounding(self):
+        """Separador de milhar reconhecido; mais de 2 casas é erro, não arredonda"""
+        for raw, expected in [('1234.56', '1234.56'), ('1234,5', '1234.50'), ('1.234,56', '1234.56'),
+                              ('1.234', '1234.00'), ('1.234.567', '1234567.00'), ('-10', '-10.00'), ('', None)]:
+            self.assertEqual(parse_decimal(raw), Decimal(expected) if expected else None, raw)
+        for raw in ('1,234', '1234.567', '12.34,5', '1,234.56', 'NaN', '1e3', '1.2.3'):
+            with self.assertRaises(RowError, msg=raw):
+                parse_decimal(raw)
+    
+    def test_duplicates_and_upload_view(self):
+        Company.objects.create(corporate_name='Existente', cnpj='11.222.333/0001-81', usuario=self.user)
+        content = 'cnpj;corporate_name\n11.222.333/0001-81;Repetida\n11.444.777/0001-61;Nova\n11.444.777/0001-61;Nova de novo\n'
+        
+        self.client.login(username='importa', password='pass123')
+        response = self.client.post(reverse('data-import'), {
+            'kind': 'companies',
+            'arquivo': SimpleUploadedFile('empresas.csv', content.encode('utf-8')),
+        })
+        self.assertEqual(response.status_code, 200)
+        result = response.context['result']
+        self.assertEqual((result.created, result.errors), (1, 2))
+        self.assertEqual([n for n, _ in result.error_samples], [2, 4])
+        self.assertTrue(Company.objects.filter(corporate_name='Nova', usuario=self.user).exists())
+        
+        report = self.client.get(reverse('data-import-report'))
+        self.assertEqual(report['Content-Type'], 'text/csv; charset=utf-8')
+        lines = report.content.decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0], 'Linha;Erro;Registro')
+        self.assertEqual([line.split(';')[0] for line in lines[1:]], ['2', '4'])
+    
+    def test_upload_rejects_invalid_utf8_before_writing(self):
+        """Byte inválido no fim do arquivo: nenhum lote é gravado"""
+        rows = ''.join(f'Empresa {i};11.222.333/0001-81\n' for i in range(3))
+        content = ('corporate_name;cnpj\n' + rows).encode('utf-8') + 'Inválida;11444777000161\n'.encode('latin-1')
+        
+        self.client.login(username='importa', password='pass123')
+        response = self.client.post(reverse('data-import'), {
+            'kind': 'companies',
+            'arquivo': SimpleUploadedFile('empresas.csv', content),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('UTF-8', response.context['form'].errors['arquivo'][0])
+        self.assertFalse(Company.objects.exists())
+        self.assertEqual(self.client.get(reverse('data-import-report')).status_code, 404)
+
+
+class SyncTest(TestCase):
+    """
+    Testes para a sincronização em lote (upsert) com sistemas externos
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='erp', password='pass123')
+        self.user.groups.add(Group.objects.get_or_create(name='funcionario')[0])
+        State.objects.create(name='Minas Gerais', abbreviation='MG')
+        self.payload = {
+            'companies': [
+                {'corporate_name': 'Alfa Ltda', 'cnpj': '11222333000181', 'city': 'Belo Horizonte', 'state': 'MG'},
+            ],
+            'persons': [
+                {'full_name': 'Ana', 'cpf': '52998224725', 'birth_date': '1990-03-15', 'address': 'Rua A',
+                 'city': 'Belo Horizonte', 'state': 'MG'},
+            ],
+            'contracts': [
+                {'external_id': 'ERP-1', 'title': 'Serviço 1', 'cnpj': '11222333000181', 'cpf': '52998224725', 'value': '100'},
+                {'external_id': 'ERP-2', 'title': 'Serviço 2', 'cnpj': '11222333000181', 'cpf': '52998224725', 'value': '50'},
+            ],
+        }
+    
+    def _sync(self, body, content_type='application/json', username='erp'):
+        credentials = base64.b64encode(f'{username}:pass123'.encode()).decode()
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        return self.client.post(
+            reverse('sync'), body, content_type=content_type,
+            HTTP_AUTHORIZATION=f'Basic {credentials}',
+        )
+    
+    def test_upsert_reports_each_record(self):
+        data = self._sync(self.payload).json()
+        self.assertEqual(data['summary'], {'created': 4, 'updated': 0, 'unchanged': 0, 'error': 0})
+        alfa = Company.objects.get(cnpj='11.222.333/0001-81')
+        self.assertEqual(alfa.total_contracts, 2)
+        
+        data = self._sync(self.payload).json()
+        self.assertEqual(data['summary'], {'created': 0, 'updated': 0, 'unchanged': 4, 'error': 0})
+        
+        self.payload['contracts'][0] = {'external_id': 'ERP-1', 'value': '300', 'is_active': 'não'}
+        self.payload['contracts'][0].update(cnpj='11222333000181', cpf='52998224725', title='Serviço 1')
+        with override_settings(AUDIT_SNAPSHOT_EVERY=1):
+            data = self._sync(self.payload).json()
+        self.assertEqual(data['summary'], {'created': 0, 'updated': 1, 'unchanged': 3, 'error': 0})
+        entry = data['results']['contracts'][0]
+        self.assertEqual((entry['index'], entry['status'], entry['changes']), (1, 'updated', ['is_active', 'value']))
+        
+        contract = Contract.objects.get(external_id='ERP-1')
+        self.assertEqual((str(contract.value), contract.is_active), ('300.00', False))
+        log = ActivityLog.objects.get(action='update', object_id=contract.pk)
+        self.assertEqual((log.state['value'], log.state['is_active']), ('300.00', 'False'))
+        self.assertEqual(Contract.objects.count(), 2)
+        self.assertEqual(
+            list(ContractMovement.objects.filter(contract=contract).values_list('movement_type', flat=True)
+                 .order_by('created_at', 'pk')),
+            ['created', 'updated'],
+        )
+        alfa.refresh_from_db()
+        self.assertEqual(alfa.total_contracts, 1)
+        self.assertEqual(str(alfa.total_contract_value), '50.00')
+    
+    def test_ndjson_other_owner_and_auth(self):
+        other = User.objects.create_user(username='outro', password='pass123')
+        Company.objects.create(corporate_name='Alheia', cnpj='11.444.777/0001-61', usuario=other)
+        
+        body = '\n'.join([
+            '{"type": "company", "corporate_name": "Alheia 2", "cnpj": "11.444.777/0001-61"}',
+            '{"type": "company", "corporate_name": "Nova", "cnpj": "11.222.333/0001-81"}',
+        ])
+        data = self._sync(body, content_type='application/x-ndjson').json()
+        self.assertEqual([(e['index'], e['status']) for e in data['results']['companies']], [(1, 'error'), (2, 'created')])
+        self.assertEqual(Company.objects.get(cnpj='11.444.777/0001-61').corporate_name, 'Alheia')
+        
+        self.assertEqual(self._sync('{"type": "x"}', content_type='application/x-ndjson').status_code, 400)
+        self.assertEqual(self._sync(self.payload, username='ninguem').status_code, 401)
+        self.assertEqual(self._sync(self.payload, username='outro').status_code, 403)
+
+
+class ContractSearchFilterTest(TestCase):
+    """
+    Testes para a busca e os filtros da lista de contratos
+    """
+    
+    def setUp(self):
+        self.user, person, alfa = create_owner('busca', 'Pessoa Busca', 'Alfa Consultoria')
+        beta = Company.objects.create(corporate_name='Beta Obras', cnpj='11.444.777/0001-61', usuario=self.user)
+        self.consultoria = Contract.objects.create(
+            title='Consultoria tributária', description='Revisão mensal de impostos',
+            company=alfa, person=person, usuario=self.user, external_id='ERP-77',
+        )
+        self.reforma = Contract.objects.create(
+            title='Reforma da sede', description='Obra civil com multa por atraso', contract_type='FORNECIMENTO',
+            company=beta, person=person, usuario=self.user,
+        )
+        self.client.login(username='busca', password='pass123')
+    
+    def _titles(self, **params):
+        response = self.client.get(reverse('contract-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(c.title for c in response.context['contracts'])
+    
+    def test_search_and_fixed_filters(self):
+        self.assertEqual(self._titles(busca='multa'), ['Reforma da sede'])
+        self.assertEqual(self._titles(busca='consultoria'), ['Consultoria tributária'])
+        self.assertEqual(self._titles(empresa='beta'), ['Reforma da sede'])
+        self.assertEqual(self._titles(numero='ERP-77'), ['Consultoria tributária'])
+        self.assertEqual(self._titles(numero=str(self.reforma.pk)), ['Reforma da sede'])
+        self.assertEqual(self._titles(contract_type='FORNECIMENTO'), ['Reforma da sede'])
+        self.assertEqual(self._titles(busca='multa', empresa='alfa'), [])
+    
+    @skipUnless(connection.vendor == 'postgresql', 'busca textual do PostgreSQL')
+    def test_full_text_search_and_rank(self):
+        """websearch_to_tsquery no filtro; título (peso A) antes da descrição (peso B)"""
+        Contract.objects.create(
+            title='Auditoria anual', description='Inclui consultoria contábil',
+            company=self.consultoria.company, person=self.consultoria.person, usuario=self.user,
+        )
+        queryset = search_contracts(Contract.objects.all(), 'consultoria')
+        sql = str(queryset.query)
+        self.assertIn('websearch_to_tsquery', sql)
+        self.assertIn('ts_rank', sql)
+        self.assertEqual([c.title for c in queryset], ['Consultoria tributária', 'Auditoria anual'])
+        
+        # Sintaxe de busca web: stemming em português, exclusão e frase
+        self.assertEqual(self._titles(busca='impostos'), ['Consultoria tributária'])
+        self.assertEqual(self._titles(busca='consultoria -contábil'), ['Consultoria tributária'])
+        self.assertEqual(self._titles(busca='"multa por atraso"'), ['Reforma da sede'])
+
+
+class NameSearchFilterTest(TestCase):
+    """
+    Testes para os filtros por nome (pessoas, empresas e cidades)
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='nomes', password='pass123')
+        self.user.groups.add(Group.objects.get_or_create(name='funcionario')[0])
+        state = State.objects.create(name='São Paulo', abbreviation='SP')
+        self.capital = City.objects.create(name='São Paulo', state=state)
+        campinas = City.objects.create(name='Campinas', state=state)
+        for name, cpf, city in [('João Silva', '529.982.247-25', self.capital), ('Maria Souza', '111.444.777-35', campinas)]:
+            Person.objects.create(
+                full_name=name, cpf=cpf, birth_date='1990-01-01', address='Rua G', city=city, usuario=self.user
+            )
+        Company.objects.create(corporate_name='Padaria Central Ltda', cnpj='11.222.333/0001-81', city=campinas, usuario=self.user)
+        Company.objects.create(corporate_name='Central de Obras SA', cnpj='11.444.777/0001-61', usuario=self.user)
+        self.client.login(username='nomes', password='pass123')
+    
+    def _names(self, url, key, attr, **params):
+        response = self.client.get(reverse(url), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(getattr(obj, attr) for obj in response.context[key])
+    
+    def test_partial_name_filters(self):
+        self.assertEqual(self._names('person-list', 'persons', 'full_name', nome='silva'), ['João Silva'])
+        self.assertEqual(self._names('person-list', 'persons', 'full_name', cidade='campi'), ['Maria Souza'])
+        # razao_social apontava para um campo inexistente (company_name)
+        self.assertEqual(
+            self._names('company-list', 'companies', 'corporate_name', razao_social='central'),
+            ['Central de Obras SA', 'Padaria Central Ltda'],
+        )
+        self.assertEqual(
+            self._names('company-list', 'companies', 'corporate_name', razao_social='central', cidade='campinas'),
+            ['Padaria Central Ltda'],
+        )
+        self.assertEqual(list(CityFilter({'nome': 'paulo'}, queryset=City.objects.all()).qs), [self.capital])
+        self.assertEqual(self._names('person-list', 'persons', 'full_name', nome='100%'), [])
+    
+    @skipUnless(connection.vendor == 'postgresql', 'unaccent e pg_trgm do PostgreSQL')
+    def test_accent_insensitive_and_similarity_order(self):
+        """Sem acento acha o nome acentuado (ILIKE sobre pages_unaccent), mais parecido primeiro"""
+        self.assertEqual(self._names('person-list', 'persons', 'full_name', nome='joao'), ['João Silva'])
+        self.assertEqual(list(CityFilter({'nome': 'sao paulo'}, queryset=City.objects.all()).qs), [self.capital])
+        
+        City.objects.create(name='Aparecida de São Paulo', state=self.capital.state)
+        queryset = search_names(City.objects.all(), 'name', 'sao paulo', order=True)
+        sql = str(queryset.query)
+        self.assertIn('pages_unaccent', sql)
+        self.assertIn('ILIKE', sql)
+        self.assertIn('SIMILARITY', sql.upper())
+        self.assertEqual([city.name for city in queryset], ['São Paulo', 'Aparecida de São Paulo'])
+
+
+class DocumentDigitsTest(TestCase):
+    """
+    Testes para CPF/CNPJ canônicos (somente dígitos)
+    """
+    
+    def setUp(self):
+        self.user, self.person, _ = create_owner('docs', 'Ana Docs', 'Alfa Docs')
+        self.city = self.person.city
+        self.client.login(username='docs', password='pass123')
+    
+    def test_digits_kept_on_save_and_used_by_filters(self):
+        self.assertEqual(self.person.cpf_digits, '52998224725')
+        self.person.cpf = '111.444.777-35'
+        self.person.save(update_fields=['cpf'])
+        self.person.refresh_from_db()
+        self.assertEqual(self.person.cpf_digits, '11144477735')
+        
+        def names(url, key, **params):
+            return [str(obj) for obj in self.client.get(reverse(url), params).context[key]]
+        
+        self.assertEqual(names('person-list', 'persons', cpf='11144477735'), ['Ana Docs'])
+        self.assertEqual(names('person-list', 'persons', cpf='111.444'), ['Ana Docs'])
+        self.assertEqual(names('person-list', 'persons', cpf='444.777'), [])
+        self.assertEqual(names('company-list', 'companies', cnpj='11222333/0001'), ['Alfa Docs'])
+        self.assertEqual(names('company-list', 'companies', cnpj='abc'), [])
+    
+    def test_same_document_with_other_mask_is_rejected(self):
+        form = PersonForm(data={
+            'full_name': 'Outra Ana', 'cpf': '52998224725', 'birth_date': '1991-01-01',
+            'address': 'Rua I', 'city': self.city.pk,
+        })
+        self.assertIn('cpf', form.errors)
+        
+        form = CompanyForm(data={'corporate_name': 'Alfa de Novo', 'cnpj': '11222333000181'})
+        self.assertIn('cnpj', form.errors)
+        form = CompanyForm(data={'corporate_name': 'Beta Docs', 'cnpj': '11444777000161'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save(commit=False).cnpj, '11.444.777/0001-61')
+
+
+class KeysetPaginationTest(TestCase):
+    """
+    Testes para a paginação por chave (cursor) das listas
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='cursor', password='pass123')
+        self.user.groups.add(Group.objects.get_or_create(name='funcionario')[0])
+        self.state = State.objects.create(name='Paraná', abbreviation='PR')
+        for number in range(25):
+            City.objects.create(name=f'Cidade {number:02d}', state=self.state)
+        self.client.login(username='cursor', password='pass123')
+    
+    def _page(self, url, **params):
+        response = self.client.get(reverse(url), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+    
+    def test_walks_forward_and_back(self):
+        first = self._page('city-list')
+        self.assertTrue(first.is_keyset)
+        self.assertFalse(first.has_previous())
+        self.assertEqual([c.name for c in first][0], 'Cidade 00')
+        
+        second = self._page('city-list', cursor=first.next_cursor)
+        self.assertEqual([c.name for c in second], [f'Cidade {n:02d}' for n in range(10, 20)])
+        third = self._page('city-list', cursor=second.next_cursor)
+        self.assertEqual(len(third), 5)
+        self.assertFalse(third.has_next())
+        
+        back = self._page('city-list', cursor=third.previous_cursor)
+        self.assertEqual([c.pk for c in back], [c.pk for c in second])
+        self.assertTrue(back.has_next())
+        self.assertTrue(back.has_previous())
+        
+        # Cursor inválido ou adulterado volta para a primeira página
+        self.assertEqual([c.pk for c in self._page('city-list', cursor='lixo')], [c.pk for c in first])
+        tampered = encode_cursor(NEXT, ['Cidade 00'])
+        self.assertEqual([c.pk for c in self._page('city-list', cursor=tampered)], [c.pk for c in first])
+    
+    def test_ties_on_first_key(self):
+        person = Person.objects.create(
+            full_name='Pessoa Cursor', cpf='529.982.247-25', birth_date='1990-01-01',
+            address='Rua H, 1', city=City.objects.first(), usuario=self.user
+        )
+        company = Company.objects.create(corporate_name='Empresa Cursor', cnpj='11.222.333/0001-81', usuario=self.user)
+        for number in range(12):
+            Contract.objects.create(title=f'Contrato {number}', company=company, person=person, usuario=self.user)
+        Contract.objects.update(created_at=timezone.now())
+        
+        seen, page = [], self._page('contract-list')
+        while True:
+            seen += [c.pk for c in page]
+            if not page.has_next():
+                break
+            page = self._page('contract-list', cursor=page.next_cursor)
+        self.assertEqual(seen, sorted(Contract.objects.values_list('pk', flat=True), reverse=True))
+    
+    def test_other_orderings_use_page_numbers(self):
+        view = CityListView()
+        self.assertTrue(view.uses_keyset(City.objects.order_by('name')))
+        self.assertFalse(view.uses_keyset(City.objects.order_by('-name')))
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class ListCountTest(TestCase):
+    """
+    Testes para os totais das listas (cache, invalidação e exibição)
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user, self.person, self.company = create_owner('totais', 'Pessoa Totais', 'Empresa Totais')
+        for number in range(3):
+            Contract.objects.create(title=f'Total {number}', company=self.company, person=self.person, usuario=self.user)
+        self.client.login(username='totais', password='pass123')
+    
+    def _total(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('contract-list'), params)
+        counted = [q['sql'] for q in queries if 'COUNT(' in q['sql'].upper() and 'pages_contract' in q['sql']]
+        return response.context['total_contracts'], len(counted)
+    
+    def test_cached_and_invalidated(self):
+        self.assertEqual(self._total(), (3, 1))
+        # Segunda abertura: do cache, sem COUNT
+        self.assertEqual(self._total(), (3, 0))
+        # Total do filtro atual (antes era sempre o total do usuário)
+        self.assertEqual(self._total(busca='Total 1'), (1, 1))
+        
+        Contract.objects.create(title='Total 3', company=self.company, person=self.person, usuario=self.user)
+        self.assertEqual(self._total(), (4, 1))
+        
+        # Operações em lote não disparam signals de save/delete
+        events.delete_contracts(Contract.objects.filter(title='Total 3'), self.user)
+        self.assertEqual(self._total(), (3, 1))
+    
+    def test_bulk_delete_invalidates_once(self):
+        """Exclusão em lote: uma invalidação no flush, não uma por contrato"""
+        with mock.patch.object(counts, 'invalidate', wraps=counts.invalidate) as invalidate_counts, \
+                mock.patch.object(dashboard, 'invalidate', wraps=dashboard.invalidate) as invalidate_dashboard:
+            events.delete_contracts(Contract.objects.all(), self.user)
+        self.assertEqual(invalidate_counts.call_count, 1)
+        self.assertEqual(invalidate_dashboard.call_count, 1)
+    
+    def test_no_count_without_shared_cache(self):
+        """Com o LocMemCache (um por processo) não há cache: a lista por chave não conta"""
+        with override_settings(CACHES=LOCAL_CACHE):
+            self.assertEqual(self._total(), (3, 1))
+            self.assertEqual(self._total(), (3, 1))
+            
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('person-list'))
+            self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper() and 'pages_person' in q['sql']])
+            self.assertIsNone(response.context['total_persons'])
+            self.assertContains(response, '—')
+    
+    @skipUnless(connection.vendor == 'postgresql', 'pg_class e EXPLAIN do PostgreSQL')
+    def test_small_table_counts_without_explain(self):
+        """Tabela abaixo do limite: só o COUNT, sem EXPLAIN a cada abertura"""
+        with override_settings(CACHES=LOCAL_CACHE, LIST_COUNT_ESTIMATE_THRESHOLD=1000):
+            self._total()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self._total(), (3, 1))
+        self.assertFalse([q for q in queries if q['sql'].startswith('EXPLAIN')])
+    
+    def test_display(self):
+        with translation.override('pt-br'):
+            self.assertEqual(str(ListCount(1234)), '1.234')
+            self.assertEqual(str(ListCount(1234567, approximate=True)), '~1,2M')
+            self.assertEqual(str(ListCount(850000, approximate=True)), '~850K')
+        self.assertEqual(ListCount(3), 3)
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class DashboardSnapshotTest(TestCase):
+    """
+    Testes para o snapshot do dashboard em cache por usuário
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user, person, _ = create_owner('painel', 'Pessoa Painel', 'Empresa Painel', group=None)
+        self.city = person.city
+        self.client.force_login(self.user)
+    
+    def _home(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        page_queries = [q['sql'] for q in queries if 'pages_' in q['sql']]
+        return response.context, page_queries
+    
+    def test_cached_until_owner_writes(self):
+        context, queries = self._home()
+        self.assertEqual((context['total_persons'], context['total_companies'], context['total_contracts']), (1, 1, 0))
+        # Totais em uma consulta + três listas de recentes
+        self.assertEqual(len(queries), 4)
+        
+        context, queries = self._home()
+        self.assertEqual(queries, [])
+        self.assertEqual(context['total_persons'], 1)
+        
+        Person.objects.create(
+            full_name='Outra Pessoa', cpf='111.444.777-35', birth_date='1990-01-01',
+            address='Rua J, 4', city=self.city, usuario=self.user
+        )
+        context, queries = self._home()
+        self.assertEqual(context['total_persons'], 2)
+        self.assertEqual(context['recent_persons'][0].full_name, 'Outra Pessoa')
+        
+        # Registro de outro usuário não invalida este snapshot
+        other = User.objects.create_user(username='outro_painel', password='pass123')
+        Company.objects.create(corporate_name='Empresa Alheia', cnpj='11.444.777/0001-61', usuario=other)
+        self.assertEqual(self._home()[1], [])
+    
+    def test_not_cached_without_shared_cache(self):
+        """LocMemCache é por processo: cada abertura monta o snapshot"""
+        with override_settings(CACHES=LOCAL_CACHE):
+            self.assertEqual(len(self._home()[1]), 4)
+            self.assertEqual(len(self._home()[1]), 4)
+
+
+class ParallelQueriesTest(TestCase):
+    """
+    Testes para as consultas em paralelo (dashboard e detalhe do contrato)
+    """
+    
+    def test_runs_in_pool_outside_transactions(self):
+        def thread_name():
+            return threading.current_thread().name
+        
+        # TestCase roda dentro de uma transação: simula a requisição fora dela
+        with mock.patch.object(parallel, '_in_transaction', return_value=False):
+            results = parallel.run_parallel(a=thread_name, b=thread_name, c=lambda: 3)
+            self.assertEqual(list(results), ['a', 'b', 'c'])
+            self.assertTrue(results['a'].startswith('athena-query'))
+            self.assertEqual(results['c'], 3)
+            
+            # Chamada aninhada roda na própria thread do pool
+            nested = parallel.run_parallel(
+                outer=lambda: parallel.run_parallel(x=thread_name, y=thread_name), other=lambda: None
+            )['outer']
+            self.assertEqual(nested['x'], nested['y'])
+            
+            with self.assertRaises(ZeroDivisionError):
+                parallel.run_parallel(ok=lambda: 1, fail=lambda: 1 / 0)
+        
+        # Com transação aberta, na thread atual (as outras conexões não veem os dados)
+        self.assertEqual(
+            parallel.run_parallel(a=thread_name, b=thread_name)['a'], threading.current_thread().name
+        )
+    
+    def test_contract_detail(self):
+        user, person, company = create_owner('detalhe', 'Pessoa Detalhe', 'Empresa Detalhe')
+        contract = Contract(title='Contrato Detalhe', company=company, person=person, usuario=user)
+        events.create_contract(contract, user)
+        
+        self.client.force_login(user)
+        response = self.client.get(reverse('contract-detail', args=[contract.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m.movement_type for m in response.context['movements']], ['created'])
+        self.assertEqual(len(response.context['history_page']), 1)
+
+
+class ParallelQueriesPoolTest(TransactionTestCase):
+    """
+    Consultas reais do ORM no pool de threads (fora de transação, dados confirmados)
+    """
+    
+    def test_orm_queries_in_pool(self):
+        user, _, _ = create_owner('pool', 'Pessoa Pool', 'Empresa Pool', group=None)
+        
+        def query(queryset):
+            return threading.current_thread().name, list(queryset)
+        
+        results = parallel.run_parallel(
+            persons=lambda: query(Person.objects.filter(usuario=user).values_list('full_name', flat=True)),
+            companies=lambda: query(Company.objects.filter(usuario=user).values_list('corporate_name', flat=True)),
+        )
+        self.assertEqual(results['persons'][1], ['Pessoa Pool'])
+        self.assertEqual(results['companies'][1], ['Empresa Pool'])
+        self.assertTrue(all(name.startswith('athena-query') for name, _ in results.values()))
+        
+        snapshot = dashboard.build_snapshot(user)
+        self.assertEqual((snapshot['total_persons'], snapshot['total_companies'], snapshot['total_contracts']), (1, 1, 0))
+        self.assertEqual([c.corporate_name for c in snapshot['recent_companies']], ['Empresa Pool'])
+    
+    def test_worker_connection_reused(self):
+        """Cada thread do pool mantém a sua conexão entre as chamadas"""
+        seen = {}
+        lock = threading.Lock()
+        
+        def query():
+            list(State.objects.all())
+            with lock:
+                seen.setdefault(threading.current_thread().name, []).append(connection.connection)
+        
+        workers = parallel._workers()
+        for _ in range(3):
+            parallel.run_parallel(**{f'q{number}': query for number in range(workers)})
+        self.assertLess(len(seen), workers * 3)
+        for raw in seen.values():
+            self.assertTrue(all(item is raw[0] for item in raw))
+
+
 # Deploy: 2025-11-06 00:04:16
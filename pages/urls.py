@@ -7,6 +7,7 @@ urlpatterns = [
     
     # Person URLs
     path('pessoas/', views.PersonListView.as_view(), name='person-list'),
+    path('pessoas/exportar/', views.PersonExportView.as_view(), name='person-export'),
     path('pessoas/criar/', views.PersonCreateView.as_view(), name='person-create'),
     path('pessoas/<int:pk>/', views.PersonDetailView.as_view(), name='person-detail'),
     path('pessoas/<int:pk>/editar/', views.PersonUpdateView.as_view(), name='person-update'),
@@ -14,6 +15,7 @@ urlpatterns = [
     
     # Company URLs
     path('empresas/', views.CompanyListView.as_view(), name='company-list'),
+    path('empresas/exportar/', views.CompanyExportView.as_view(), name='company-export'),
     path('empresas/criar/', views.CompanyCreateView.as_view(), name='company-create'),
     path('empresas/<int:pk>/', views.CompanyDetailView.as_view(), name='company-detail'),
     path('empresas/<int:pk>/editar/', views.CompanyUpdateView.as_view(), name='company-update'),
@@ -21,11 +23,20 @@ urlpatterns = [
     
     # Contract URLs
     path('contratos/', views.ContractListView.as_view(), name='contract-list'),
+    path('contratos/exportar/', views.ContractExportView.as_view(), name='contract-export'),
+    path('contratos/acoes/', views.ContractBulkActionView.as_view(), name='contract-bulk-action'),
     path('contratos/criar/', views.ContractCreateView.as_view(), name='contract-create'),
     path('contratos/<int:pk>/', views.ContractDetailView.as_view(), name='contract-detail'),
     path('contratos/<int:pk>/editar/', views.ContractUpdateView.as_view(), name='contract-update'),
     path('contratos/<int:pk>/deletar/', views.ContractDeleteView.as_view(), name='contract-delete'),
     
+    # Importação em lote (CSV/JSONL)
+    path('importar/', views.DataImportView.as_view(), name='data-import'),
+    path('importar/relatorio/', views.DataImportReportView.as_view(), name='data-import-report'),
+    
+    # Sincronização em lote (RH/ERP, HTTP Basic)
+    path('api/sincronizar/', views.SyncView.as_view(), name='sync'),
+    
     # ✅ STATE URLs (VERIFICAR SE StateDetailView EXISTE)
     path('estados/', views.StateListView.as_view(), name='state-list'),
     path('estados/criar/', views.StateCreateView.as_view(), name='state-create'),
@@ -0,0 +1,66 @@
+"""
+Validação e formatação de CPF e CNPJ
+
+Funções puras (sem banco), usadas pela importação em lote e pela
+sincronização com sistemas externos. Os documentos são gravados no formato
+com máscara usado pelos formulários (000.000.000-00 / 00.000.000/0000-00).
+"""
+import re
+
+from django.core.exceptions import ValidationError
+
+_NON_DIGITS = re.compile(r"\D")
+
+CNPJ_WEIGHTS = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def only_digits(value):
+    """Remove tudo que não for dígito ("123.456.789-09" -> "12345678909")"""
+    return _NON_DIGITS.sub("", str(value or ""))
+
+
+def is_valid_cpf(value):
+    """Confere tamanho e dígitos verificadores do CPF"""
+    digits = only_digits(value)
+    if len(digits) != 11 or digits == digits[0] * 11:
+        return False
+    for size in (9, 10):
+        total = sum(int(d) * w for d, w in zip(digits[:size], range(size + 1, 1, -1)))
+        if (total * 10) % 11 % 10 != int(digits[size]):
+            return False
+    return True
+
+
+def is_valid_cnpj(value):
+    """Confere tamanho e dígitos verificadores do CNPJ"""
+    digits = only_digits(value)
+    if len(digits) != 14 or digits == digits[0] * 14:
+        return False
+    for weights in (CNPJ_WEIGHTS, (6,) + CNPJ_WEIGHTS):
+        size = len(weights)
+        remainder = sum(int(d) * w for d, w in zip(digits[:size], weights)) % 11
+        if (0 if remainder < 2 else 11 - remainder) != int(digits[size]):
+            return False
+    return True
+
+
+def format_cpf(value):
+    """CPF com máscara (000.000.000-00)"""
+    d = only_digits(value)
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+def format_cnpj(value):
+    """CNPJ com máscara (00.000.000/0000-00)"""
+    d = only_digits(value)
+    return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}"
+
+
+def validate_cpf(value):
+    if not is_valid_cpf(value):
+        raise ValidationError("CPF inválido: %(value)s", params={"value": value})
+
+
+def validate_cnpj(value):
+    if not is_valid_cnpj(value):
+        raise ValidationError("CNPJ inválido: %(value)s", params={"value": value})
@@ -1,16 +1,25 @@
 # IMPORTS SEGUROS
+import base64
+import io
+
+from django.conf import settings
+from django.contrib.auth import authenticate
 from django.shortcuts import render, redirect
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, TemplateView, FormView, View, RedirectView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
 from django.utils import timezone
 from django.core.exceptions import PermissionDenied
 from datetime import timedelta
 from django_filters.views import FilterView  # ✅ NOVO IMPORT
+from django.views.generic.list import MultipleObjectMixin
 
-from .models import Person, Company, Contract, State, City, ContractMovement  # ✅ ADICIONAR ContractMovement
+from .models import Person, Company, Contract, State, City
 from .mixins import (
     OwnerQuerysetMixin, 
     OwnerObjectPermissionMixin, 
@@ -21,7 +30,16 @@ from .mixins import (
     AdminRequiredMixin,
     StaffRequiredMixin
 )
-from .forms import PersonForm, CompanyForm, ContractForm, StateForm, CityForm
+from auditoria.mixins import ObjectHistoryMixin
+from auditoria.pagination import KeysetPaginationMixin
+from usuarios import roles
+from . import dashboard, events, sync
+from . import exports
+from .counts import ListCountMixin
+from .exports import CsvExportMixin
+from .imports import REPORT_MAX_SIZE, guess_format, import_file
+from .parallel import run_parallel
+from .forms import PersonForm, CompanyForm, ContractForm, StateForm, CityForm, DataImportForm
 from .filters import PersonFilter, CompanyFilter, ContractFilter, StateFilter, CityFilter  # ✅ NOVO IMPORT
 
 # ===========================================
@@ -50,25 +68,9 @@ class HomeView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        
-        # ✅ OTIMIZADO: Contar sem N+1
-        context['total_persons'] = Person.objects.filter(usuario=user).count()
-        context['total_companies'] = Company.objects.filter(usuario=user).count()
-        context['total_contracts'] = Contract.objects.filter(usuario=user).count()
-        
-        # ✅ OTIMIZADO: Buscar registros recentes com select_related
-        context['recent_persons'] = Person.objects.filter(
-            usuario=user
-        ).select_related('city__state').order_by('-created_at')[:5]
         
-        context['recent_companies'] = Company.objects.filter(
-            usuario=user
-        ).select_related('city__state').order_by('-created_at')[:5]
-        
-        context['recent_contracts'] = Contract.objects.filter(
-            usuario=user
-        ).select_related('company', 'person', 'usuario').order_by('-created_at')[:5]
+        # ✅ OTIMIZADO: totais em uma consulta + recentes, em cache por usuário
+        context.update(dashboard.get_snapshot(self.request.user))
         
         return context
 
@@ -77,12 +79,13 @@ class HomeView(LoginRequiredMixin, TemplateView):
 # VIEWS PARA PERSON (PESSOA) - COM PROTEÇÃO
 # ===========================================
 
-class PersonListView(FuncionarioRequiredMixin, OwnerQuerysetMixin, FilterView):
+class PersonListView(FuncionarioRequiredMixin, OwnerQuerysetMixin, ListCountMixin, KeysetPaginationMixin, FilterView):
     """ListView para pessoas - requer grupo funcionario + escopo por usuário"""
     model = Person
     template_name = 'pages/lists/person_list.html'
     context_object_name = 'persons'
     paginate_by = 10
+    keyset_ordering = ('full_name', 'pk')  # índices pages_person_owner_name_idx / pages_person_name_idx
     filterset_class = PersonFilter  # ✅ NOVO
     
     # ✅ OTIMIZAÇÃO N+1: select_related para FK city e city.state
@@ -91,6 +94,18 @@ class PersonListView(FuncionarioRequiredMixin, OwnerQuerysetMixin, FilterView):
         # FK: usuario (owner), city, city.state
         qs = qs.select_related('usuario', 'city', 'city__state')
         return qs
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Só exibição: sem cache, a página por chave não paga um COUNT
+        context['total_persons'] = self.get_list_count(exact=False)
+        return context
+
+
+class PersonExportView(CsvExportMixin, PersonListView):
+    """Exporta em CSV as pessoas da lista (mesmos filtros e escopo)"""
+    export_filename = 'pessoas'
+    export_columns = exports.PERSON_COLUMNS
 
 
 class PersonCreateView(LoginRequiredMixin, OwnerCreateMixin, CreateView):
@@ -115,7 +130,7 @@ class PersonCreateView(LoginRequiredMixin, OwnerCreateMixin, CreateView):
         return super().form_invalid(form)
 
 
-class PersonDetailView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, FuncionarioRequiredMixin, DetailView):
+class PersonDetailView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, FuncionarioRequiredMixin, ObjectHistoryMixin, DetailView):
     """DetailView para pessoas - requer grupo funcionario + ownership"""
     model = Person
     template_name = 'pages/detail/person_detail.html'
@@ -164,12 +179,13 @@ class PersonDeleteView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, Funcionar
 # VIEWS PARA COMPANY (EMPRESA) - COM PROTEÇÃO
 # ===========================================
 
-class CompanyListView(FuncionarioRequiredMixin, OwnerQuerysetMixin, FilterView):
+class CompanyListView(FuncionarioRequiredMixin, OwnerQuerysetMixin, ListCountMixin, KeysetPaginationMixin, FilterView):
     """ListView para empresas - requer grupo funcionario + escopo por usuário"""
     model = Company
     template_name = 'pages/lists/company_list.html'
     context_object_name = 'companies'
     paginate_by = 10
+    keyset_ordering = ('corporate_name', 'pk')  # índices pages_company_owner_name_idx / pages_company_name_idx
     filterset_class = CompanyFilter  # ✅ NOVO
     
     # ✅ OTIMIZAÇÃO N+1: select_related para FK
@@ -178,6 +194,18 @@ class CompanyListView(FuncionarioRequiredMixin, OwnerQuerysetMixin, FilterView):
         # FK: usuario (owner), city, city.state
         qs = qs.select_related('usuario', 'city', 'city__state')
         return qs
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Só exibição: sem cache, a página por chave não paga um COUNT
+        context['total_companies'] = self.get_list_count(exact=False)
+        return context
+
+
+class CompanyExportView(CsvExportMixin, CompanyListView):
+    """Exporta em CSV as empresas da lista (mesmos filtros e escopo)"""
+    export_filename = 'empresas'
+    export_columns = exports.COMPANY_COLUMNS
 
 
 class CompanyCreateView(LoginRequiredMixin, OwnerCreateMixin, CreateView):
@@ -202,7 +230,7 @@ class CompanyCreateView(LoginRequiredMixin, OwnerCreateMixin, CreateView):
         return super().form_invalid(form)
 
 
-class CompanyDetailView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, FuncionarioRequiredMixin, DetailView):
+class CompanyDetailView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, FuncionarioRequiredMixin, ObjectHistoryMixin, DetailView):
     """DetailView para empresas - requer grupo funcionario + ownership"""
     model = Company
     template_name = 'pages/detail/company_detail.html'
@@ -251,23 +279,95 @@ class CompanyDeleteView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, Funciona
 # CONTRACT VIEWS
 # ===========================================
 
-class ContractListView(OwnerQuerysetMixin, FuncionarioRequiredMixin, FilterView):
+class ContractListView(OwnerQuerysetMixin, FuncionarioRequiredMixin, ListCountMixin, KeysetPaginationMixin, FilterView):
     """ListView com filtros para contratos"""
     model = Contract
     template_name = 'pages/lists/contract_list.html'
     context_object_name = 'contracts'
     filterset_class = ContractFilter
     paginate_by = 10
+    keyset_ordering = ('-created_at', '-pk')  # índices pages_contract_owner_date_idx / -created_at
     
     def get_queryset(self):
-        return super().get_queryset().select_related('company', 'person', 'usuario').order_by('-created_at')
+        # search_vector só é usado no WHERE/ranking da busca (pages.search)
+        return (
+            super().get_queryset().select_related('company', 'person', 'usuario')
+            .defer('search_vector').order_by('-created_at')
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_contracts'] = self.get_queryset().count()
+        # Total do filtro atual (o mesmo do paginador e da ação "todos do filtro")
+        context['total_contracts'] = self.get_list_count()
         return context
 
 
+class ContractExportView(CsvExportMixin, ContractListView):
+    """Exporta em CSV os contratos da lista (mesmos filtros e escopo)"""
+    export_filename = 'contratos'
+    export_columns = exports.CONTRACT_COLUMNS
+
+
+class ContractBulkActionView(OwnerQuerysetMixin, FuncionarioRequiredMixin, MultipleObjectMixin, View):
+    """
+    Ações em lote na lista de contratos (ativar, desativar, excluir)
+    
+    Recebe os contratos marcados ou "todos do filtro atual" (a querystring
+    da lista vem no campo filters) e executa um UPDATE/DELETE por conjunto,
+    sempre dentro do escopo do usuário (OwnerQuerysetMixin).
+    """
+    model = Contract
+    http_method_names = ['post']
+    
+    ACTIONS = {
+        'activate': 'ativado(s)',
+        'deactivate': 'desativado(s)',
+        'delete': 'excluído(s)',
+    }
+    
+    def get_target_queryset(self):
+        """
+        Contratos da ação, ou None se o filtro de "todos do filtro" é inválido
+        
+        Um campo inválido ficaria fora do cleaned_data e o FilterSet deixaria
+        de aplicá-lo, atingindo mais contratos do que a lista mostrou.
+        """
+        qs = self.get_queryset()
+        if self.request.POST.get('scope') == 'all':
+            filters = QueryDict(self.request.POST.get('filters', ''))
+            filterset = ContractFilter(filters, queryset=qs, request=self.request)
+            return filterset.qs if filterset.is_valid() else None
+        
+        ids = [pk for pk in self.request.POST.getlist('contracts') if pk.isdigit()]
+        return qs.filter(pk__in=ids)
+    
+    def post(self, request, *args, **kwargs):
+        action = request.POST.get('action')
+        list_url = reverse('contract-list')
+        filters = request.POST.get('filters', '')
+        if filters:
+            list_url = f'{list_url}?{filters}'
+        
+        if action not in self.ACTIONS:
+            messages.error(request, '❌ Selecione uma ação válida.')
+            return redirect(list_url)
+        
+        queryset = self.get_target_queryset()
+        if queryset is None:
+            messages.error(request, '❌ Filtro inválido: revise os filtros da lista e tente novamente.')
+            return redirect(list_url)
+        if action == 'delete':
+            total = events.delete_contracts(queryset, request.user)
+        else:
+            total = events.set_contracts_active(queryset, action == 'activate', request.user)
+        
+        if total:
+            messages.success(request, f'✅ {total} contrato(s) {self.ACTIONS[action]} com sucesso!')
+        else:
+            messages.info(request, 'ℹ️ Nenhum contrato precisou ser alterado.')
+        return redirect(list_url)
+
+
 class ContractCreateView(LoginRequiredMixin, OwnerCreateMixin, CreateView):
     """CreateView para contratos"""
     model = Contract
@@ -283,26 +383,10 @@ class ContractCreateView(LoginRequiredMixin, OwnerCreateMixin, CreateView):
     def form_valid(self, form):
         contract = form.save(commit=False)
         contract.usuario = self.request.user
-        contract.save()
-        form.save_m2m()
-        
-        # ✅ REGISTRAR MOVIMENTO
-        ContractMovement.objects.create(
-            contract=contract,
-            movement_type='created',
-            description=f'Contrato criado por {self.request.user.username}',
-            performed_by=self.request.user,
-            metadata={
-                'title': contract.title,
-                'company_id': contract.company.id if contract.company else None,
-                'person_id': contract.person.id if contract.person else None,
-            }
-        )
         
-        # ✅ ATUALIZAR CONTADOR NA EMPRESA
-        if contract.company:
-            contract.company.total_contracts = contract.company.contracts.filter(is_active=True).count()
-            contract.company.save(update_fields=['total_contracts'])
+        # ✅ SALVAR + MOVIMENTO + AUDITORIA (mesma transação, em lote)
+        events.create_contract(contract, self.request.user)
+        form.save_m2m()
         
         messages.success(
             self.request, 
@@ -318,7 +402,7 @@ class ContractCreateView(LoginRequiredMixin, OwnerCreateMixin, CreateView):
         return super().form_invalid(form)
 
 
-class ContractDetailView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, FuncionarioRequiredMixin, DetailView):
+class ContractDetailView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, FuncionarioRequiredMixin, ObjectHistoryMixin, DetailView):
     """DetailView para contratos"""
     model = Contract
     template_name = 'pages/detail/contract_detail.html'
@@ -327,10 +411,15 @@ class ContractDetailView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, Funcion
     def get_queryset(self):
         return super().get_queryset().select_related('company', 'person', 'usuario')
     
+    def get_movements(self):
+        return list(self.object.movements.select_related('performed_by').order_by('-created_at')[:10])
+    
     def get_context_data(self, **kwargs):
+        # ✅ Histórico e movimentos são independentes: em paralelo (pages.parallel)
+        results = run_parallel(history=self.get_history_page, movements=self.get_movements)
         context = super().get_context_data(**kwargs)
         # ✅ ADICIONAR MOVIMENTOS AO CONTEXTO
-        context['movements'] = self.object.movements.select_related('performed_by').order_by('-created_at')[:10]
+        context['movements'] = results['movements']
         return context
 
 
@@ -349,31 +438,10 @@ class ContractUpdateView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, Funcion
     def form_valid(self, form):
         contract = form.save(commit=False)
         
-        # ✅ DETECTAR MUDANÇAS
-        changed_fields = []
-        if form.changed_data:
-            changed_fields = list(form.changed_data)
-        
-        contract.save()
+        # ✅ SALVAR + MOVIMENTO + AUDITORIA (diff calculado uma única vez)
+        events.update_contract(contract, self.request.user)
         form.save_m2m()
         
-        # ✅ REGISTRAR MOVIMENTO
-        ContractMovement.objects.create(
-            contract=contract,
-            movement_type='updated',
-            description=f'Contrato atualizado por {self.request.user.username}',
-            performed_by=self.request.user,
-            metadata={
-                'changed_fields': changed_fields,
-                'title': contract.title,
-            }
-        )
-        
-        # ✅ ATUALIZAR CONTADOR NA EMPRESA
-        if contract.company:
-            contract.company.total_contracts = contract.company.contracts.filter(is_active=True).count()
-            contract.company.save(update_fields=['total_contracts'])
-        
         messages.success(
             self.request, 
             f'✅ Contrato "{contract.title}" atualizado com sucesso!'
@@ -394,52 +462,153 @@ class ContractDeleteView(OwnerQuerysetMixin, OwnerObjectPermissionMixin, Funcion
     template_name = 'pages/confirm/contract_confirm_delete.html'
     success_url = reverse_lazy('contract-list')
     
-    def delete(self, request, *args, **kwargs):
-        obj = self.get_object()
-        contract_title = obj.title
-        company = obj.company
+    def form_valid(self, form):
+        contract = self.object
+        contract_title = contract.title
         
-        # ✅ REGISTRAR MOVIMENTO ANTES DE DELETAR
-        ContractMovement.objects.create(
-            contract=obj,
-            movement_type='deleted',
-            description=f'Contrato excluído por {request.user.username}',
-            performed_by=request.user,
-            metadata={
-                'title': contract_title,
-                'company_id': company.id if company else None,
-                'deleted_at': timezone.now().isoformat(),
-            }
-        )
+        # ✅ EXCLUIR + AUDITORIA (estado final registrado para reconstrução)
+        events.delete_contract(contract, self.request.user)
         
         # ✅ MENSAGEM DE SUCESSO
         messages.success(
-            request, 
+            self.request, 
             f'✅ Contrato "{contract_title}" excluído com sucesso!'
         )
+        return redirect(self.get_success_url())
+
+
+# ===========================================
+# IMPORTAÇÃO EM LOTE
+# ===========================================
+
+class DataImportView(FuncionarioRequiredMixin, FormView):
+    """
+    Upload de CSV/JSONL de empresas, pessoas ou contratos
+    
+    O arquivo é processado em stream e em lotes (pages.imports); os
+    registros ficam com o usuário logado como dono. O resultado e os
+    primeiros erros por linha aparecem na própria página; o relatório
+    completo fica na sessão para download (DataImportReportView).
+    
+    A codificação é conferida pelo formulário antes de gravar qualquer lote.
+    """
+    template_name = 'pages/forms/import_form.html'
+    form_class = DataImportForm
+    report_session_key = 'import_error_report'
+    
+    def form_valid(self, form):
+        upload = form.cleaned_data['arquivo']
+        report = io.StringIO()
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = import_file(
+                form.cleaned_data['kind'], stream, guess_format(upload.name),
+                self.request.user, report=report, dry_run=form.cleaned_data['dry_run'],
+            )
+        finally:
+            stream.detach()
         
-        # ✅ DELETAR OBJETO
-        response = super().delete(request, *args, **kwargs)
+        # Relatório da última importação (substitui o anterior)
+        self.request.session.pop(self.report_session_key, None)
+        report_available = bool(result.errors) and report.tell() <= REPORT_MAX_SIZE
+        if report_available:
+            self.request.session[self.report_session_key] = report.getvalue()
         
-        # ✅ ATUALIZAR CONTADOR NA EMPRESA (DEPOIS DA EXCLUSÃO)
-        if company:
-            company.total_contracts = company.contracts.filter(is_active=True).count()
-            company.save(update_fields=['total_contracts'])
+        if form.cleaned_data['dry_run']:
+            messages.info(self.request, f'ℹ️ {result.valid} de {result.read} linha(s) válidas (nada foi gravado).')
+        elif result.created:
+            messages.success(self.request, f'✅ {result.created} de {result.read} registro(s) importado(s) com sucesso!')
+        if result.errors:
+            messages.warning(self.request, f'⚠️ {result.errors} linha(s) com erro.')
         
+        return self.render_to_response(self.get_context_data(
+            form=self.form_class(), result=result, report_available=report_available,
+        ))
+
+
+class DataImportReportView(FuncionarioRequiredMixin, View):
+    """Download do relatório de erros da última importação (CSV com BOM, como a exportação)"""
+    
+    def get(self, request, *args, **kwargs):
+        report = request.session.get(DataImportView.report_session_key)
+        if report is None:
+            raise Http404('Nenhum relatório de importação disponível.')
+        response = HttpResponse('\ufeff' + report, content_type='text/csv; charset=utf-8')
+        filename = f"importacao-erros-{timezone.localdate():%Y%m%d}.csv"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
 
+# ===========================================
+# SINCRONIZAÇÃO (RH/ERP)
+# ===========================================
+
+def _basic_auth_user(request):
+    """Usuário das credenciais HTTP Basic (ou None)"""
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'basic' or not credentials:
+        return None
+    try:
+        username, _, password = base64.b64decode(credentials).decode('utf-8').partition(':')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=username, password=password)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class SyncView(View):
+    """
+    Endpoint de sincronização em lote para sistemas externos
+    
+    POST com autenticação HTTP Basic (usuário funcionário ou admin) e corpo
+    JSON ({"companies": [...], "persons": [...], "contracts": [...]}) ou
+    NDJSON (Content-Type application/x-ndjson, um registro por linha com
+    "type"). Responde com o resultado de cada registro (pages.sync).
+    
+    O "index" de cada resultado começa em 1: posição do registro na sua
+    lista (JSON) ou número da linha do corpo (NDJSON).
+    
+    Sem sessão/cookies, por isso dispensa o CSRF.
+    """
+    http_method_names = ['post']
+    
+    def post(self, request, *args, **kwargs):
+        user = _basic_auth_user(request)
+        if user is None:
+            response = JsonResponse({'error': 'credenciais inválidas'}, status=401)
+            response['WWW-Authenticate'] = 'Basic realm="Athena"'
+            return response
+        if not roles.is_staff(user):
+            return JsonResponse({'error': 'usuário sem permissão de sincronização'}, status=403)
+        request.user = user
+        
+        ndjson = request.content_type in ('application/x-ndjson', 'application/ndjson')
+        try:
+            payload = sync.parse_payload(request.body, ndjson=ndjson)
+        except (ValueError, UnicodeDecodeError) as error:
+            return JsonResponse({'error': f'corpo inválido: {error}'}, status=400)
+        
+        total = sum(len(records) for records in payload.values())
+        if total > settings.SYNC_MAX_RECORDS:
+            return JsonResponse(
+                {'error': f'máximo de {settings.SYNC_MAX_RECORDS} registros por requisição'}, status=413
+            )
+        
+        return JsonResponse(sync.sync_records(payload, user))
+
+
 # =====================================================
 # STATE VIEWS
 # =====================================================
 
-class StateListView(AdminRequiredMixin, FilterView):
+class StateListView(AdminRequiredMixin, KeysetPaginationMixin, FilterView):
     """Lista de estados - APENAS ADMIN"""
     model = State
     template_name = 'pages/lists/state_list.html'
     context_object_name = 'states'
     filterset_class = StateFilter
     paginate_by = 25
+    keyset_ordering = ('name', 'pk')
 
 
 class StateCreateView(AdminRequiredMixin, CreateView):
@@ -488,11 +657,12 @@ class StateDeleteView(AdminRequiredMixin, DeleteView):
 # CITY VIEWS
 # ====================================
 
-class CityListView(LoginRequiredMixin, ListView):
+class CityListView(LoginRequiredMixin, ListCountMixin, KeysetPaginationMixin, ListView):
     model = City
     template_name = 'pages/lists/city_list.html'
     context_object_name = 'cities'
     paginate_by = 10
+    keyset_ordering = ('name', 'pk')  # índice único (name, state)
 
     def get_queryset(self):
         queryset = City.objects.select_related('state').order_by('name')
@@ -504,7 +674,7 @@ class CityListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['filter'] = self.filterset
-        context['total_cities'] = self.filterset.qs.count()
+        context['total_cities'] = self.get_list_count()
         return context
 
 
@@ -515,7 +685,7 @@ class CityDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        city = self.get_object()
+        city = self.object
         
         # Breadcrumbs
         context['breadcrumbs'] = [
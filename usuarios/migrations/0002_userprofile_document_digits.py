@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 16:41
+# CPF/CNPJ canônicos (só dígitos) com índice único
+
+from django.db import migrations, models
+
+from pages.validators import only_digits
+
+
+def fill_document_digits(apps, schema_editor):
+    UserProfile = apps.get_model('usuarios', 'UserProfile')
+    profiles = list(UserProfile.objects.only('pk', 'cpf', 'cnpj'))
+    for profile in profiles:
+        profile.cpf_digits = only_digits(profile.cpf) or None
+        profile.cnpj_digits = only_digits(profile.cnpj) or None
+    UserProfile.objects.bulk_update(profiles, ['cpf_digits', 'cnpj_digits'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='cpf_digits',
+            field=models.CharField(editable=False, max_length=11, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='cnpj_digits',
+            field=models.CharField(editable=False, max_length=14, null=True),
+        ),
+        migrations.RunPython(fill_document_digits, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='cpf_digits',
+            field=models.CharField(editable=False, max_length=11, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='cnpj_digits',
+            field=models.CharField(editable=False, max_length=14, null=True, unique=True),
+        ),
+    ]
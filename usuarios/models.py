@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.conf import settings
 
+from pages.validators import only_digits
+
 class UserProfile(models.Model):
     """
     Perfil estendido do usuário para armazenar informações específicas
@@ -39,6 +41,8 @@ class UserProfile(models.Model):
             )
         ]
     )
+    # Chave canônica (só dígitos), preenchida no save()
+    cpf_digits = models.CharField(max_length=11, unique=True, null=True, editable=False)
     nome_completo = models.CharField(
         max_length=200, 
         verbose_name="Nome Completo",
@@ -64,6 +68,8 @@ class UserProfile(models.Model):
             )
         ]
     )
+    # Chave canônica (só dígitos), preenchida no save()
+    cnpj_digits = models.CharField(max_length=14, unique=True, null=True, editable=False)
     razao_social = models.CharField(
         max_length=200, 
         verbose_name="Razão Social",
@@ -103,6 +109,16 @@ class UserProfile(models.Model):
         else:
             return f"{self.razao_social} - CNPJ: {self.cnpj}"
     
+    def save(self, *args, **kwargs):
+        self.cpf_digits = only_digits(self.cpf) or None
+        self.cnpj_digits = only_digits(self.cnpj) or None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields, *(f'{f}_digits' for f in ('cpf', 'cnpj') if f in update_fields)
+            }
+        super().save(*args, **kwargs)
+    
     @property
     def documento(self):
         """Retorna CPF ou CNPJ dependendo do tipo"""
@@ -126,4 +142,11 @@ class UserProfile(models.Model):
                 raise ValidationError("CNPJ é obrigatório para Pessoa Jurídica")
             if not self.razao_social:
                 raise ValidationError("Razão social é obrigatória para Pessoa Jurídica")
+        
+        # Unicidade pelos dígitos: "123.456.789-00" e "12345678900" são o mesmo documento
+        others = UserProfile.objects.exclude(pk=self.pk)
+        if self.cpf and others.filter(cpf_digits=only_digits(self.cpf)).exists():
+            raise ValidationError("Já existe um perfil com este CPF")
+        if self.cnpj and others.filter(cnpj_digits=only_digits(self.cnpj)).exists():
+            raise ValidationError("Já existe um perfil com este CNPJ")
 # Deploy: 2025-11-06 00:04:16
@@ -0,0 +1,100 @@
+"""
+Resolução de papéis (grupos) do usuário com cache por requisição
+
+Os nomes dos grupos são carregados UMA vez e memorizados na instância do
+usuário (request.user vive durante toda a requisição). Opcionalmente, o
+resultado também é guardado no cache do Django entre requisições
+(settings.ROLE_CACHE_TIMEOUT > 0), com invalidação via m2m_changed em
+User.groups (ver usuarios/signals.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+ADMIN_GROUP = 'empresa_admin'
+FUNCIONARIO_GROUP = 'funcionario'
+STAFF_GROUPS = (ADMIN_GROUP, FUNCIONARIO_GROUP)
+
+# Atributo usado para memorizar os grupos na instância do usuário
+_MEMO_ATTR = '_athena_group_names'
+
+# Chave de versão: incrementada quando um grupo é renomeado/excluído
+_VERSION_KEY = 'roles:version'
+
+
+def _cache_timeout():
+    return getattr(settings, 'ROLE_CACHE_TIMEOUT', 0) or 0
+
+
+def _cache_key(user_id):
+    version = cache.get(_VERSION_KEY, 0)
+    return f'roles:v{version}:user:{user_id}'
+
+
+def get_group_names(user):
+    """
+    Retorna um frozenset com os nomes dos grupos do usuário
+
+    Custo: zero queries se já memorizado (ou em cache), uma query caso contrário.
+    """
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return frozenset()
+
+    names = getattr(user, _MEMO_ATTR, None)
+    if names is not None:
+        return names
+
+    timeout = _cache_timeout()
+    if timeout:
+        names = cache.get(_cache_key(user.pk))
+
+    if names is None:
+        names = frozenset(user.groups.values_list('name', flat=True))
+        if timeout:
+            cache.set(_cache_key(user.pk), names, timeout)
+
+    setattr(user, _MEMO_ATTR, names)
+    return names
+
+
+def invalidate_user(user=None, user_id=None):
+    """Descarta o cache de grupos de um usuário (instância e cache global)"""
+    if user is not None:
+        if hasattr(user, _MEMO_ATTR):
+            delattr(user, _MEMO_ATTR)
+        user_id = user.pk
+    if user_id is not None and _cache_timeout():
+        cache.delete(_cache_key(user_id))
+
+
+def invalidate_all():
+    """Invalida o cache de todos os usuários (ex.: grupo renomeado/excluído)"""
+    if not _cache_timeout():
+        return
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 1, None)
+
+
+def in_group(user, *group_names):
+    """Verifica se o usuário pertence a pelo menos um dos grupos"""
+    return not get_group_names(user).isdisjoint(group_names)
+
+
+def is_admin(user):
+    """Superuser ou membro de empresa_admin"""
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return False
+    return user.is_superuser or in_group(user, ADMIN_GROUP)
+
+
+def is_funcionario(user):
+    """Membro do grupo funcionario"""
+    return in_group(user, FUNCIONARIO_GROUP)
+
+
+def is_staff(user):
+    """Superuser ou membro de funcionario/empresa_admin"""
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return False
+    return user.is_superuser or in_group(user, *STAFF_GROUPS)
@@ -1,7 +1,12 @@
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 
+from . import roles
+
+User = get_user_model()
+
 
 @receiver(post_migrate)
 def ensure_groups(sender, **kwargs):
@@ -63,36 +68,61 @@ def get_user_groups(user):
     """
     Função helper para listar grupos do usuário
     """
-    return [group.name for group in user.groups.all()]
+    return sorted(roles.get_group_names(user))
 
 
 def is_user_in_group(user, group_name):
     """
     Função helper para verificar se usuário está em grupo
     """
-    return user.groups.filter(name=group_name).exists()
+    return roles.in_group(user, group_name)
 
 
 def is_admin_user(user):
     """
     Função helper para verificar se é admin
     """
-    return user.is_superuser or user.groups.filter(name='empresa_admin').exists()
+    return roles.is_admin(user)
 
 
 def is_funcionario_user(user):
     """
     Função helper para verificar se é funcionário
     """
-    return user.groups.filter(name='funcionario').exists()
+    return roles.is_funcionario(user)
 
 
 def is_staff_user(user):
     """
     Função helper para verificar se é staff (funcionário OU admin)
     """
-    return (
-        user.is_superuser or 
-        user.groups.filter(name__in=['empresa_admin', 'funcionario']).exists()
-    )
+    return roles.is_staff(user)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalida o cache de papéis quando os grupos de um usuário mudam
+    (user.groups.add/remove/clear ou group.user_set.add/remove/clear)
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        # instance é o usuário
+        roles.invalidate_user(user=instance)
+    elif pk_set:
+        # instance é o grupo; pk_set contém os usuários afetados
+        for user_id in pk_set:
+            roles.invalidate_user(user_id=user_id)
+    else:
+        # group.user_set.clear() não informa os usuários
+        roles.invalidate_all()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_roles_on_group_change(sender, **kwargs):
+    """Grupo renomeado ou excluído: invalida o cache de todos os usuários"""
+    roles.invalidate_all()
 # Deploy: 2025-11-06 00:04:16
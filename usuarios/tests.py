@@ -1,5 +1,35 @@
 from django.test import TestCase
+from django.contrib.auth.models import User, Group
 
-# Create your tests here.
+from . import roles
+
+
+class RoleResolverTest(TestCase):
+    """
+    Testes para o cache de papéis (grupos) por usuário
+    """
+
+    def setUp(self):
+        self.admin_group, _ = Group.objects.get_or_create(name='empresa_admin')
+        self.func_group, _ = Group.objects.get_or_create(name='funcionario')
+        self.user = User.objects.create_user(username='func', password='pass123')
+        self.user.groups.add(self.func_group)
+
+    def test_group_names_loaded_once(self):
+        """Várias checagens de papel custam uma única query"""
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(roles.is_funcionario(user))
+            self.assertTrue(roles.is_staff(user))
+            self.assertFalse(roles.is_admin(user))
+            self.assertTrue(roles.in_group(user, 'empresa_admin', 'funcionario'))
+
+    def test_group_change_invalidates_memo(self):
+        """Adicionar grupo ao usuário invalida o cache memorizado"""
+        self.assertFalse(roles.is_admin(self.user))
+        self.user.groups.add(self.admin_group)
+        self.assertTrue(roles.is_admin(self.user))
+        self.admin_group.user_set.remove(self.user)
+        self.assertFalse(roles.is_admin(User.objects.get(pk=self.user.pk)))
 
 # Deploy: 2025-11-06 00:04:16